@@ -0,0 +1,78 @@
+"""
+Writes embedded chunks to Parquet and Arrow IPC files with ``ArrowChunkStore``, then reads them
+back one batch at a time, and compares the write and read times, the size on disk and the peak
+memory of the read, i.e. the Python objects (tracemalloc) and the Arrow buffers (Arrow memory pool).
+
+Usage:
+    python benchmarks/bench_arrow_store.py --chunks 200000 --dimension 384 --rows_per_batch 10000
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+from docs2vecs.subcommands.indexer.document import ChunkBatch
+from docs2vecs.subcommands.indexer.skills.arrow_chunk_store import ArrowChunkStore
+
+
+def make_batch(start: int, count: int, dimension: int) -> ChunkBatch:
+    ids = [f"chunk_{i}" for i in range(start, start + count)]
+    return ChunkBatch(
+        chunk_ids=ids,
+        contents=[f"content of {chunk_id} " * 20 for chunk_id in ids],
+        source_links=[f"source_{i // 10}" for i in range(start, start + count)],
+        embeddings=np.random.default_rng(start).random((count, dimension), dtype=np.float32),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--rows_per_batch", type=int, default=ArrowChunkStore.DEFAULT_ROWS_PER_BATCH)
+    args = parser.parse_args()
+
+    print(f"{'format':<18} {'write s':>8} {'MB on disk':>11} {'read s':>8} {'peak py MB':>11} {'peak arrow MB':>14}")
+    for format, compression, memory_map in (
+        ("parquet", None, False),
+        ("parquet", "zstd", False),
+        ("arrow", None, True),
+        ("arrow", "lz4", True),
+    ):
+        with tempfile.TemporaryDirectory() as path:
+            store = ArrowChunkStore(path, format=format, compression=compression, rows_per_batch=args.rows_per_batch)
+            write_time = 0.0
+            for start in range(0, args.chunks, args.rows_per_batch):
+                batch = make_batch(start, min(args.rows_per_batch, args.chunks - start), args.dimension)
+                started = time.perf_counter()
+                store.write(batch)
+                write_time += time.perf_counter() - started
+            size = sum(file.stat().st_size for file in Path(path).iterdir())
+
+            arrow_before = pa.total_allocated_bytes()
+            arrow_peak = 0
+            tracemalloc.start()
+            started = time.perf_counter()
+            count = 0
+            for batch in ArrowChunkStore.read(path, memory_map=memory_map):
+                count += len(batch.to_chunks())
+                arrow_peak = max(arrow_peak, pa.total_allocated_bytes() - arrow_before)
+            read_time = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert count == args.chunks
+
+            name = f"{format}/{compression or 'none'}"
+            print(
+                f"{name:<18} {write_time:>8.2f} {size / 2**20:>11.1f} {read_time:>8.2f} "
+                f"{peak / 2**20:>11.1f} {arrow_peak / 2**20:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares ChromaDBVectorStoreSkill with the per-document upserts it replaced, on a local PersistentClient.
+
+Usage:
+    python benchmarks/bench_chromadb_upsert.py --documents 5000 --chunks_per_document 4 --dimension 384
+"""
+
+import argparse
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import ChromaDBVectorStoreSkill
+
+
+def make_documents(document_count: int, chunks_per_document: int, dimension: int):
+    embeddings = np.random.default_rng(0).random((document_count * chunks_per_document, dimension))
+    documents = []
+    for i in range(document_count):
+        doc = Document(filename=f"doc_{i}", tag="bench")
+        for j in range(chunks_per_document):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{i}_{j}"
+            chunk.content = f"content of chunk {j} of document {i}"
+            chunk.source_link = doc.filename
+            chunk.embedding = embeddings[i * chunks_per_document + j].tolist()
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    return documents
+
+
+def per_document_upserts(db_path: str, documents) -> None:
+    collection = chromadb.PersistentClient(path=db_path).get_or_create_collection("bench")
+    for doc in documents:
+        collection.upsert(
+            ids=[chunk.chunk_id for chunk in doc.chunks],
+            embeddings=[chunk.embedding for chunk in doc.chunks],
+            documents=[chunk.content for chunk in doc.chunks],
+            metadatas=[{"source": chunk.source_link, "tags": doc.tag} for chunk in doc.chunks],
+        )
+
+
+def skill_upserts(db_path: str, documents) -> None:
+    ChromaDBVectorStoreSkill({"params": {"db_path": db_path, "collection_name": "bench"}}, None).run(documents)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--chunks_per_document", type=int, default=4)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, args.chunks_per_document, args.dimension)
+    chunk_count = args.documents * args.chunks_per_document
+
+    print(f"{'method':<22} {'chunks':>8} {'seconds':>9} {'chunks/s':>10}")
+    for name, upsert in (("per-document upserts", per_document_upserts), ("ChromaDB skill", skill_upserts)):
+        with tempfile.TemporaryDirectory() as db_path:
+            start = time.perf_counter()
+            upsert(db_path, documents)
+            elapsed = time.perf_counter() - start
+        print(f"{name:<22} {chunk_count:>8} {elapsed:>9.2f} {chunk_count / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
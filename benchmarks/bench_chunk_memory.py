@@ -0,0 +1,62 @@
+"""
+Measures the memory held by embedded chunks, with float32 NumPy embeddings in slotted chunks and
+with the Python lists of floats in per-instance dicts they replaced.
+
+Usage:
+    python benchmarks/bench_chunk_memory.py --chunks 100000 --dimension 384
+"""
+
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+
+
+class ListChunk:
+    def __init__(self):
+        self.document_id = None
+        self.document_name = None
+        self.tag = None
+        self.content = None
+        self.chunk_id = None
+        self.source_link = None
+        self.embedding = []
+        self._hash = None
+
+
+def make_chunks(chunk_class, embeddings: np.ndarray, as_list: bool):
+    chunks = []
+    for i, embedding in enumerate(embeddings):
+        chunk = chunk_class()
+        chunk.chunk_id = f"chunk_{i}"
+        chunk.embedding = embedding.tolist() if as_list else embedding
+        chunks.append(chunk)
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    print(f"{'representation':<34} {'chunks':>8} {'MB':>9} {'bytes/chunk':>12}")
+    for name, chunk_class, as_list in (
+        ("list of floats, __dict__", ListChunk, True),
+        ("float32 array, __slots__", Chunk, False),
+    ):
+        tracemalloc.start()
+        # embeddings as produced by an embedding skill, a float32 matrix kept alive by the chunk views
+        embeddings = np.random.default_rng(0).random((args.chunks, args.dimension), dtype=np.float32)
+        chunks = make_chunks(chunk_class, embeddings, as_list)
+        del embeddings
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name:<34} {len(chunks):>8} {size / 2**20:>9.1f} {size / len(chunks):>12.0f}")
+        del chunks
+
+
+if __name__ == "__main__":
+    main()
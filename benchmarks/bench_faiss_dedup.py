@@ -0,0 +1,88 @@
+"""
+Measures how FaissVectorStoreSkill scales with the size of the existing index.
+
+Each step adds --new_chunks chunks, half of them already in the index, to a flat index
+already holding N vectors. The list-based dedup the skill used before is timed on the
+same ids for comparison; it is quadratic and skipped above --max_list_size.
+
+Usage:
+    python benchmarks/bench_faiss_dedup.py --sizes 10000 50000 100000 200000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import FaissVectorStoreSkill
+
+
+def make_documents(chunk_ids, dimension: int, chunks_per_document: int = 10):
+    embeddings = np.random.default_rng(0).random((len(chunk_ids), dimension), dtype=np.float32)
+    documents = []
+    for start in range(0, len(chunk_ids), chunks_per_document):
+        doc = Document(filename=f"doc_{start}", tag="bench")
+        for index in range(start, min(start + chunks_per_document, len(chunk_ids))):
+            chunk = Chunk()
+            chunk.chunk_id = chunk_ids[index]
+            chunk.content = chunk_ids[index]
+            chunk.source_link = doc.filename
+            chunk.embedding = embeddings[index]
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    return documents
+
+
+def list_dedup(existing_ids, documents) -> int:
+    existing_ids = list(existing_ids)
+    added = 0
+    for doc in documents:
+        ids = [chunk.chunk_id for chunk in doc.chunks]
+        for id in ids:
+            if id not in existing_ids:
+                ids.index(id)
+                existing_ids.append(id)
+                added += 1
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000, 200_000])
+    parser.add_argument("--new_chunks", type=int, default=20_000, help="Number of chunks added at each step.")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--max_list_size", type=int, default=100_000, help="Largest index the list dedup runs on.")
+    args = parser.parse_args()
+
+    print(f"{'existing':>9} {'skill s':>9} {'us/vector':>10} {'list dedup s':>13}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            skill = FaissVectorStoreSkill(
+                {"params": {"db_path": str(Path(tmp_dir) / "index"), "dimension": args.dimension}}, None
+            )
+            skill.run(make_documents([f"chunk_{i}" for i in range(size)], args.dimension))
+
+            # half of the chunks are already in the index
+            first_id = size - args.new_chunks // 2
+            new_ids = [f"chunk_{i}" for i in range(first_id, first_id + args.new_chunks)]
+            documents = make_documents(new_ids, args.dimension)
+
+            start = time.perf_counter()
+            skill.run(documents)
+            elapsed = time.perf_counter() - start
+
+            list_elapsed = "skipped"
+            if size <= args.max_list_size:
+                start = time.perf_counter()
+                list_dedup((f"chunk_{i}" for i in range(size)), documents)
+                list_elapsed = f"{time.perf_counter() - start:.2f}"
+
+            print(f"{size:>9} {elapsed:>9.2f} {elapsed / (size + args.new_chunks) * 1e6:>10.2f} {list_elapsed:>13}")
+
+
+if __name__ == "__main__":
+    main()
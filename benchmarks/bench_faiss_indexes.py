@@ -0,0 +1,184 @@
+"""
+Compares FAISS index configurations of FaissVectorStoreSkill on the same embeddings.
+
+Every configuration is built through the skill in its own process, then reloaded and
+queried one query at a time. Reported per configuration: build time, load time, on-disk
+size, peak RSS of the process, p50/p99 query latency and recall@k against an exact search.
+
+Embeddings are read from a .npy file (--embeddings) or generated as --count clustered
+random vectors. Configurations are JSON objects of skill params, e.g.:
+
+    python benchmarks/bench_faiss_indexes.py --count 200000 --dimension 384 \\
+        --configs '{"index_type": "flat"}' '{"index_type": "hnsw", "ef_search": 64}' \\
+        --output results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import FaissVectorStoreSkill
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+DEFAULT_CONFIGS = [
+    {"index_type": "flat"},
+    {"index_type": "ivf_flat", "nprobe": 16},
+    {"index_type": "ivf_sq8", "nprobe": 16},
+    {"index_type": "ivf_pq", "nprobe": 16, "pq_m": 16},
+    {"index_type": "hnsw", "hnsw_m": 32, "ef_search": 64},
+    {"index_type": "hnsw_sq8", "hnsw_m": 32, "ef_search": 64},
+    {"index_type": "sq8"},
+]
+
+
+def make_embeddings(count: int, dimension: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Gaussian blobs, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    embeddings = centers[rng.integers(clusters, size=count)]
+    embeddings += rng.normal(scale=0.3, size=(count, dimension)).astype(np.float32)
+    return embeddings
+
+
+def exact_neighbors(embeddings: np.ndarray, queries: np.ndarray, metric: str, k: int) -> np.ndarray:
+    if metric == "l2":
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+    else:
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+    if metric == "cosine":
+        embeddings = embeddings.copy()
+        queries = queries.copy()
+        faiss.normalize_L2(embeddings)
+        faiss.normalize_L2(queries)
+    index.add(embeddings)
+    return index.search(queries, k)[1]
+
+
+def make_documents(embeddings: np.ndarray, chunks_per_document: int = 10):
+    documents = []
+    for start in range(0, len(embeddings), chunks_per_document):
+        doc = Document(filename=f"doc_{start}", tag="bench")
+        for index in range(start, min(start + chunks_per_document, len(embeddings))):
+            chunk = Chunk()
+            chunk.chunk_id = str(index)
+            chunk.content = f"chunk {index}"
+            chunk.source_link = doc.filename
+            chunk.embedding = embeddings[index]
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    return documents
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def run_config(params: dict, data_dir: str, k: int) -> dict:
+    data_dir = Path(data_dir)
+    embeddings = np.load(data_dir / "embeddings.npy")
+    queries = np.load(data_dir / "queries.npy")
+    ground_truth = np.load(data_dir / "ground_truth.npy")
+    dimension = embeddings.shape[1]
+
+    with tempfile.TemporaryDirectory(dir=data_dir) as db_path:
+        skill_config = {"params": {"db_path": db_path, "dimension": dimension, **params}}
+        documents = make_documents(embeddings)
+        del embeddings
+
+        start = time.perf_counter()
+        FaissVectorStoreSkill(skill_config, None).run(documents)
+        build_seconds = time.perf_counter() - start
+        del documents
+
+        # search parameters are applied when the store is loaded
+        start = time.perf_counter()
+        vector_store = FaissVectorStoreSkill(skill_config, None)._get_vector_store(db_path, [])
+        load_seconds = time.perf_counter() - start
+
+        if params.get("metric") == "cosine":
+            faiss.normalize_L2(queries)
+        faiss.omp_set_num_threads(1)
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, ground_truth):
+            start = time.perf_counter()
+            _, labels = vector_store.index.search(query[np.newaxis, :], k)
+            latencies.append(time.perf_counter() - start)
+            found = {int(vector_store.index_to_docstore_id[label]) for label in labels[0] if label >= 0}
+            hits += len(found.intersection(expected.tolist()))
+
+        return {
+            **params,
+            "build_s": round(build_seconds, 3),
+            "load_s": round(load_seconds, 3),
+            "disk_mib": round(directory_size(Path(db_path)) / 2**20, 1),
+            "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1) if resource else None,
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+            f"recall@{k}": round(hits / (len(queries) * k), 4),
+        }
+
+
+def print_table(results: list) -> None:
+    columns = list(dict.fromkeys(column for result in results for column in result))
+    widths = {column: max(len(column), *(len(str(result.get(column, ""))) for result in results)) for column in columns}
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+    for result in results:
+        print("  ".join(str(result.get(column, "")).rjust(widths[column]) for column in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", type=Path, help="A .npy file of float32 embeddings, one per row.")
+    parser.add_argument("--count", type=int, default=100_000, help="Number of generated embeddings.")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of the generated embeddings.")
+    parser.add_argument("--clusters", type=int, default=1000, help="Number of clusters of the generated embeddings.")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of queries, sampled from the embeddings.")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbors retrieved per query.")
+    parser.add_argument("--metric", choices=["l2", "ip", "cosine"], default="l2")
+    parser.add_argument("--configs", type=json.loads, nargs="+", default=DEFAULT_CONFIGS, help="Skill params.")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = np.load(args.embeddings).astype(np.float32)
+    else:
+        embeddings = make_embeddings(args.count, args.dimension, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = embeddings[rng.choice(len(embeddings), args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.1, size=queries.shape).astype(np.float32)
+    ground_truth = exact_neighbors(embeddings, queries, args.metric, args.k)
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        np.save(Path(data_dir) / "embeddings.npy", embeddings)
+        np.save(Path(data_dir) / "queries.npy", queries)
+        np.save(Path(data_dir) / "ground_truth.npy", ground_truth)
+        del embeddings
+
+        for params in args.configs:
+            params = {"metric": args.metric, **params}
+            # a process per configuration, so that peak RSS is measured separately
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results.append(executor.submit(run_config, params, data_dir, args.k).result())
+
+    print_table(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
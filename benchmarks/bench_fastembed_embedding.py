@@ -0,0 +1,80 @@
+"""
+Compares the throughput of LlamaFastembedEmbeddingSkill with the per-chunk embedding loop it replaced.
+
+Usage:
+    python benchmarks/bench_fastembed_embedding.py --chunks 2000 --batch_size 256
+
+Without access to the model hub, pass the folder of a local copy of the model with --model_path.
+"""
+
+import argparse
+import random
+import string
+import time
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import LlamaFastembedEmbeddingSkill
+
+
+def make_documents(chunk_count: int, chunks_per_document: int, chunk_length: int) -> list:
+    rng = random.Random(42)
+    documents = []
+    for doc_index in range(0, chunk_count, chunks_per_document):
+        doc = Document(filename=f"doc_{doc_index}")
+        for chunk_index in range(doc_index, min(doc_index + chunks_per_document, chunk_count)):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{chunk_index}"
+            words = ("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(chunk_length))
+            chunk.content = " ".join(words)
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    return documents
+
+
+def per_chunk_loop(skill: LlamaFastembedEmbeddingSkill, documents: list) -> None:
+    for doc in documents:
+        for chunk in doc.chunks:
+            chunk.embedding = next(iter(skill._embedding_model.query_embed(chunk.content)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Number of chunks to embed.")
+    parser.add_argument("--chunks_per_document", type=int, default=5, help="Number of chunks per document.")
+    parser.add_argument("--chunk_words", type=int, default=150, help="Number of words per chunk.")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2", help="FastEmbed model name.")
+    parser.add_argument("--model_path", default=None, help="Folder of a local copy of the model.")
+    parser.add_argument("--batch_size", type=int, default=256, help="Batch size of the batched run.")
+    parser.add_argument("--parallel", type=int, default=None, help="Data-parallel processes of the batched run.")
+    parser.add_argument("--threads", type=int, default=None, help="onnxruntime threads.")
+    args = parser.parse_args()
+
+    params = {"model_name": args.model, "batch_size": args.batch_size}
+    if args.parallel is not None:
+        params["parallel"] = args.parallel
+    if args.threads is not None:
+        params["threads"] = args.threads
+    if args.model_path is not None:
+        params["model_path"] = args.model_path
+    skill = LlamaFastembedEmbeddingSkill({"params": params}, None)
+
+    # warm up the onnx session so that model loading is not measured
+    skill.run(make_documents(args.batch_size, args.chunks_per_document, args.chunk_words))
+
+    results = {}
+    for name, embed in (("per-chunk loop", lambda docs: per_chunk_loop(skill, docs)), ("batched skill", skill.run)):
+        documents = make_documents(args.chunks, args.chunks_per_document, args.chunk_words)
+        start = time.perf_counter()
+        embed(documents)
+        elapsed = time.perf_counter() - start
+        results[name] = args.chunks / elapsed
+
+    print(f"{'method':<16} {'chunks/sec':>12}")
+    for name, throughput in results.items():
+        print(f"{name:<16} {throughput:>12.1f}")
+    print(f"speed-up: {results['batched skill'] / results['per-chunk loop']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
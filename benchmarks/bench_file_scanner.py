@@ -0,0 +1,72 @@
+"""
+Compares FileScannerSkill with the os.walk + fnmatch scan it replaced, on a synthetic directory tree.
+
+The tree is created once under --root and reused by the following runs.
+
+Usage:
+    python benchmarks/bench_file_scanner.py --root /tmp/docs2vecs_scan_tree --files 1000000
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+from docs2vecs.subcommands.indexer.skills import FileScannerSkill
+
+EXTENSIONS = (".md", ".txt", ".pdf", ".docx", ".png", ".json")
+PATTERNS = ["*.md", "*.txt", "*.pdf", "*.docx"]
+
+
+def make_tree(root: Path, file_count: int, files_per_directory: int) -> None:
+    marker = root / f".complete_{file_count}_{files_per_directory}"
+    if marker.exists():
+        return
+    for index in range(file_count):
+        directory = root / f"dir_{index // (files_per_directory * 100)}" / f"sub_{index // files_per_directory}"
+        if index % files_per_directory == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file_{index}{EXTENSIONS[index % len(EXTENSIONS)]}").touch()
+    marker.touch()
+
+
+def walk_and_fnmatch(root: Path) -> int:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            files.append(Path(dirpath) / filename)
+    return sum(1 for file_path in files if any(fnmatch.fnmatch(file_path.name, pattern) for pattern in PATTERNS))
+
+
+def scanner_skill(root: Path) -> int:
+    scanner = FileScannerSkill({"params": {"path": str(root), "recursive": True, "filter": PATTERNS}}, None)
+    return sum(1 for _ in scanner._scan())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, default=Path("/tmp/docs2vecs_scan_tree"), help="Synthetic tree location.")
+    parser.add_argument("--files", type=int, default=1_000_000, help="Number of files of the tree.")
+    parser.add_argument("--files_per_directory", type=int, default=1000, help="Number of files per directory.")
+    args = parser.parse_args()
+
+    make_tree(args.root, args.files, args.files_per_directory)
+
+    print(f"{'method':<18} {'files':>9} {'seconds':>9} {'peak MiB':>9}")
+    for name, scan in (("os.walk + fnmatch", walk_and_fnmatch), ("FileScannerSkill", scanner_skill)):
+        start = time.perf_counter()
+        count = scan(args.root)
+        elapsed = time.perf_counter() - start
+
+        # memory is measured on a separate pass, tracemalloc slows the scan down
+        tracemalloc.start()
+        scan(args.root)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<18} {count:>9} {elapsed:>9.2f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measures the SQLite tracker database: bulk updates, bulk lookups and streaming of the failed chunks.
+
+Usage:
+    python benchmarks/bench_sqlite_tracker.py --chunks 100000 --batch_size 1000 --dimension 384
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from docs2vecs.subcommands.indexer.db import SQLiteConnection
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.skills import VectorStoreTracker
+
+
+def make_chunks(chunk_count: int, dimension: int):
+    embeddings = np.random.default_rng(0).random((chunk_count, dimension), dtype=np.float32)
+    chunks = []
+    for i in range(chunk_count):
+        chunk = Chunk()
+        chunk.document_id = f"chunk_{i}"
+        chunk.chunk_id = chunk.document_id
+        chunk.content = f"content of chunk {i}"
+        chunk.embedding = embeddings[i].tolist()
+        chunks.append(chunk)
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--batch_size", type=int, default=1000)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.dimension)
+    # one chunk out of 100 failed to upload
+    results = [SimpleNamespace(succeeded=i % 100 != 0, error_message=None) for i in range(args.chunks)]
+    document_ids = [chunk.document_id for chunk in chunks]
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        tracker = VectorStoreTracker(SQLiteConnection(str(Path(db_dir) / "tracker.sqlite")))
+
+        timings = []
+        start = time.perf_counter()
+        for i in range(0, args.chunks, args.batch_size):
+            tracker.update_documents(chunks[i : i + args.batch_size], results[i : i + args.batch_size])
+        timings.append(("update_documents", args.chunks, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        for i in range(0, args.chunks, args.batch_size):
+            tracker.get_tracked_document_ids(document_ids[i : i + args.batch_size])
+        timings.append(("get_tracked_document_ids", args.chunks, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        failed_count = sum(1 for _ in tracker.retrieve_failed_documents())
+        timings.append(("retrieve_failed_documents", failed_count, time.perf_counter() - start))
+
+    print(f"{'operation':<26} {'chunks':>8} {'seconds':>9} {'us/chunk':>9}")
+    for name, count, elapsed in timings:
+        print(f"{name:<26} {count:>8} {elapsed:>9.2f} {elapsed / count * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -170,6 +170,11 @@ indexer_parser.add_argument(
 indexer_parser.add_argument(
     "--env", metavar="ENV", required=False, help="Environment file to load."
 )
+indexer_parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="Resume the previous run from its checkpoint, instead of starting over.",
+)
 
 integrated_parser = subparsers.add_parser(
     "integrated_vec", help="Run an integrated indexer pipeline"
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+from docs2vecs.subcommands.indexer.skills.skill import batched
+
+
+class Checkpoint:
+    """Durable progress of an indexer run, kept in a local folder until the run succeeds.
+
+    The output batches of one stage of the skillset are pickled to ``batch_<n>.pkl`` files. Once
+    a batch file is in place, its documents are appended to ``progress.jsonl``, which is the
+    cursor of the run: a batch is only part of the checkpoint once its line is complete, so a
+    run killed while writing a batch loses that batch only.
+
+    Documents are identified by their file name, and a batch holds all the documents of its files
+    (see ``batched``), so a file is only part of the checkpoint once all its documents are. The
+    folder may not hold anything but a checkpoint, which is the only thing ``clear`` removes.
+    """
+
+    MANIFEST_FILE = "checkpoint.json"
+    PROGRESS_FILE = "progress.jsonl"
+
+    def __init__(self, path: str, config_key: str, resume: bool) -> None:
+        self._path = Path(path).expanduser().resolve()
+        manifest_file = self._path / Checkpoint.MANIFEST_FILE
+
+        if resume and manifest_file.exists():
+            manifest = json.loads(manifest_file.read_text())
+            if manifest["config_key"] != config_key:
+                raise ValueError(
+                    f"The checkpoint in {self._path} was written with a different configuration and cannot be resumed"
+                )
+        else:
+            if not manifest_file.exists() and self._path.exists() and any(self._path.iterdir()):
+                raise ValueError(f"{self._path} is not empty and does not hold a checkpoint")
+            self.clear()
+            self._path.mkdir(parents=True, exist_ok=True)
+            manifest_file.write_text(json.dumps({"config_key": config_key}))
+
+        self._batch_files = []
+        self.completed_documents = set()
+        progress_file = self._path / Checkpoint.PROGRESS_FILE
+        progress_file.touch()
+        with open(progress_file, "r+b") as file:
+            complete_size = 0
+            for line in file:
+                try:
+                    progress = json.loads(line) if line.endswith(b"\n") else None
+                except json.JSONDecodeError:
+                    progress = None
+                if progress is None:
+                    # the last line of a run killed while writing it
+                    break
+                self._batch_files.append(progress["batch"])
+                self.completed_documents.update(progress["documents"])
+                complete_size += len(line)
+            # so that the next line is not appended to a partial one
+            file.truncate(complete_size)
+        self._progress = open(progress_file, "a")
+
+    @staticmethod
+    def get_config_key(skill_config_dicts: List[dict]) -> str:
+        return hashlib.sha256(json.dumps(skill_config_dicts, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def get_document_key(doc: Document) -> str:
+        return str(doc.filename)
+
+    def load_batches(self) -> Iterator[List[Document]]:
+        """Yield the batches saved by the previous runs, one at a time."""
+        for batch_file in self._batch_files:
+            with open(self._path / batch_file, "rb") as file:
+                yield pickle.load(file)
+
+    def save_batch(self, batch: List[Document]) -> None:
+        batch_file = f"batch_{len(self._batch_files):06d}.pkl"
+        tmp_file = self._path / (batch_file + ".tmp")
+        with open(tmp_file, "wb") as file:
+            pickle.dump(batch, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, self._path / batch_file)
+
+        documents = [Checkpoint.get_document_key(doc) for doc in batch]
+        self._progress.write(json.dumps({"batch": batch_file, "documents": documents}) + "\n")
+        self._progress.flush()
+        os.fsync(self._progress.fileno())
+        self._batch_files.append(batch_file)
+        self.completed_documents.update(documents)
+
+    def clear(self) -> None:
+        """Remove the checkpoint, once the run it belongs to succeeded, and its folder if nothing else is in it."""
+        if getattr(self, "_progress", None) is not None:
+            self._progress.close()
+            self._progress = None
+        if not self._path.exists():
+            return
+        for file_path in self._path.glob("batch_*.pkl*"):
+            file_path.unlink()
+        for file_name in (Checkpoint.PROGRESS_FILE, Checkpoint.MANIFEST_FILE):
+            (self._path / file_name).unlink(missing_ok=True)
+        if not any(self._path.iterdir()):
+            self._path.rmdir()
+
+
+class ResumeFilterSkill(IndexerSkill):
+    """Drops the documents of the checkpoint, placed right after the source of the skillset,
+    so that the stages up to the checkpointed one do not process them again."""
+
+    def __init__(self, checkpoint: Checkpoint) -> None:
+        super().__init__({}, None)
+        self._checkpoint = checkpoint
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        output = [
+            doc for doc in input if Checkpoint.get_document_key(doc) not in self._checkpoint.completed_documents
+        ]
+        if len(output) < len(input):
+            self.logger.debug(f"Skipping {len(input) - len(output)} documents found in the checkpoint")
+        return output
+
+
+class CheckpointWriterSkill(IndexerSkill):
+    """Saves the output of the checkpointed stage, after replaying the batches saved by the previous runs.
+
+    In streaming and concurrent pipelines, every batch is saved as it comes. A sequential pipeline
+    hands over the whole output of the stage at once, which is saved as a single batch.
+    """
+
+    def __init__(self, checkpoint: Checkpoint) -> None:
+        super().__init__({}, None)
+        self._checkpoint = checkpoint
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        output = [doc for batch in self._checkpoint.load_batches() for doc in batch]
+        if input:
+            self._checkpoint.save_batch(input)
+            output.extend(input)
+        return output
+
+    def run_stream(
+        self, batches: Iterable[Optional[List[Document]]], batch_size: int
+    ) -> Iterator[List[Document]]:
+        replayed_count = 0
+        for batch in self._checkpoint.load_batches():
+            replayed_count += len(batch)
+            yield from batched(batch, batch_size)
+        if replayed_count:
+            self.logger.info(f"Resumed {replayed_count} documents from the checkpoint")
+
+        for batch in batches:
+            if batch:
+                self._checkpoint.save_batch(batch)
+                yield from batched(batch, batch_size)
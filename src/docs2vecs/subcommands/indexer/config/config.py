@@ -44,6 +44,17 @@ class Config:
         v = Validator(schema)
         if not v.validate(self.config):
             raise ValueError(f"Config validation errors: {v.errors}")
+        self._validate_skill_names()
+
+    def _validate_skill_names(self):
+        # the pipeline settings (e.g. the workers of a stage, the checkpointed skill) refer to skills by name
+        names = [skill_config.get("name") for skill_config in self.config["indexer"]["skillset"]]
+        duplicates = sorted({name for name in names if name is not None and names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Skill names must be unique in the skillset, found duplicates: {', '.join(duplicates)}")
+        unknown = sorted(set(self.get_pipeline_config_dict().get("workers", {})) - set(names))
+        if unknown:
+            raise ValueError(f"Unknown skills in the pipeline workers: {', '.join(unknown)}")
 
     def is_valid(self):
         return not self._error
@@ -61,3 +72,6 @@ class Config:
             if "tracker" in self.config["indexer"]
             else None
         )
+
+    def get_pipeline_config_dict(self):
+        return self.config["indexer"].get("pipeline", {})
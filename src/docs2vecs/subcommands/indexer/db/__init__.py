@@ -1,3 +1,4 @@
 from .mongodb import MongoDbConnection
+from .sqlite import SQLiteConnection
 
-__all__ = ["MongoDbConnection"]
+__all__ = ["MongoDbConnection", "SQLiteConnection"]
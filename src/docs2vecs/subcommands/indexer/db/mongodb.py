@@ -1,26 +1,48 @@
+from typing import Iterable
 from typing import Optional
+from typing import Set
 
+import numpy as np
+from pymongo import ASCENDING
 from pymongo import MongoClient
 from pymongo import UpdateOne
 
 
 class MongoDbConnection:
+    # number of ids per $in query, keeps each query well under the 16 MB document limit
+    QUERY_BATCH_SIZE = 10_000
+
     def __init__(self, connection_string: str, db_name: str, col_name: str) -> None:
         self._client = MongoClient(connection_string)
         self._db = self._client[db_name]
         self._col = self._db[col_name]
+        # a no-op when the indexes exist already
+        self._col.create_index([("chunk.document_id", ASCENDING)])
+        self._col.create_index([("status.succeeded", ASCENDING)])
 
-    def get_documents(self, filter: Optional[dict] = None):
-        return self._col.find(filter)
+    def get_documents(self, filter: Optional[dict] = None, projection: Optional[dict] = None):
+        return self._col.find(filter, projection)
 
     def is_document_tracked(self, filter: Optional[dict] = None):
-        return self._col.count_documents(filter) > 0
+        return self._col.count_documents(filter, limit=1) > 0
+
+    def get_tracked_document_ids(self, document_ids: Iterable[str]) -> Set[str]:
+        document_ids = list(document_ids)
+        tracked_ids = set()
+        for start in range(0, len(document_ids), MongoDbConnection.QUERY_BATCH_SIZE):
+            cursor = self._col.find(
+                {"chunk.document_id": {"$in": document_ids[start : start + MongoDbConnection.QUERY_BATCH_SIZE]}},
+                {"chunk.document_id": 1, "_id": 0},
+            )
+            tracked_ids.update(doc["chunk"]["document_id"] for doc in cursor)
+        return tracked_ids
 
     def update_documents(self, doc_list: list, status_list: list):
         operations = [
             UpdateOne(
                 {"chunk.document_id": doc["document_id"]},
-                {"$set": {"chunk": doc, "status": {"succeeded": result.succeeded, "error_message": result.error_message}}},
+                # BSON has no array type for NumPy embeddings
+                {"$set": {"chunk": {**doc, "embedding": np.asarray(doc["embedding"]).tolist()}, "status": {"succeeded": result.succeeded, "error_message": result.error_message}}},
                 upsert=True,
             )
             for doc, result in zip(doc_list, status_list)
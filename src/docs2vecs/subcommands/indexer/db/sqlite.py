@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Set
+
+import numpy as np
+
+
+class SQLiteConnection:
+    """Tracker database stored in a local SQLite file, with the same interface as ``MongoDbConnection``.
+
+    Documents are rows keyed by chunk document id, holding the chunk as JSON, its embedding as a
+    float32 blob, and the status of its last upload. Filters are the subset of MongoDB filters used by the tracker: an exact
+    match on ``chunk.document_id`` and/or ``status.succeeded``.
+    """
+
+    # maximum number of parameters of a single SQLite statement
+    QUERY_BATCH_SIZE = 500
+    _FILTER_COLUMNS = {"chunk.document_id": "document_id", "status.succeeded": "succeeded"}
+
+    def __init__(self, path: str) -> None:
+        self._path = Path(path).expanduser().resolve()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # durable enough in WAL mode: a crash loses at most the last transactions, never corrupts the file
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, chunk TEXT NOT NULL, embedding BLOB, succeeded INTEGER NOT NULL, "
+            "error_message TEXT)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS documents_succeeded ON documents (succeeded)")
+        self._connection.commit()
+
+    def get_documents(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Iterator[dict]:
+        where, parameters = self._get_where_clause(filter)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"SELECT chunk, embedding, succeeded, error_message FROM documents{where}", parameters
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(SQLiteConnection.QUERY_BATCH_SIZE)
+            if not rows:
+                return
+            for chunk, embedding, succeeded, error_message in rows:
+                chunk = json.loads(chunk)
+                chunk["embedding"] = [] if embedding is None else np.frombuffer(embedding, dtype=np.float32)
+                yield {
+                    "chunk": chunk,
+                    "status": {"succeeded": bool(succeeded), "error_message": error_message},
+                }
+
+    def is_document_tracked(self, filter: Optional[dict] = None) -> bool:
+        where, parameters = self._get_where_clause(filter)
+        with self._lock:
+            return self._connection.execute(f"SELECT 1 FROM documents{where} LIMIT 1", parameters).fetchone() is not None
+
+    def get_tracked_document_ids(self, document_ids: Iterable[str]) -> Set[str]:
+        document_ids = list(document_ids)
+        tracked_ids = set()
+        with self._lock:
+            for start in range(0, len(document_ids), SQLiteConnection.QUERY_BATCH_SIZE):
+                batch = document_ids[start : start + SQLiteConnection.QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT document_id FROM documents WHERE document_id IN ({placeholders})", batch
+                )
+                tracked_ids.update(row[0] for row in rows)
+        return tracked_ids
+
+    def update_documents(self, doc_list: list, status_list: list):
+        rows = [
+            (
+                doc["document_id"],
+                # encoding the embedding as JSON would take most of the time
+                json.dumps({key: value for key, value in doc.items() if key != "embedding"}),
+                np.asarray(doc["embedding"], dtype=np.float32).tobytes() if len(doc["embedding"]) else None,
+                result.succeeded,
+                result.error_message,
+            )
+            for doc, result in zip(doc_list, status_list)
+        ]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", rows)
+            self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _get_where_clause(self, filter: Optional[dict]) -> tuple:
+        if not filter:
+            return "", []
+        unsupported = set(filter) - set(SQLiteConnection._FILTER_COLUMNS)
+        if unsupported:
+            raise ValueError(f"Unsupported filter on: {', '.join(sorted(unsupported))}")
+        conditions = " AND ".join(f"{SQLiteConnection._FILTER_COLUMNS[key]} = ?" for key in filter)
+        return f" WHERE {conditions}", list(filter.values())
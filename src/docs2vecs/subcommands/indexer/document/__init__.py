@@ -1,4 +1,5 @@
 from .chunk import Chunk
+from .chunk_batch import ChunkBatch
 from .document import Document
 
-__all__ = ["Chunk", "Document"]
+__all__ = ["Chunk", "ChunkBatch", "Document"]
@@ -1,7 +1,23 @@
+import numpy as np
+
+# shared by the chunks without embedding, read-only so that it cannot be modified through one of them
+_NO_EMBEDDING = np.empty(0, dtype=np.float32)
+_NO_EMBEDDING.flags.writeable = False
+
+
 class Chunk:
+    """A piece of a document, with its embedding.
+
+    Chunks are slotted, and their embedding is a float32 NumPy array: any list or array assigned to
+    ``embedding`` is converted, without a copy when it is a float32 array already, e.g. a row of the
+    embedding matrix of a batch. A chunk without embedding has an empty one.
+    """
+
+    __slots__ = ("document_id", "document_name", "tag", "content", "chunk_id", "source_link", "_embedding", "_hash")
+
     @classmethod
-    def FromDict(dict):
-        chunk = Chunk()
+    def FromDict(cls, dict):
+        chunk = cls()
         chunk.document_id = dict["document_id"]
         chunk.document_name = dict["document_name"]
         chunk.tag = dict["tag"]
@@ -18,14 +34,34 @@ class Chunk:
         self.content = None
         self.chunk_id = None
         self.source_link = None
-        self.embedding = []
+        self._embedding = _NO_EMBEDDING
         self._hash = None
 
+    @property
+    def embedding(self) -> np.ndarray:
+        return self._embedding
+
+    @embedding.setter
+    def embedding(self, embedding) -> None:
+        if embedding is None or len(embedding) == 0:
+            self._embedding = _NO_EMBEDDING
+        else:
+            self._embedding = np.asarray(embedding, dtype=np.float32)
+
     def __hash__(self):
         if self._hash is None:
             self._hash = hash(self.chunk_id)
         return self._hash
 
+    def __getstate__(self):
+        # the hash of a string differs from one process to another, it is not pickled
+        return {name: getattr(self, name) for name in Chunk.__slots__ if name != "_hash"}
+
+    def __setstate__(self, state):
+        self._hash = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __eq__(self, other):
         if not isinstance(other, Chunk):
             return NotImplemented
@@ -0,0 +1,209 @@
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document.chunk import Chunk
+
+
+class ChunkBatch:
+    """Columnar view of the chunks of a batch of documents.
+
+    The chunks are gathered in a single pass: their ids, contents and metadata become lists, and
+    their embeddings a single float32 matrix, ready to be handed to a vector store or an embedding
+    model. The chunks themselves are kept, so that embeddings computed for the batch can be
+    assigned back to them as views into the matrix of the batch, without a copy.
+
+    A batch converts to and from an Arrow table when ``pyarrow`` is installed (``arrow`` extra).
+    """
+
+    __slots__ = (
+        "chunks",
+        "chunk_ids",
+        "document_ids",
+        "document_names",
+        "contents",
+        "source_links",
+        "tags",
+        "embeddings",
+    )
+
+    COLUMNS = ("chunk_id", "document_id", "document_name", "content", "source_link", "tag")
+
+    def __init__(
+        self,
+        chunk_ids: List[str],
+        contents: List[str],
+        source_links: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        document_ids: Optional[List[str]] = None,
+        document_names: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        chunks: Optional[List[Chunk]] = None,
+    ) -> None:
+        count = len(chunk_ids)
+        self.chunk_ids = chunk_ids
+        self.contents = contents
+        self.source_links = source_links if source_links is not None else [None] * count
+        self.tags = tags if tags is not None else [None] * count
+        self.document_ids = document_ids if document_ids is not None else [None] * count
+        self.document_names = document_names if document_names is not None else [None] * count
+        # a batch without embeddings has a (count, 0) matrix
+        self.embeddings = embeddings if embeddings is not None else np.empty((count, 0), dtype=np.float32)
+        self.chunks = chunks
+
+    @classmethod
+    def from_documents(cls, documents: Iterable, unique: bool = False) -> "ChunkBatch":
+        """Gather the chunks of the documents, the tag of a chunk being the tag of its document.
+
+        Args:
+            documents: Documents whose chunks are gathered, deleted documents are skipped
+            unique: Whether only the first chunk of each chunk id is kept
+        """
+        chunks = []
+        tags = []
+        seen_ids = set()
+        for doc in documents:
+            if doc.deleted:
+                continue
+            for chunk in doc.chunks:
+                if unique:
+                    if chunk.chunk_id in seen_ids:
+                        continue
+                    seen_ids.add(chunk.chunk_id)
+                chunks.append(chunk)
+                tags.append(doc.tag)
+        return cls.from_chunks(chunks, tags)
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Chunk], tags: Optional[List[str]] = None) -> "ChunkBatch":
+        return cls(
+            chunk_ids=[chunk.chunk_id for chunk in chunks],
+            contents=[chunk.content for chunk in chunks],
+            source_links=[chunk.source_link for chunk in chunks],
+            tags=tags if tags is not None else [chunk.tag for chunk in chunks],
+            document_ids=[chunk.document_id for chunk in chunks],
+            document_names=[chunk.document_name for chunk in chunks],
+            embeddings=cls._stack_embeddings(chunks),
+            chunks=chunks,
+        )
+
+    @staticmethod
+    def _stack_embeddings(chunks: List[Chunk]) -> np.ndarray:
+        if not chunks or any(not len(chunk.embedding) for chunk in chunks):
+            return np.empty((len(chunks), 0), dtype=np.float32)
+        return np.stack([chunk.embedding for chunk in chunks])
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1]
+
+    def set_embeddings(self, embeddings) -> None:
+        """Set the embedding matrix of the batch, and the embedding of its chunks to views of its rows."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) != len(self):
+            raise ValueError(f"Expected {len(self)} embeddings, got an array of shape {embeddings.shape}")
+        self.embeddings = embeddings
+        if self.chunks is not None:
+            for chunk, embedding in zip(self.chunks, embeddings):
+                chunk.embedding = embedding
+
+    def take(self, indices: Sequence[int]) -> "ChunkBatch":
+        """Return a batch of the rows at the given indices."""
+        indices = list(indices)
+        return ChunkBatch(
+            chunk_ids=[self.chunk_ids[i] for i in indices],
+            contents=[self.contents[i] for i in indices],
+            source_links=[self.source_links[i] for i in indices],
+            tags=[self.tags[i] for i in indices],
+            document_ids=[self.document_ids[i] for i in indices],
+            document_names=[self.document_names[i] for i in indices],
+            embeddings=self.embeddings[indices],
+            chunks=[self.chunks[i] for i in indices] if self.chunks is not None else None,
+        )
+
+    def slice(self, start: int, stop: int) -> "ChunkBatch":
+        """Return a batch of the rows from ``start`` to ``stop``, whose embeddings are a view of this batch."""
+        return ChunkBatch(
+            chunk_ids=self.chunk_ids[start:stop],
+            contents=self.contents[start:stop],
+            source_links=self.source_links[start:stop],
+            tags=self.tags[start:stop],
+            document_ids=self.document_ids[start:stop],
+            document_names=self.document_names[start:stop],
+            embeddings=self.embeddings[start:stop],
+            chunks=self.chunks[start:stop] if self.chunks is not None else None,
+        )
+
+    def to_chunks(self) -> List[Chunk]:
+        """Return the chunks of the batch, created from its rows if the batch was not built from chunks."""
+        if self.chunks is None:
+            self.chunks = []
+            for i in range(len(self)):
+                chunk = Chunk()
+                chunk.chunk_id = self.chunk_ids[i]
+                chunk.document_id = self.document_ids[i]
+                chunk.document_name = self.document_names[i]
+                chunk.content = self.contents[i]
+                chunk.source_link = self.source_links[i]
+                chunk.tag = self.tags[i]
+                chunk.embedding = self.embeddings[i]
+                self.chunks.append(chunk)
+        return self.chunks
+
+    def to_arrow(self):
+        """Return the batch as an Arrow table, whose embedding column shares the memory of the matrix.
+
+        The embedding column is left out of batches without embeddings.
+        """
+        pa = import_pyarrow()
+        columns = {
+            name: pa.array(values, type=pa.string())
+            for name, values in zip(ChunkBatch.COLUMNS, self._get_string_columns())
+        }
+        if self.dimension:
+            embeddings = np.ascontiguousarray(self.embeddings)
+            columns["embedding"] = pa.FixedSizeListArray.from_arrays(pa.array(embeddings.reshape(-1)), self.dimension)
+        return pa.table(columns)
+
+    @classmethod
+    def from_arrow(cls, table) -> "ChunkBatch":
+        """Create a batch from an Arrow table, the embedding matrix being a view of its embedding column."""
+        import_pyarrow()
+        embeddings = None
+        if "embedding" in table.column_names:
+            embedding_column = table.column("embedding")
+            # combining chunks copies them even if there is only one, e.g. a record batch of a memory mapped file
+            embedding_column = (
+                embedding_column.chunk(0) if embedding_column.num_chunks == 1 else embedding_column.combine_chunks()
+            )
+            dimension = embedding_column.type.list_size
+            embeddings = embedding_column.flatten().to_numpy(zero_copy_only=True).reshape(-1, dimension)
+        string_columns = {name: table.column(name).to_pylist() for name in ChunkBatch.COLUMNS}
+        return cls(
+            chunk_ids=string_columns["chunk_id"],
+            document_ids=string_columns["document_id"],
+            document_names=string_columns["document_name"],
+            contents=string_columns["content"],
+            source_links=string_columns["source_link"],
+            tags=string_columns["tag"],
+            embeddings=embeddings,
+        )
+
+    def _get_string_columns(self):
+        return (self.chunk_ids, self.document_ids, self.document_names, self.contents, self.source_links, self.tags)
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as err:
+        raise ImportError(
+            "pyarrow is required to convert chunk batches to Arrow, install docs2vecs with the 'arrow' extra."
+        ) from err
+    return pyarrow
@@ -2,12 +2,16 @@ from docs2vecs.subcommands.indexer.document import Chunk
 
 
 class Document:
-    def __init__(self, filename: str, source_url: str = "", tag: str = "", text: str = ""):
+    __slots__ = ("filename", "source_url", "tag", "text", "chunks", "deleted")
+
+    def __init__(self, filename: str, source_url: str = "", tag: str = "", text: str = "", deleted: bool = False):
         self.filename: str = filename
         self.source_url: str = source_url
         self.tag = tag
         self.text: str = text
         self.chunks: set[Chunk] = set()
+        # marks a source that disappeared since the previous run, so that stores can drop its chunks
+        self.deleted: bool = deleted
 
     def add_chunk(self, chunk: Chunk):
         self.chunks.add(chunk)
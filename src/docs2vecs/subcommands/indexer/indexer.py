@@ -1,22 +1,151 @@
+from enum import StrEnum
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 from docs2vecs.subcommands.indexer import config as cfg_module
+from docs2vecs.subcommands.indexer.checkpoint import Checkpoint
+from docs2vecs.subcommands.indexer.checkpoint import CheckpointWriterSkill
+from docs2vecs.subcommands.indexer.checkpoint import ResumeFilterSkill
 from docs2vecs.subcommands.indexer.config import Config
+from docs2vecs.subcommands.indexer.pipeline import ConcurrentPipeline
 from docs2vecs.subcommands.indexer.skills.factory import SkillFactory
+from docs2vecs.subcommands.indexer.skills.factory import SkillType
+from docs2vecs.subcommands.indexer.skills.logger import get_logger
+
+
+class PipelineMode(StrEnum):
+    SEQUENTIAL = "sequential"
+    STREAMING = "streaming"
+    CONCURRENT = "concurrent"
 
 
 class Indexer:
-    def __init__(self, config: Config):
+    DEFAULT_BATCH_SIZE = 64
+    DEFAULT_QUEUE_SIZE = 4
+
+    def __init__(self, config: Config, resume: bool = False):
         self._config = config
+        self._pipeline_config = config.get_pipeline_config_dict()
+        self.logger = get_logger(self.__class__.__name__, log_file="logs/indexer_skills.log")
+        self._checkpoint = None
+        self._checkpoint_stage = None
+        self._init_checkpoint(resume)
+
+    def _init_checkpoint(self, resume: bool):
+        checkpoint_config = self._pipeline_config.get("checkpoint")
+        if not checkpoint_config:
+            if resume:
+                raise ValueError("Resuming a run requires a checkpoint in the pipeline configuration")
+            return
+
+        skill_config_dicts = list(self._config.get_skills_config_dict())
+        skill_names = [skill_config_dict["name"] for skill_config_dict in skill_config_dicts]
+        if "after" in checkpoint_config:
+            if checkpoint_config["after"] not in skill_names:
+                raise ValueError(f"Unknown skill to checkpoint: {checkpoint_config['after']}")
+            self._checkpoint_stage = skill_names.index(checkpoint_config["after"])
+        else:
+            # by default, the last stage before the documents are stored, e.g. the embeddings
+            skill_types = [skill_config_dict["type"] for skill_config_dict in skill_config_dicts]
+            first_store = skill_types.index(SkillType.VECTOR_STORE) if SkillType.VECTOR_STORE in skill_types else None
+            last_stage = len(skill_types) if first_store is None else first_store
+            self._checkpoint_stage = max(0, last_stage - 1)
+
+        self._checkpoint = Checkpoint(
+            checkpoint_config["path"], Checkpoint.get_config_key(skill_config_dicts), resume
+        )
+        if self._checkpoint.completed_documents:
+            self.logger.info(
+                f"Resuming from the checkpoint of {skill_names[self._checkpoint_stage]}: "
+                f"{len(self._checkpoint.completed_documents)} documents already processed"
+            )
 
     def run(self):
+        mode = PipelineMode(self._pipeline_config.get("mode", PipelineMode.SEQUENTIAL))
+        if mode == PipelineMode.STREAMING:
+            self._run_streaming()
+        elif mode == PipelineMode.CONCURRENT:
+            self._run_concurrent()
+        else:
+            self._run_sequential()
+
+    def _run_sequential(self):
         output = None
-        for skill_config_dict in self._config.get_skills_config_dict():
-            skill = SkillFactory.get_skill(skill_config_dict, self._config)
+        skills = self._get_skills()
+        for skill in skills:
             output = skill.run(output)
 
+        self._finalize(skills)
+
+    def _run_streaming(self):
+        """Chain the skills as generators so that only a bounded batch of documents
+        is held per stage, and results reach the last skill as soon as the first batch is ready."""
+        batch_size = self._pipeline_config.get("batch_size", Indexer.DEFAULT_BATCH_SIZE)
+        skills = self._get_skills()
+
+        stream = iter([None])
+        for skill in skills:
+            stream = skill.run_stream(stream, batch_size)
+
+        batch_count = 0
+        document_count = 0
+        for batch in stream:
+            batch_count += 1
+            document_count += len(batch)
+            self.logger.debug(f"Batch {batch_count} went through the pipeline ({len(batch)} documents)")
+
+        self.logger.info(f"Streamed {document_count} documents in {batch_count} batches")
+        self._finalize(skills)
+
+    def _run_concurrent(self):
+        """Run every skill on its own worker thread(s), connected by bounded queues of batches,
+        so that I/O, parsing, embedding and uploads overlap."""
+        skill_config_dicts = list(self._config.get_skills_config_dict())
+        stage_workers = self._pipeline_config.get("workers", {})
+        workers = [stage_workers.get(skill_config_dict["name"], 1) for skill_config_dict in skill_config_dicts]
+        workers = self._insert_checkpoint_stages(workers, 1, 1)
+
+        skills = self._get_skills()
+        pipeline = ConcurrentPipeline(
+            skills=skills,
+            workers=workers,
+            batch_size=self._pipeline_config.get("batch_size", Indexer.DEFAULT_BATCH_SIZE),
+            queue_size=self._pipeline_config.get("queue_size", Indexer.DEFAULT_QUEUE_SIZE),
+            logger=self.logger,
+        )
+        document_count = pipeline.run()
+
+        self.logger.info(f"Processed {document_count} documents concurrently")
+        self._finalize(skills)
+
+    def _finalize(self, skills):
+        for skill in skills:
+            skill.finalize()
+        if self._checkpoint:
+            self._checkpoint.clear()
+
+    def _get_skills(self):
+        skills = [
+            SkillFactory.get_skill(skill_config_dict, self._config)
+            for skill_config_dict in self._config.get_skills_config_dict()
+        ]
+        if self._checkpoint:
+            skills = self._insert_checkpoint_stages(
+                skills, ResumeFilterSkill(self._checkpoint), CheckpointWriterSkill(self._checkpoint)
+            )
+        return skills
+
+    def _insert_checkpoint_stages(self, stages: list, resume_filter, checkpoint_writer) -> list:
+        """Insert the stages filtering out the checkpointed documents, after the source of the skillset,
+        and saving the output of the checkpointed stage."""
+        if not self._checkpoint:
+            return stages
+        stages = list(stages)
+        stages.insert(self._checkpoint_stage + 1, checkpoint_writer)
+        stages.insert(1, resume_filter)
+        return stages
+
 
 def does_file_exist(file_path: str) -> bool:
     file_path = Path(file_path).expanduser().resolve()
@@ -37,5 +166,9 @@ def run_indexer(args):
 
     config_schema = Path(cfg_module.__file__).parent / "config_schema.yaml"
     config = Config(args.config, config_schema)
-    indexer = Indexer(config)
+    if args.resume and not config.get_pipeline_config_dict().get("checkpoint"):
+        print("Error: --resume requires a checkpoint in the pipeline configuration!")
+        return 1
+
+    indexer = Indexer(config, resume=args.resume)
     indexer.run()
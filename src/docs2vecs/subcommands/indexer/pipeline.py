@@ -0,0 +1,125 @@
+import queue
+import threading
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+
+# marks the end of the stream in a stage queue, one is sent per downstream worker
+_END_OF_STREAM = object()
+
+
+class ConcurrentPipeline:
+    """Runs every skill of a skillset on its own worker thread(s).
+
+    Consecutive stages are connected by bounded queues of document batches, so a
+    slow stage applies backpressure on the previous ones instead of letting
+    batches pile up in memory. The first skill is the source of the stream and
+    always runs on a single worker. The workers of a stage share its skill instance,
+    so only skills allowing ``CONCURRENT_WORKERS`` can have more than one.
+    """
+
+    _POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        skills: List[IndexerSkill],
+        workers: List[int],
+        batch_size: int,
+        queue_size: int,
+        logger,
+    ) -> None:
+        for skill, count in zip(skills, workers):
+            if count > 1 and not skill.CONCURRENT_WORKERS:
+                raise ValueError(
+                    f"{skill.__class__.__name__} keeps state across batches and cannot run on {count} workers"
+                )
+        self._skills = skills
+        self._workers = [1] + [max(1, count) for count in workers[1:]]
+        self._batch_size = batch_size
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in skills]
+        self._remaining_workers = list(self._workers)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.logger = logger
+
+    def run(self) -> int:
+        """Run the pipeline until the source is exhausted.
+
+        Returns:
+            The number of documents that went through the last skill.
+
+        Raises:
+            The first exception raised by any of the skills.
+        """
+        threads = []
+        for stage, skill in enumerate(self._skills):
+            for worker in range(self._workers[stage]):
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(stage,),
+                    name=f"{skill.__class__.__name__}-{worker}",
+                    daemon=True,
+                )
+                threads.append(thread)
+                thread.start()
+
+        document_count = 0
+        for batch in self._iter_queue(self._queues[-1]):
+            document_count += len(batch)
+
+        for thread in threads:
+            thread.join()
+
+        if self._error:
+            raise self._error
+
+        return document_count
+
+    def _run_worker(self, stage: int) -> None:
+        skill = self._skills[stage]
+        batches = iter([None]) if stage == 0 else self._iter_queue(self._queues[stage - 1])
+        out_queue = self._queues[stage]
+        try:
+            for batch in skill.run_stream(batches, self._batch_size):
+                if not self._put(out_queue, batch):
+                    break
+        except BaseException as error:
+            self.logger.error(f"{skill.__class__.__name__} failed: {error}")
+            if self._error is None:
+                self._error = error
+            self._stop.set()
+        finally:
+            self._finish_worker(stage)
+
+    def _finish_worker(self, stage: int) -> None:
+        with self._lock:
+            self._remaining_workers[stage] -= 1
+            last_worker = self._remaining_workers[stage] == 0
+
+        if last_worker:
+            downstream_workers = self._workers[stage + 1] if stage + 1 < len(self._skills) else 1
+            for _ in range(downstream_workers):
+                self._put(self._queues[stage], _END_OF_STREAM)
+
+    def _iter_queue(self, in_queue: queue.Queue) -> Iterator[List[Document]]:
+        while not self._stop.is_set():
+            try:
+                batch = in_queue.get(timeout=self._POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if batch is _END_OF_STREAM:
+                return
+            yield batch
+
+    def _put(self, out_queue: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
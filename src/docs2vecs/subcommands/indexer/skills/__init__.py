@@ -13,6 +13,8 @@ from .file_scanner_skill import FileScannerSkill
 from .llama_fastembed_embedding_skill import LlamaFastembedEmbeddingSkill
 from .local_document_parser import LocalDocumentParser
 from .faiss_vector_store_skill import FaissVectorStoreSkill
+from .arrow_vector_store_skill import ArrowVectorStoreSkill
+from .arrow_loader_skill import ArrowLoaderSkill
 
 
 __all__ = [
@@ -31,4 +33,6 @@ __all__ = [
     "LlamaFastembedEmbeddingSkill",
     "LocalDocumentParser",
     "FaissVectorStoreSkill",
+    "ArrowVectorStoreSkill",
+    "ArrowLoaderSkill",
 ]
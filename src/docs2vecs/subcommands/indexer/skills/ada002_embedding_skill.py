@@ -1,24 +1,105 @@
-from typing import List, Optional
-
-from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 
 from docs2vecs.subcommands.indexer.config import Config
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import ChunkBatch
 from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import RateLimitedAzureOpenAIEmbedding
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import estimate_tokens
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import get_rate_limiter
+from docs2vecs.subcommands.indexer.skills.embedding_cache import EmbeddingCache
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 
 
 class AzureAda002EmbeddingSkill(IndexerSkill):
+    """Embeds chunks with an embedding model deployed in Azure OpenAI.
+
+    A single client is shared by all the requests. Chunks of all the input documents are
+    grouped into multi-input requests, several of which are in flight at the same time.
+    Requests are rate limited by the limiter shared by all the skills calling the same deployment.
+
+    Configuration parameters:
+    - batch_size (int): Maximum number of chunks per request (the API accepts up to 2048)
+    - max_batch_tokens (int): Maximum estimated number of tokens per request
+    - max_concurrency (int): Maximum number of requests in flight
+    - tokens_per_minute (int): Tokens-per-minute quota of the deployment
+    - requests_per_minute (int): Requests-per-minute quota of the deployment
+    - max_retries (int): Maximum number of retries of a throttled request
+    - cache_path (str): Path of the embedding cache file. Embeddings are not cached if missing
+    - cache_max_entries (int): Maximum number of embeddings kept in the cache
+    """
+
+    CONCURRENT_WORKERS = True
+    MAX_BATCH_SIZE = 2048
+    DEFAULT_MAX_BATCH_TOKENS = 300_000
+    DEFAULT_MAX_CONCURRENCY = 4
+    DEFAULT_MAX_RETRIES = 10
+
     def __init__(self, config: dict, global_config: Config):
         super().__init__(config, global_config)
-
-    def az_ada002_embeddings(self, content: str):
-        embed_model = AzureOpenAIEmbedding(
+        self._set_config_defaults()
+        rate_limiter = get_rate_limiter(
+            self._config["endpoint"],
+            self._config["deployment_name"],
+            tokens_per_minute=self._config.get("tokens_per_minute"),
+            requests_per_minute=self._config.get("requests_per_minute"),
+            max_concurrency=self._config["max_concurrency"],
+            max_retries=self._config.get("max_retries", AzureAda002EmbeddingSkill.DEFAULT_MAX_RETRIES),
+            logger=self.logger,
+        )
+        self._embed_model = RateLimitedAzureOpenAIEmbedding(
+            rate_limiter=rate_limiter,
             deployment_name=self._config["deployment_name"],
             api_key=self._config["api_key"],
             azure_endpoint=self._config["endpoint"],
             api_version=self._config["api_version"],
+            embed_batch_size=self._config["batch_size"],
         )
-        return embed_model.get_query_embedding(content)
+        self._embedding_cache = (
+            EmbeddingCache(
+                self._config["cache_path"],
+                self._config.get("cache_max_entries", EmbeddingCache.DEFAULT_MAX_ENTRIES),
+            )
+            if self._config.get("cache_path")
+            else None
+        )
+        self._cache_model_key = f"azure:{self._config['endpoint']}/{self._config['deployment_name']}"
+
+    def _set_config_defaults(self):
+        max_batch_size = AzureAda002EmbeddingSkill.MAX_BATCH_SIZE
+        self._config["batch_size"] = min(max(1, self._config.get("batch_size", max_batch_size)), max_batch_size)
+        self._config["max_batch_tokens"] = self._config.get(
+            "max_batch_tokens", AzureAda002EmbeddingSkill.DEFAULT_MAX_BATCH_TOKENS
+        )
+        self._config["max_concurrency"] = self._config.get(
+            "max_concurrency", AzureAda002EmbeddingSkill.DEFAULT_MAX_CONCURRENCY
+        )
+
+    def az_ada002_embeddings(self, content: str):
+        return self._embed_model.get_query_embedding(content)
+
+    def _make_batches(self, chunks: List[Chunk]) -> Iterator[List[Chunk]]:
+        batch = []
+        batch_tokens = 0
+        for chunk in chunks:
+            tokens = estimate_tokens(chunk.content)
+            if batch and (
+                len(batch) >= self._config["batch_size"] or batch_tokens + tokens > self._config["max_batch_tokens"]
+            ):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(chunk)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch: List[Chunk]) -> int:
+        chunk_batch = ChunkBatch.from_chunks(batch)
+        # the embeddings of the chunks are views into a single float32 matrix per batch
+        chunk_batch.set_embeddings(self._embed_model.get_text_embedding_batch(chunk_batch.contents))
+        return len(batch)
 
     def run(self, input: Optional[List[Document]] = None) -> Optional[List[Document]]:
         self.logger.info(
@@ -32,14 +113,28 @@ class AzureAda002EmbeddingSkill(IndexerSkill):
             f"Processing a total of documents: {docs_count}. Total number of chunks: {chunks_count}"
         )
 
+        chunks = []
         for doc in input:
             self.logger.debug(f"Processing document: {doc.filename}")
             for chunk in doc.chunks:
-                self.logger.debug(f"Creating embedding for chunk: {chunk.chunk_id}")
-                chunk.embedding = (
-                    ""
-                    if not chunk.content
-                    else self.az_ada002_embeddings(chunk.content)
-                )
+                if chunk.content:
+                    chunks.append(chunk)
+                else:
+                    chunk.embedding = ""
+
+        if self._embedding_cache:
+            chunks = self._embedding_cache.load_embeddings(self._cache_model_key, chunks)
+
+        embedded_count = 0
+        with ThreadPoolExecutor(max_workers=self._config["max_concurrency"]) as executor:
+            for batch_count in executor.map(self._embed_batch, self._make_batches(chunks)):
+                embedded_count += batch_count
+                self.logger.debug(f"Created embeddings for {embedded_count}/{len(chunks)} chunks")
+
+        if self._embedding_cache:
+            self._embedding_cache.save_embeddings(self._cache_model_key, chunks)
+            self.logger.info(
+                f"Embedding cache: {self._embedding_cache.hits} hits, {self._embedding_cache.misses} misses"
+            )
 
         return input
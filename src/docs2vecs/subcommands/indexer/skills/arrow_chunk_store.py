@@ -0,0 +1,107 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from docs2vecs.subcommands.indexer.document.chunk_batch import ChunkBatch
+from docs2vecs.subcommands.indexer.document.chunk_batch import import_pyarrow
+
+
+class ArrowChunkStore:
+    """Chunks and their embeddings, in a folder of Parquet or Arrow IPC files.
+
+    Every write adds a ``part-<n>`` file holding the columns of a ``ChunkBatch``, the embeddings
+    being a fixed size list column of float32. A part file is written to a temporary file first,
+    so that a folder only ever holds complete parts.
+
+    Parts are read back one record batch (Arrow) or row group (Parquet) at a time, so that memory
+    is bounded by ``rows_per_batch`` whatever the size of the folder. Arrow files are memory
+    mapped: the embedding matrix of a batch read from them is a read-only view of the file,
+    without a copy. Parquet files are smaller, but are decoded when read.
+    """
+
+    FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+    DEFAULT_FORMAT = "parquet"
+    DEFAULT_ROWS_PER_BATCH = 10_000
+
+    def __init__(
+        self,
+        path: str,
+        format: str = DEFAULT_FORMAT,
+        compression: Optional[str] = None,
+        rows_per_batch: int = DEFAULT_ROWS_PER_BATCH,
+    ) -> None:
+        if format not in ArrowChunkStore.FORMATS:
+            raise ValueError(f"Unknown chunk file format: {format}, expected one of {', '.join(ArrowChunkStore.FORMATS)}")
+        self._path = Path(path).expanduser().resolve()
+        self._format = format
+        self._compression = compression
+        self._rows_per_batch = rows_per_batch
+        self._lock = threading.Lock()
+        self._next_part = None
+
+    @staticmethod
+    def list_files(path: str) -> List[Path]:
+        """Return the part files of the folder, of either format, in the order they were written."""
+        path = Path(path).expanduser().resolve()
+        if not path.is_dir():
+            return []
+        return sorted(
+            file
+            for file in path.iterdir()
+            if file.name.startswith("part-") and file.suffix in ArrowChunkStore.FORMATS.values()
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._path.exists():
+                shutil.rmtree(self._path)
+            self._next_part = 0
+
+    def write(self, batch: ChunkBatch) -> Optional[Path]:
+        """Write the batch to a new part file and return its path, nothing being written for an empty batch."""
+        if not len(batch):
+            return None
+        with self._lock:
+            if self._next_part is None:
+                self._next_part = len(ArrowChunkStore.list_files(self._path))
+            part_file = self._path / f"part-{self._next_part:06d}{ArrowChunkStore.FORMATS[self._format]}"
+            self._next_part += 1
+        self._path.mkdir(parents=True, exist_ok=True)
+
+        table = batch.to_arrow()
+        tmp_file = part_file.with_name(part_file.name + ".tmp")
+        if self._format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(
+                table, tmp_file, row_group_size=self._rows_per_batch, compression=self._compression or "snappy"
+            )
+        else:
+            pa = import_pyarrow()
+            options = pa.ipc.IpcWriteOptions(compression=self._compression)
+            with pa.OSFile(str(tmp_file), "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table, max_chunksize=self._rows_per_batch)
+        os.replace(tmp_file, part_file)
+        return part_file
+
+    @staticmethod
+    def read(path: str, memory_map: bool = True) -> Iterator[ChunkBatch]:
+        """Yield the chunks of the folder one record batch or row group at a time."""
+        pa = import_pyarrow()
+        for part_file in ArrowChunkStore.list_files(path):
+            if part_file.suffix == ArrowChunkStore.FORMATS["arrow"]:
+                source = pa.memory_map(str(part_file)) if memory_map else pa.OSFile(str(part_file))
+                with source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        yield ChunkBatch.from_arrow(pa.Table.from_batches([reader.get_batch(i)]))
+            else:
+                import pyarrow.parquet as pq
+
+                with pq.ParquetFile(part_file, memory_map=memory_map) as reader:
+                    for i in range(reader.num_row_groups):
+                        yield ChunkBatch.from_arrow(reader.read_row_group(i))
@@ -0,0 +1,75 @@
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from docs2vecs.subcommands.indexer.config.config import Config
+from docs2vecs.subcommands.indexer.document.chunk_batch import ChunkBatch
+from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.arrow_chunk_store import ArrowChunkStore
+from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+from docs2vecs.subcommands.indexer.skills.skill import batched
+
+
+class ArrowLoaderSkill(IndexerSkill):
+    """Loads the chunks written by the ``arrow-store`` skill, embeddings included.
+
+    The consecutive chunks of a document become the chunks of a single document again, even when
+    they span several row groups or record batches, so that they can be passed to a vector store
+    skill as if they had just been embedded. In streaming mode, files are read one record batch or
+    row group at a time, and memory mapped Arrow files back the embeddings of the chunks without a
+    copy.
+
+    Configuration parameters:
+    - path (str): Folder of the part files
+    - memory_map (bool): Whether the files are memory mapped rather than read. Defaults to true
+    """
+
+    def __init__(self, config: dict, global_config: Config) -> None:
+        super().__init__(config, global_config)
+        self._path = self._config["path"]
+        self._memory_map = self._config.get("memory_map", True)
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        self.logger.info(f"Running ArrowLoaderSkill on {self._path}...")
+
+        documents = list(self._iter_documents())
+        self.logger.debug(f"Loaded {len(documents)} documents")
+        return documents
+
+    def run_stream(
+        self, batches: Iterable[Optional[List[Document]]], batch_size: int
+    ) -> Iterator[List[Document]]:
+        """Yield the documents of the files in batches, as the files are read."""
+        self.logger.info(f"Running ArrowLoaderSkill on {self._path} in streaming mode...")
+
+        yield from batched(self._iter_documents(), batch_size)
+
+    def _read(self) -> Iterator[ChunkBatch]:
+        if not ArrowChunkStore.list_files(self._path):
+            raise ValueError(f"No chunk files found in {self._path}")
+        return ArrowChunkStore.read(self._path, memory_map=self._memory_map)
+
+    def _iter_documents(self) -> Iterator[Document]:
+        """Yield a document per run of consecutive chunks of the same document, once its last chunk is read.
+
+        The chunks of a document may span several record batches or row groups, and files.
+        """
+        document = None
+        document_key = None
+        for batch in self._read():
+            for row, chunk in enumerate(batch.to_chunks()):
+                # the document id of a chunk identifies its content, not the document it belongs to
+                key = (batch.document_names[row], batch.source_links[row], batch.tags[row])
+                if document is None or key != document_key:
+                    if document is not None:
+                        yield document
+                    document_key = key
+                    document = Document(
+                        filename=batch.document_names[row] or batch.source_links[row],
+                        source_url=batch.source_links[row],
+                        tag=batch.tags[row],
+                    )
+                document.add_chunk(chunk)
+        if document is not None:
+            yield document
@@ -0,0 +1,46 @@
+from typing import List
+from typing import Optional
+
+from docs2vecs.subcommands.indexer.config.config import Config
+from docs2vecs.subcommands.indexer.document.chunk_batch import ChunkBatch
+from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.arrow_chunk_store import ArrowChunkStore
+from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+
+
+class ArrowVectorStoreSkill(IndexerSkill):
+    """Writes the chunks of the input documents and their embeddings to Parquet or Arrow IPC files.
+
+    Each run writes the chunks of its input to a new part file of the ``path`` folder (see
+    ``ArrowChunkStore``), which the ``arrow-loader`` skill reads back. This splits an embedding run
+    from the runs loading its output into vector stores, which do not embed the chunks again.
+    Deleted documents are skipped.
+
+    Configuration parameters:
+    - path (str): Folder of the part files, created if missing
+    - format (str): parquet or arrow. Defaults to parquet
+    - compression (str): Compression codec of the files, e.g. zstd or lz4. Defaults to snappy for parquet
+      and none for arrow, whose uncompressed files are read without a copy
+    - rows_per_batch (int): Number of chunks per row group or record batch, i.e. read at a time. Defaults to 10000
+    - overwrite_index (bool): Whether the files of a previous run are deleted, rather than added to. Defaults to false
+    """
+
+    def __init__(self, config: dict, global_config: Config) -> None:
+        super().__init__(config, global_config)
+        self._store = ArrowChunkStore(
+            self._config["path"],
+            format=self._config.get("format", ArrowChunkStore.DEFAULT_FORMAT),
+            compression=self._config.get("compression"),
+            rows_per_batch=self._config.get("rows_per_batch", ArrowChunkStore.DEFAULT_ROWS_PER_BATCH),
+        )
+        if self._config.get("overwrite_index", False):
+            self._store.clear()
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        self.logger.info("Running ArrowVectorStoreSkill...")
+
+        batch = ChunkBatch.from_documents(input)
+        part_file = self._store.write(batch)
+        if part_file:
+            self.logger.debug(f"Wrote {len(batch)} chunks to {part_file}")
+        return input
@@ -53,6 +53,9 @@ class AzureBlobStoreUploaderSkill(IndexerSkill):
         print("Running AzureBlobStoreUploaderSkill")
 
         for doc in input:
+            # the file of a deleted document is gone, there is nothing to upload
+            if doc.deleted:
+                continue
             self.upload_document(doc)
 
         return input
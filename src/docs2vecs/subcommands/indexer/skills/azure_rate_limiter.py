@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TypeVar
+
+import openai
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
+from llama_index.embeddings.openai.base import get_embedding
+from llama_index.embeddings.openai.base import get_embeddings
+
+T = TypeVar("T")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of an English text, about 4 characters per token, without loading a tokenizer."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Azure OpenAI enforces its per-minute quotas over 10 second windows, so the bucket
+    only allows bursts of a sixth of the per-minute budget.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.per_minute = per_minute
+        self._rate = per_minute / 60.0
+        self._capacity = max(1.0, per_minute / 6.0)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        """Block until ``amount`` tokens are available and take them."""
+        amount = min(amount, self._capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of calls in flight, adjusting the limit with AIMD.
+
+    The limit grows by one every ``limit`` successful calls (additive increase) and is
+    halved every time a call gets throttled (multiplicative decrease).
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1) -> None:
+        self._max_concurrency = max_concurrency
+        self._min_concurrency = min(min_concurrency, max_concurrency)
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def set_max_concurrency(self, max_concurrency: int) -> None:
+        with self._condition:
+            self._max_concurrency = max_concurrency
+            self._min_concurrency = min(self._min_concurrency, max_concurrency)
+            self._limit = float(max_concurrency)
+            self._condition.notify_all()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(self._min_concurrency, self._limit / 2)
+            else:
+                self._limit = min(self._max_concurrency, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+class AzureRateLimiter:
+    """Client-side rate limiting of the calls made to an Azure OpenAI deployment.
+
+    Calls go through optional requests-per-minute and tokens-per-minute buckets and an
+    adaptive concurrency limit. A throttled call (HTTP 429) pauses every caller for the
+    duration requested by the ``Retry-After`` header, then is retried.
+
+    The limiter of a deployment is shared by all the skills calling it, each of which may set
+    its own limits: they are merged, see ``merge``.
+    """
+
+    MAX_BACKOFF = 60
+    DEFAULT_MAX_CONCURRENCY = 4
+    DEFAULT_MAX_RETRIES = 10
+
+    def __init__(
+        self,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._tokens = None
+        self._requests = None
+        self.concurrency = AdaptiveConcurrencyLimiter(AzureRateLimiter.DEFAULT_MAX_CONCURRENCY)
+        self._max_concurrency = None
+        self._max_retries = None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.merge(tokens_per_minute, requests_per_minute, max_concurrency, max_retries)
+
+    @property
+    def tokens_per_minute(self) -> Optional[int]:
+        return self._tokens.per_minute if self._tokens else None
+
+    @property
+    def requests_per_minute(self) -> Optional[int]:
+        return self._requests.per_minute if self._requests else None
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency or AzureRateLimiter.DEFAULT_MAX_CONCURRENCY
+
+    @property
+    def max_retries(self) -> int:
+        return self._max_retries if self._max_retries is not None else AzureRateLimiter.DEFAULT_MAX_RETRIES
+
+    def merge(
+        self,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ) -> None:
+        """Merge the limits set by another caller of the deployment into the limits of the limiter.
+
+        The strictest of the per-minute quotas and concurrency limits set by the callers applies, as
+        they share the quota of the deployment, and the highest number of retries. Limits a caller
+        does not set are left unchanged.
+        """
+        with self._lock:
+            if tokens_per_minute and (self._tokens is None or tokens_per_minute < self._tokens.per_minute):
+                self._tokens = TokenBucket(tokens_per_minute)
+            if requests_per_minute and (self._requests is None or requests_per_minute < self._requests.per_minute):
+                self._requests = TokenBucket(requests_per_minute)
+            if max_concurrency and (self._max_concurrency is None or max_concurrency < self._max_concurrency):
+                self._max_concurrency = max_concurrency
+                self.concurrency.set_max_concurrency(max_concurrency)
+            if max_retries is not None and (self._max_retries is None or max_retries > self._max_retries):
+                self._max_retries = max_retries
+
+    def call(self, fn: Callable[[], T], tokens: int = 1) -> T:
+        """Call ``fn`` once the rate limits allow a request of ``tokens`` tokens, retrying it when throttled."""
+        max_retries = self.max_retries
+        for attempt in range(max_retries + 1):
+            self._wait_for_pause()
+            requests, tokens_bucket = self._requests, self._tokens
+            if requests:
+                requests.acquire(1)
+            if tokens_bucket:
+                tokens_bucket.acquire(tokens)
+
+            self.concurrency.acquire()
+            throttled = False
+            try:
+                return fn()
+            except openai.RateLimitError as error:
+                throttled = True
+                if attempt == max_retries:
+                    raise
+                delay = self._get_retry_delay(error, attempt)
+                self.logger.warning(
+                    f"Request throttled, retrying in {delay:.1f}s (concurrency limit: {self.concurrency.limit})"
+                )
+                self._pause(delay)
+            finally:
+                self.concurrency.release(throttled)
+
+    def _get_retry_delay(self, error: openai.RateLimitError, attempt: int) -> float:
+        headers = error.response.headers if error.response is not None else {}
+        for header, unit in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            try:
+                return float(headers[header]) * unit
+            except (KeyError, ValueError):
+                continue
+        return min(AzureRateLimiter.MAX_BACKOFF, 2**attempt)
+
+    def _pause(self, delay: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _wait_for_pause(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiters: Dict[tuple, AzureRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    endpoint: str,
+    deployment_name: str,
+    logger: Optional[logging.Logger] = None,
+    **limits: Any,
+) -> AzureRateLimiter:
+    """Return the rate limiter of a deployment, shared by all the skills calling it.
+
+    The limits of every caller are merged into the limits of the shared limiter (see
+    ``AzureRateLimiter.merge``), whichever skill is created first.
+    """
+    key = (endpoint, deployment_name)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = AzureRateLimiter(logger=logger, **limits)
+        else:
+            _rate_limiters[key].merge(**limits)
+        return _rate_limiters[key]
+
+
+class RateLimitedAzureOpenAIEmbedding(AzureOpenAIEmbedding):
+    """AzureOpenAIEmbedding whose requests go through an ``AzureRateLimiter``."""
+
+    _rate_limiter: AzureRateLimiter = PrivateAttr()
+
+    def __init__(self, rate_limiter: AzureRateLimiter, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._rate_limiter = rate_limiter
+
+    def _get_credential_kwargs(self, is_async: bool = False) -> Dict[str, Any]:
+        credential_kwargs = super()._get_credential_kwargs(is_async)
+        # retries are made by the rate limiter, so that throttling is seen by every caller
+        credential_kwargs["max_retries"] = 0
+        return credential_kwargs
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._rate_limiter.call(
+            lambda: get_embedding(self._get_client(), query, engine=self._query_engine, **self.additional_kwargs),
+            estimate_tokens(query),
+        )
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._rate_limiter.call(
+            lambda: get_embedding(self._get_client(), text, engine=self._text_engine, **self.additional_kwargs),
+            estimate_tokens(text),
+        )
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._rate_limiter.call(
+            lambda: get_embeddings(self._get_client(), texts, engine=self._text_engine, **self.additional_kwargs),
+            sum(estimate_tokens(text) for text in texts),
+        )
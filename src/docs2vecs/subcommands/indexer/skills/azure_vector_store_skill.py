@@ -1,9 +1,17 @@
-from typing import List, Optional
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Iterator, List, Optional
 
+import numpy as np
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import ResourceNotFoundError
 from azure.identity import DefaultAzureCredential
 from azure.search.documents import SearchClient
 from azure.search.documents.indexes import SearchIndexClient
+from azure.search.documents.indexes.models import SearchAlias
 from azure.search.documents.models import IndexingResult
 
 from docs2vecs.subcommands.indexer.config import Config
@@ -14,6 +22,38 @@ from docs2vecs.subcommands.indexer.skills.tracker import VectorStoreTracker
 
 
 class AzureVectorStoreSkill(IndexerSkill):
+    """Uploads chunks to an Azure AI Search index.
+
+    Chunks are uploaded in batches limited both in number of documents and in payload size,
+    several of which are in flight at the same time. Documents that fail with a transient
+    error (e.g. 503) are uploaded again, without the rest of their batch.
+
+    With ``overwrite_index``, the documents of the index are deleted page by page before the
+    first upload. With ``blue_green`` as well, ``index_name`` is an alias instead: the documents
+    are uploaded to a new copy of the index it points to, and the alias is switched to the copy
+    once every skill ran successfully, so that the index is never seen empty or half-built.
+
+    Configuration parameters:
+    - batch_size (int): Maximum number of documents per request (the API accepts up to 1000)
+    - max_batch_bytes (int): Maximum (estimated) payload size of a request
+    - max_concurrency (int): Maximum number of requests in flight
+    - max_retries (int): Maximum number of times a failed document is uploaded again
+    - blue_green (bool): Whether an overwrite run builds a new index and switches the ``index_name`` alias to it
+    """
+
+    MAX_BATCH_SIZE = 1000
+    # Azure AI Search rejects requests over 16 MB
+    DEFAULT_MAX_BATCH_BYTES = 15 * 1024 * 1024
+    DEFAULT_MAX_CONCURRENCY = 4
+    DEFAULT_MAX_RETRIES = 5
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 30.0
+    # per-document status codes worth retrying, as documented for the index documents API
+    RETRYABLE_STATUS_CODES = (409, 422, 429, 503)
+    # Azure AI Search cannot skip more than 100000 search results, larger indexes are cleaned up in rounds
+    CLEANUP_ROUND_SIZE = 100_000
+    BLUE_GREEN_SUFFIXES = ("-blue", "-green")
+
     def __init__(
         self,
         config: dict,
@@ -23,25 +63,36 @@ class AzureVectorStoreSkill(IndexerSkill):
         super().__init__(config, global_config)
         self._vector_store_tracker = vector_store_tracker
         self._overwrite_index = self._config.get("overwrite_index", False)
+        # in streaming mode run() is called once per batch, the index must only be cleaned up before the first one
+        self._index_cleaned_up = False
+        # the chunks whose previous upload failed are uploaded again with the first batch only
+        self._failed_documents_retried = False
 
-        az_credential = (
+        self._credential = (
             AzureKeyCredential(self._config.get("api_key", ""))
             if self._config.get("api_key", "")
             else DefaultAzureCredential()
         )
-        self._search_client = SearchClient(
-            endpoint=self._config.get("endpoint"),
-            index_name=self._config.get("index_name"),
-            credential=az_credential,
-        )
+        # name of the index the documents are uploaded to, a new index in a blue/green run
+        self._target_index_name = self._config.get("index_name")
+        self._search_client = self._get_search_client(self._target_index_name)
         self._index_client = SearchIndexClient(
-            endpoint=self._config.get("endpoint"), credential=az_credential
+            endpoint=self._config.get("endpoint"), credential=self._credential
         )
+        self._blue_green = self._overwrite_index and self._config.get("blue_green", False)
 
-        max_batch_size = 50
+        max_batch_size = AzureVectorStoreSkill.MAX_BATCH_SIZE
         self._config["batch_size"] = min(
             max(1, self._config.get("batch_size", max_batch_size)), max_batch_size
         )
+        self._key_field = None
+
+    def _get_search_client(self, index_name: str) -> SearchClient:
+        return SearchClient(
+            endpoint=self._config.get("endpoint"),
+            index_name=index_name,
+            credential=self._credential,
+        )
 
     def _upload_embeddings(self, chunks: List[Chunk]):
         field_mapping = self._config.get("field_mapping", {})
@@ -54,23 +105,73 @@ class AzureVectorStoreSkill(IndexerSkill):
         if chunks:
             az_ai_search_documents = [
                 {
-                    field_mapping[key]: getattr(chunk, key)
+                    field_mapping[key]: self._get_field_value(getattr(chunk, key))
                     for key in field_mapping
                     if hasattr(chunk, key)
                 }
                 for chunk in chunks
             ]
 
-            start_idx = 0
-            batch_size = self._config.get("batch_size")
-
-            while start_idx < len(az_ai_search_documents):
-                batch = az_ai_search_documents[start_idx : start_idx + batch_size]
-                results.extend(self._search_client.upload_documents(documents=batch))
-                start_idx += batch_size
+            key_field = self._get_key_field()
+            max_concurrency = self._config.get("max_concurrency", AzureVectorStoreSkill.DEFAULT_MAX_CONCURRENCY)
+            results_by_key = {}
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                for batch_results in executor.map(self._upload_batch, self._make_batches(az_ai_search_documents)):
+                    results_by_key.update((result.key, result) for result in batch_results)
+            # results are returned in the order of the chunks, as expected by the tracker
+            results = [results_by_key[document[key_field]] for document in az_ai_search_documents]
 
         return results
 
+    @staticmethod
+    def _get_field_value(value):
+        # the documents are sent as JSON, which has no array type for NumPy embeddings
+        return value.tolist() if isinstance(value, np.ndarray) else value
+
+    def _make_batches(self, documents: List[dict]) -> Iterator[List[dict]]:
+        max_batch_bytes = self._config.get("max_batch_bytes", AzureVectorStoreSkill.DEFAULT_MAX_BATCH_BYTES)
+        batch = []
+        batch_bytes = 0
+        for document in documents:
+            document_bytes = len(json.dumps(document, default=str))
+            if batch and (
+                len(batch) >= self._config["batch_size"] or batch_bytes + document_bytes > max_batch_bytes
+            ):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(document)
+            batch_bytes += document_bytes
+        if batch:
+            yield batch
+
+    def _upload_batch(self, batch: List[dict]) -> List[IndexingResult]:
+        """Upload a batch, then upload again the documents that failed with a transient error."""
+        key_field = self._get_key_field()
+        max_retries = self._config.get("max_retries", AzureVectorStoreSkill.DEFAULT_MAX_RETRIES)
+        results = {}
+        for attempt in range(max_retries + 1):
+            batch_results = self._search_client.upload_documents(documents=batch)
+            results.update((result.key, result) for result in batch_results)
+            failed_keys = {
+                result.key
+                for result in batch_results
+                if not result.succeeded and result.status_code in AzureVectorStoreSkill.RETRYABLE_STATUS_CODES
+            }
+            if not failed_keys or attempt == max_retries:
+                break
+            batch = [document for document in batch if document[key_field] in failed_keys]
+            delay = min(AzureVectorStoreSkill.MAX_RETRY_DELAY, self.RETRY_DELAY * 2**attempt)
+            self.logger.warning(f"Uploading {len(batch)} failed documents again in {delay:.1f}s")
+            time.sleep(delay)
+        return list(results.values())
+
+    def _get_key_field(self) -> str:
+        if self._key_field is None:
+            index = self._index_client.get_index(self._target_index_name)
+            self._key_field = next(field.name for field in index.fields if field.key)
+        return self._key_field
+
     def _update_tracker(self, chunks: List[Chunk], results: List[IndexingResult]):
         if self._vector_store_tracker:
             self._vector_store_tracker.update_documents(chunks, results)
@@ -90,25 +191,88 @@ class AzureVectorStoreSkill(IndexerSkill):
             self.logger.debug(f"Azure AI Search upload results: {res}")
 
     def _cleanup_index(self):
+        """Delete every document of the index, in batches of at most ``batch_size`` documents.
+
+        The keys are read page by page and deleted while the next pages are read, with at
+        most ``max_concurrency`` deletions in flight. Each round reads up to
+        ``CLEANUP_ROUND_SIZE`` keys, rounds go on until no document is left. Documents whose
+        deletion failed are read again by the next round, a round deleting none raises a ValueError.
+        """
         self.logger.debug("Cleaning up index...")
-        # Get the index definition to find the key field
-        index = self._index_client.get_index(self._config.get("index_name"))
-        key_field = next(field.name for field in index.fields if field.key)
-
-        # First search for all documents
-        results = self._search_client.search(
-            search_text="*",
-            select=[key_field],
-            include_total_count=True,  # Only get the key field as that's all we need for deletion
-        )
+        key_field = self._get_key_field()
+        max_concurrency = self._config.get("max_concurrency", AzureVectorStoreSkill.DEFAULT_MAX_CONCURRENCY)
+        deleted_count = 0
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while True:
+                results = self._search_client.search(
+                    search_text="*", select=[key_field], top=self.CLEANUP_ROUND_SIZE
+                )
+                round_count = 0
+                round_results = []
+                in_flight = set()
+                for page in results.by_page():
+                    keys = [{key_field: doc[key_field]} for doc in page]
+                    for start in range(0, len(keys), self._config["batch_size"]):
+                        if len(in_flight) >= max_concurrency:
+                            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                round_results.extend(future.result())
+                        batch = keys[start : start + self._config["batch_size"]]
+                        in_flight.add(executor.submit(self._search_client.delete_documents, documents=batch))
+                        round_count += len(batch)
+                for future in in_flight:
+                    round_results.extend(future.result())
+                if not round_count:
+                    break
+                failed = [result for result in round_results if not result.succeeded]
+                if len(failed) == round_count:
+                    raise ValueError(
+                        f"Could not delete any of the {round_count} documents read from index "
+                        f"{self._target_index_name}, e.g. {failed[0].key}: {failed[0].error_message}"
+                    )
+                deleted_count += round_count - len(failed)
+                self.logger.debug(f"Deleted {deleted_count} documents from the index, {len(failed)} failed")
 
-        # Get all document IDs using the correct key field
-        docs_to_delete = [{key_field: doc[key_field]} for doc in results]
+    def _create_blue_green_index(self):
+        """Create an empty copy of the index the alias points to, to upload the documents to."""
+        alias_name = self._config.get("index_name")
+        current_index_name = self._get_alias_index_name(alias_name)
+        # the first blue/green run copies the index named like the alias, replaced by the alias on switch
+        definition = self._index_client.get_index(current_index_name or alias_name)
 
-        if docs_to_delete:
-            # Delete the documents in batches
-            self._search_client.delete_documents(documents=docs_to_delete)
-            self.logger.debug(f"Deleted {len(docs_to_delete)} documents from the index")
+        blue, green = (alias_name + suffix for suffix in AzureVectorStoreSkill.BLUE_GREEN_SUFFIXES)
+        self._target_index_name = green if current_index_name == blue else blue
+        self.logger.info(f"Building index {self._target_index_name} for alias {alias_name}")
+        try:
+            self._index_client.delete_index(self._target_index_name)
+        except ResourceNotFoundError:
+            pass
+        definition.name = self._target_index_name
+        definition.e_tag = None
+        self._index_client.create_index(definition)
+        self._search_client = self._get_search_client(self._target_index_name)
+
+    def _get_alias_index_name(self, alias_name: str) -> Optional[str]:
+        try:
+            return self._index_client.get_alias(alias_name).indexes[0]
+        except ResourceNotFoundError:
+            return None
+
+    def _switch_alias(self):
+        alias_name = self._config.get("index_name")
+        if self._get_alias_index_name(alias_name) is None:
+            # an alias cannot have the name of an index, the index copied by the first run is replaced
+            self.logger.warning(f"Deleting index {alias_name} to replace it with an alias")
+            try:
+                self._index_client.delete_index(alias_name)
+            except ResourceNotFoundError:
+                pass
+        self._index_client.create_or_update_alias(SearchAlias(name=alias_name, indexes=[self._target_index_name]))
+        self.logger.info(f"Switched alias {alias_name} to index {self._target_index_name}")
+
+    def finalize(self) -> None:
+        if self._blue_green and self._index_cleaned_up:
+            self._switch_alias()
 
     def run(self, input: Optional[List[Document]] = None) -> List[Document]:
         self.logger.info("Running AzureVectorStoreSkill")
@@ -117,11 +281,12 @@ class AzureVectorStoreSkill(IndexerSkill):
 
         chunks = {}
 
-        if self._vector_store_tracker:
+        if self._vector_store_tracker and not self._failed_documents_retried:
             chunks = {
                 chunk.document_id: chunk
                 for chunk in self._vector_store_tracker.retrieve_failed_documents()
             }
+            self._failed_documents_retried = True
 
         self.logger.debug(f"Going to process {len(input)} documents")
         for doc in input:
@@ -134,9 +299,13 @@ class AzureVectorStoreSkill(IndexerSkill):
             self.logger.debug("No new chunks to upload")
             return input
 
-        if self._overwrite_index:
-            self.logger.debug("Cleaning up index before uploading")
-            self._cleanup_index()
+        if self._overwrite_index and not self._index_cleaned_up:
+            if self._blue_green:
+                self._create_blue_green_index()
+            else:
+                self.logger.debug("Cleaning up index before uploading")
+                self._cleanup_index()
+            self._index_cleaned_up = True
 
         upload_results = self._upload_embeddings(chunks.values())
         self._update_tracker(chunks.values(), upload_results)
@@ -1,16 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List
 from typing import Optional
+from urllib.parse import urlparse
 
 import chromadb
 
 from docs2vecs.subcommands.indexer.config.config import Config
+from docs2vecs.subcommands.indexer.document.chunk_batch import ChunkBatch
 from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.embedding_cache import content_hash
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 from docs2vecs.subcommands.indexer.skills.tracker import VectorStoreTracker
 
 
 class ChromaDBVectorStoreSkill(IndexerSkill):
+    """Upserts the chunks of the input documents into a Chroma collection.
+
+    Chunks of all the input documents are grouped into upserts of up to ``batch_size``
+    chunks, capped by the maximum batch size of the Chroma client. The hash of the content
+    of every chunk is stored in its metadata, so that the chunks already stored with the
+    same content and metadata are not upserted again.
+
+    Configuration parameters:
+    - db_path (str): Path of a local Chroma database. Ignored if server_url is set
+    - server_url (str): URL of a Chroma server
+    - collection_name (str): Name of the collection, created if missing
+    - batch_size (int): Maximum number of chunks per upsert. Defaults to the client maximum
+    - max_concurrency (int): Maximum number of upserts in flight, with a Chroma server only. Defaults to 1
+    - skip_unchanged (bool): Whether chunks stored with the same content and metadata are skipped. Defaults to true
+    - delete_missing_sources (bool): Whether the chunks of deleted documents (e.g. files removed since the
+      previous scan) are deleted from the collection. Defaults to false
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 1
+
     def __init__(
         self,
         config: dict,
@@ -19,30 +43,100 @@ class ChromaDBVectorStoreSkill(IndexerSkill):
     ) -> None:
         super().__init__(config, global_config)
         self._vector_store_tracker = vector_store_tracker
+        self._collection = None
+        self._batch_size = None
 
     def run(self, input: Optional[List[Document]] = None) -> List[Document]:
         self.logger.info("Running ChromaDBVectorStoreSkill...")
-
-        db_path = Path(self._config["db_path"]).expanduser().resolve().as_posix()
-        chroma_client: chromadb.Client = self._get_client(db_path)
-        chroma_collection = chroma_client.get_or_create_collection(
-            self._config["collection_name"]
-        )
+        chroma_collection = self._get_collection()
 
         self.logger.debug(f"Going to process {len(input)} documents")
         for doc in input:
-            self.logger.debug(f"Processing document: {doc.filename}")
-            chroma_collection.upsert(
-                ids=[chunk.chunk_id for chunk in doc.chunks],
-                embeddings=[chunk.embedding for chunk in doc.chunks],
-                documents=[chunk.content for chunk in doc.chunks],
-                metadatas=[
-                    {"source": chunk.source_link, "tags": doc.tag}
-                    for chunk in doc.chunks
-                ],
-            )
+            if doc.deleted and self._config.get("delete_missing_sources", False):
+                self.logger.info(f"Deleting the chunks of {doc.source_url}")
+                chroma_collection.delete(where={"source": doc.source_url})
+
+        batch = ChunkBatch.from_documents(input)
+        # an upsert cannot hold the same id twice, the last chunk wins as with successive upserts
+        last_rows = {chunk_id: row for row, chunk_id in enumerate(batch.chunk_ids)}
+        if len(last_rows) < len(batch):
+            batch = batch.take(sorted(last_rows.values()))
+        metadatas = [
+            self._get_metadata(source_link, tag, content)
+            for source_link, tag, content in zip(batch.source_links, batch.tags, batch.contents)
+        ]
+
+        if self._config.get("skip_unchanged", True):
+            unchanged_ids = set(self._get_unchanged_ids(chroma_collection, batch.chunk_ids, metadatas))
+            self.logger.info(f"Skipping {len(unchanged_ids)} unchanged chunks")
+            if unchanged_ids:
+                rows = [row for row, chunk_id in enumerate(batch.chunk_ids) if chunk_id not in unchanged_ids]
+                batch = batch.take(rows)
+                metadatas = [metadatas[row] for row in rows]
+
+        upserted_count = 0
+        with ThreadPoolExecutor(max_workers=self._get_max_concurrency()) as executor:
+            for batch_count in executor.map(
+                lambda start: self._upsert(
+                    chroma_collection,
+                    batch.slice(start, start + self._batch_size),
+                    metadatas[start : start + self._batch_size],
+                ),
+                range(0, len(batch), self._batch_size),
+            ):
+                upserted_count += batch_count
+                self.logger.debug(f"Upserted {upserted_count}/{len(batch)} chunks")
 
         return input
 
+    def _get_metadata(self, source_link: str, tag: str, content: str) -> dict:
+        return {"source": source_link, "tags": tag, "content_hash": content_hash(content)}
+
+    def _get_unchanged_ids(self, chroma_collection, chunk_ids: List[str], metadatas: List[dict]) -> List[str]:
+        """Return the ids of the chunks stored with the same metadata, content hash included."""
+        unchanged_ids = []
+        metadatas_by_id = dict(zip(chunk_ids, metadatas))
+        for start in range(0, len(chunk_ids), self._batch_size):
+            stored = chroma_collection.get(ids=chunk_ids[start : start + self._batch_size], include=["metadatas"])
+            unchanged_ids.extend(
+                chunk_id
+                for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])
+                if metadata == metadatas_by_id[chunk_id]
+            )
+        return unchanged_ids
+
+    def _upsert(self, chroma_collection, batch: ChunkBatch, metadatas: List[dict]) -> int:
+        chroma_collection.upsert(
+            ids=batch.chunk_ids,
+            embeddings=batch.embeddings,
+            documents=batch.contents,
+            metadatas=metadatas,
+        )
+        return len(batch)
+
+    def _get_max_concurrency(self) -> int:
+        # a local database has a single writer, concurrent upserts would only wait for each other
+        if not self._config.get("server_url"):
+            return 1
+        return self._config.get("max_concurrency", ChromaDBVectorStoreSkill.DEFAULT_MAX_CONCURRENCY)
+
+    def _get_collection(self):
+        # the collection is kept across runs, e.g. when the skill is called once per batch
+        if self._collection is None:
+            if self._config.get("server_url"):
+                chroma_client = self._get_http_client(self._config["server_url"])
+            else:
+                db_path = Path(self._config["db_path"]).expanduser().resolve().as_posix()
+                chroma_client = self._get_client(db_path)
+            self._collection = chroma_client.get_or_create_collection(self._config["collection_name"])
+            max_batch_size = chroma_client.get_max_batch_size()
+            self._batch_size = min(self._config.get("batch_size", max_batch_size), max_batch_size)
+        return self._collection
+
     def _get_client(self, db_path: str) -> chromadb.Client:
         return chromadb.PersistentClient(path=db_path)
+
+    def _get_http_client(self, server_url: str) -> chromadb.Client:
+        url = urlparse(server_url)
+        ssl = url.scheme == "https"
+        return chromadb.HttpClient(host=url.hostname, port=url.port or (443 if ssl else 8000), ssl=ssl)
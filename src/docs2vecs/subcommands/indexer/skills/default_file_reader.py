@@ -1,4 +1,8 @@
+import multiprocessing
+import signal
+import threading
 from pathlib import Path
+from typing import Callable
 from typing import List
 from typing import Optional
 
@@ -13,6 +17,33 @@ from docs2vecs.subcommands.indexer.config.config import Config
 from docs2vecs.subcommands.indexer.document.document import Document
 from docs2vecs.subcommands.indexer.skills.skill import FileLoaderSkill
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def _init_worker(max_memory_mb: Optional[int]) -> None:
+    if max_memory_mb and resource:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("file parsing timed out")
+
+
+def _parse_file(handler: Callable[[Path], List[Document]], file_path: str, timeout: int) -> List[Document]:
+    """Parse one file in a worker process, interrupting the parser if it runs longer than timeout seconds."""
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return handler(Path(file_path))
+    finally:
+        if hasattr(signal, "SIGALRM"):
+            signal.alarm(0)
+
 
 class DefaultFileReader(FileLoaderSkill):
     """A skill that reads files based on their extension.
@@ -24,10 +55,33 @@ class DefaultFileReader(FileLoaderSkill):
     - .doc, .docx: Word documents using UnstructuredWordDocumentLoader
     - .ppt, .pptx: PowerPoint files using UnstructuredPowerPointLoader
     - .xls, .xlsx: Excel files using UnstructuredExcelLoader
+
+    Configuration parameters:
+    - max_workers (int): Number of processes parsing files in parallel. Files are parsed in-process when 1 (default)
+    - file_timeout (int): Maximum number of seconds spent parsing one file in parallel mode
+    - max_worker_memory_mb (int): Address space limit of each parsing process (Unix only)
+
+    The pool of parsing processes is started by the first batch and kept until ``finalize``, so that
+    the batches of a streaming run do not each pay for starting the processes and importing the loaders.
     """
 
+    CONCURRENT_WORKERS = True
+    DEFAULT_FILE_TIMEOUT = 300
+    # parsing processes are recycled to release the memory leaked by the loaders
+    MAX_FILES_PER_WORKER = 100
+    # workers interrupt their own parsers, the parent only gives up on files whose worker crashed or
+    # is stuck in native code, so it waits longer to account for process startup and recycling
+    TIMEOUT_GRACE_PERIOD = 60
+
     def __init__(self, skill_config: dict, global_config: Config) -> None:
         super().__init__(skill_config, global_config)
+        self._max_workers = self._config.get("max_workers", 1)
+        self._file_timeout = self._config.get("file_timeout", DefaultFileReader.DEFAULT_FILE_TIMEOUT)
+        self._max_worker_memory_mb = self._config.get("max_worker_memory_mb")
+        self._pool = None
+        # pools given up on because one of their processes is stuck, terminated by finalize
+        self._retired_pools = []
+        self._pool_lock = threading.Lock()
         self._extension_handlers = {
             ".md": self._load_markdown,
             ".txt": self._load_text,
@@ -55,66 +109,167 @@ class DefaultFileReader(FileLoaderSkill):
             self.logger.info("No input documents provided")
             return []
 
-        result = []
-        for doc in documents:
-            file_path = Path(doc.filename)
-            file_tag = doc.tag
-            if not file_path.exists():
-                self.logger.info(f"File not found: {file_path}")
-                continue
+        # deleted files are passed through, so that vector stores can drop their chunks
+        deleted = [doc for doc in documents if doc.deleted]
+        files = [
+            (doc, handler)
+            for doc in documents
+            if not doc.deleted and (handler := self._get_handler(Path(doc.filename)))
+        ]
+
+        if self._max_workers > 1:
+            result = self._read_files_in_parallel(files)
+        else:
+            result = []
+            for doc, handler in files:
+                result.extend(self._read_file(doc, handler))
+
+        self.logger.info(f"Finished reading {len(result)} documents")
+        result.extend(deleted)
+
+        return result
+
+    def _get_handler(self, file_path: Path) -> Optional[Callable[[Path], List[Document]]]:
+        if not file_path.exists():
+            self.logger.info(f"File not found: {file_path}")
+            return None
+
+        extension = file_path.suffix.lower()
+        handler = self._extension_handlers.get(extension)
+
+        if not handler:
+            self.logger.info(f"Unsupported file extension: {extension} for file {file_path}")
+
+        return handler
+
+    def _read_file(self, doc: Document, handler: Callable[[Path], List[Document]]) -> List[Document]:
+        file_path = Path(doc.filename)
+        try:
+            loaded_docs = handler(file_path)
+        except Exception as e:
+            self.logger.info(f"Error reading file {file_path}: {e!s}")
+            return []
+
+        for loaded_doc in loaded_docs:
+            loaded_doc.tag = doc.tag
+        self.logger.info(f"Successfully read file: {file_path}")
+        return loaded_docs
+
+    def _read_files_in_parallel(self, files: List[tuple]) -> List[Document]:
+        """Parse the files in a pool of processes, so that a crashing or hanging parser only loses its own file.
 
-            extension = file_path.suffix.lower()
-            handler = self._extension_handlers.get(extension)
+        Results are collected in submission order, hence the output order does not depend on the scheduling.
+        Once a file times out, its pool is retired and the files it did not parse yet are submitted again
+        to a new pool, rather than each waiting for the timeout on the retired one.
+        """
+        self.logger.info(f"Reading {len(files)} files with {self._max_workers} processes")
 
-            if not handler:
-                self.logger.info(f"Unsupported file extension: {extension} for file {file_path}")
-                continue
+        loaded = [[] for _ in files]
+        remaining = list(range(len(files)))
+        while remaining:
+            pool = self._get_pool()
+            submitted = []
+            for index in remaining:
+                doc, handler = files[index]
+                submitted.append(
+                    (index, pool.apply_async(_parse_file, (handler, str(doc.filename), self._file_timeout)))
+                )
+            remaining = []
+            timed_out = False
+            for index, async_result in submitted:
+                file_path = Path(files[index][0].filename)
+                if timed_out and not async_result.ready():
+                    remaining.append(index)
+                    continue
+                try:
+                    loaded_docs = async_result.get(
+                        timeout=2 * self._file_timeout + DefaultFileReader.TIMEOUT_GRACE_PERIOD
+                    )
+                except multiprocessing.TimeoutError:
+                    self.logger.info(f"Error reading file {file_path}: no result after {self._file_timeout}s")
+                    self._retire_pool(pool)
+                    timed_out = True
+                    continue
+                except Exception as e:
+                    self.logger.info(f"Error reading file {file_path}: {e!s}")
+                    continue
 
-            try:
-                loaded_docs = handler(file_path)
                 for loaded_doc in loaded_docs:
-                    loaded_doc.tag = file_tag
-                result.extend(loaded_docs)
+                    loaded_doc.tag = files[index][0].tag
+                loaded[index] = loaded_docs
                 self.logger.info(f"Successfully read file: {file_path}")
-            except Exception as e:
-                self.logger.info(f"Error reading file {file_path}: {e!s}")
-                continue
+            if remaining:
+                self.logger.info(f"Reading {len(remaining)} files again with a new pool")
 
-        self.logger.info(f"Finished reading {len(result)} documents")
+        return [doc for docs in loaded for doc in docs]
 
-        return result
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(
+                    processes=self._max_workers,
+                    initializer=_init_worker,
+                    initargs=(self._max_worker_memory_mb,),
+                    maxtasksperchild=DefaultFileReader.MAX_FILES_PER_WORKER,
+                )
+            return self._pool
+
+    def _retire_pool(self, pool) -> None:
+        """Stop giving files to a pool with a stuck process, the next batch starts a new one."""
+        with self._pool_lock:
+            if self._pool is pool:
+                pool.close()
+                self._retired_pools.append(pool)
+                self._pool = None
+
+    def finalize(self) -> None:
+        with self._pool_lock:
+            for pool in self._retired_pools:
+                pool.terminate()
+            self._retired_pools = []
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
 
-    def _load_markdown(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_markdown(file_path: Path) -> List[Document]:
         """Load markdown files using UnstructuredMarkdownLoader."""
         loader = UnstructuredMarkdownLoader(str(file_path), mode="single")
         docs = loader.load()
         return [Document(filename=str(file_path), source_url=str(file_path), text=doc.page_content) for doc in docs]
 
-    def _load_text(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_text(file_path: Path) -> List[Document]:
         """Load text files using TextLoader."""
         loader = TextLoader(str(file_path))
         docs = loader.load()
         return [Document(filename=str(file_path), source_url=str(file_path), text=doc.page_content) for doc in docs]
 
-    def _load_pdf(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_pdf(file_path: Path) -> List[Document]:
         """Load PDF files using PyPDFLoader."""
         loader = PyPDFLoader(str(file_path))
         docs = loader.load()
         return [Document(filename=str(file_path), source_url=str(file_path), text=doc.page_content) for doc in docs]
 
-    def _load_word(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_word(file_path: Path) -> List[Document]:
         """Load Word documents using UnstructuredWordDocumentLoader."""
         loader = UnstructuredWordDocumentLoader(str(file_path))
         docs = loader.load()
         return [Document(filename=str(file_path), source_url=str(file_path), text=doc.page_content) for doc in docs]
 
-    def _load_powerpoint(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_powerpoint(file_path: Path) -> List[Document]:
         """Load PowerPoint files using UnstructuredPowerPointLoader."""
         loader = UnstructuredPowerPointLoader(str(file_path))
         docs = loader.load()
         return [Document(filename=str(file_path), source_url=str(file_path), text=doc.page_content) for doc in docs]
 
-    def _load_excel(self, file_path: Path) -> List[Document]:
+    @staticmethod
+    def _load_excel(file_path: Path) -> List[Document]:
         """Load Excel files using UnstructuredExcelLoader."""
         loader = UnstructuredExcelLoader(str(file_path))
         docs = loader.load()
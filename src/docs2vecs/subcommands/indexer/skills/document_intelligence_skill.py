@@ -11,6 +11,8 @@ from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 
 
 class AzureDocumentIntelligenceSkill(IndexerSkill):
+    CONCURRENT_WORKERS = True
+
     def __init__(self, config: dict, global_config: Config):
         super().__init__(config, global_config)
         self._doc_analysis_client = DocumentAnalysisClient(
@@ -21,6 +23,8 @@ class AzureDocumentIntelligenceSkill(IndexerSkill):
     def _az_di_doc_parser(self, doc_list: List[Document]):
         self.logger.debug(f"Going to process {len(doc_list)} documents")
         for doc in doc_list:
+            if doc.deleted:
+                continue
             self.logger.debug(f"Parsing document: {doc.filename}")
             with Path(doc.filename).expanduser().resolve().open(mode="rb") as f:
                 poller = self._doc_analysis_client.begin_analyze_document("prebuilt-read", f)
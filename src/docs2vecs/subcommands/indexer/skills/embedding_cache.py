@@ -0,0 +1,111 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent, size-bounded cache of embeddings, keyed by model name and chunk content hash.
+
+    Embeddings are stored as float32 blobs in a SQLite file. When the cache holds more than
+    ``max_entries`` embeddings, the least recently used ones are evicted. The number of
+    embeddings is counted once when the cache is opened, then kept up to date in memory.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1_000_000
+    # maximum number of parameters of a single SQLite statement
+    _QUERY_BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._path = Path(path).expanduser().resolve()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, content_hash TEXT NOT NULL, embedding BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, content_hash))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+        self._count = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def load_embeddings(self, model: str, chunks: List[Chunk]) -> List[Chunk]:
+        """Set the embedding of the chunks found in the cache.
+
+        Returns:
+            The chunks that are not in the cache
+        """
+        hashes = {content_hash(chunk.content) for chunk in chunks}
+        cached = self._get(model, list(hashes))
+
+        missing = []
+        for chunk in chunks:
+            embedding = cached.get(content_hash(chunk.content))
+            if embedding is None:
+                missing.append(chunk)
+            else:
+                chunk.embedding = embedding
+
+        self.hits += len(chunks) - len(missing)
+        self.misses += len(missing)
+        return missing
+
+    def save_embeddings(self, model: str, chunks: List[Chunk]) -> None:
+        now = time.time()
+        rows = [
+            (model, content_hash(chunk.content), np.asarray(chunk.embedding, dtype=np.float32).tobytes(), now)
+            for chunk in chunks
+        ]
+        with self._lock:
+            # the embeddings already cached are updated, so that only new ones are counted
+            self._count += self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", rows
+            ).rowcount
+            self._connection.executemany(
+                "UPDATE embeddings SET embedding = ?, last_used = ? WHERE model = ? AND content_hash = ?",
+                [(embedding, last_used, model, hash) for model, hash, embedding, last_used in rows],
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _get(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        result = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(hashes), EmbeddingCache._QUERY_BATCH_SIZE):
+                batch = hashes[start : start + EmbeddingCache._QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT content_hash, embedding FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                result.update((row[0], np.frombuffer(row[1], dtype=np.float32)) for row in rows)
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND content_hash = ?",
+                    [(now, model, row[0]) for row in rows],
+                )
+            self._connection.commit()
+        return result
+
+    def _evict(self) -> None:
+        if self._count > self._max_entries:
+            self._count -= self._connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (self._count - self._max_entries,),
+            ).rowcount
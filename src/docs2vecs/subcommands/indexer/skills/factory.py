@@ -2,6 +2,7 @@ from enum import StrEnum
 
 from docs2vecs.subcommands.indexer.config import Config
 from docs2vecs.subcommands.indexer.db.mongodb import MongoDbConnection
+from docs2vecs.subcommands.indexer.db.sqlite import SQLiteConnection
 from docs2vecs.subcommands.indexer.skills import AzureAda002EmbeddingSkill
 from docs2vecs.subcommands.indexer.skills import AzureBlobStoreUploaderSkill
 from docs2vecs.subcommands.indexer.skills import AzureVectorStoreSkill
@@ -16,6 +17,8 @@ from docs2vecs.subcommands.indexer.skills import ScrollWorldExporterSkill
 from docs2vecs.subcommands.indexer.skills import SemanticSplitter
 from docs2vecs.subcommands.indexer.skills import VectorStoreTracker
 from docs2vecs.subcommands.indexer.skills import FaissVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills import ArrowVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills import ArrowLoaderSkill
 
 
 class SkillType(StrEnum):
@@ -44,6 +47,7 @@ class AvailableSkillName(StrEnum):
     AZ_AISearch = "azure-ai-search"
     CHROMADB = "chromadb"
     FAISSDB = "faissdb"
+    ARROW_STORE = "arrow-store"
 
     # uplaoders
     AZ_BLOB_STORE = "azure-blob-store"
@@ -59,6 +63,9 @@ class AvailableSkillName(StrEnum):
     # web loaders
     JIRA_LOADER = "jira-loader"
 
+    # file loaders
+    ARROW_LOADER = "arrow-loader"
+
 
 AVAILABLE_SKILLS = {
     SkillType.EXPORTER: {
@@ -77,13 +84,17 @@ AVAILABLE_SKILLS = {
         AvailableSkillName.AZ_AISearch: AzureVectorStoreSkill,
         AvailableSkillName.CHROMADB: ChromaDBVectorStoreSkill,
         AvailableSkillName.FAISSDB: FaissVectorStoreSkill,
+        AvailableSkillName.ARROW_STORE: ArrowVectorStoreSkill,
     },
     SkillType.UPLOADER: {AvailableSkillName.AZ_BLOB_STORE: AzureBlobStoreUploaderSkill},
     SkillType.SPLITTER: {
         AvailableSkillName.SEMANTIC_SPLITTER: SemanticSplitter,
         AvailableSkillName.RECURSIVE_CHARACTER_SPLITTER: RecursiveCharacterTextSplitter,
     },
-    SkillType.LOADER: {AvailableSkillName.JIRA_LOADER: JiraLoaderSkill},
+    SkillType.LOADER: {
+        AvailableSkillName.JIRA_LOADER: JiraLoaderSkill,
+        AvailableSkillName.ARROW_LOADER: ArrowLoaderSkill,
+    },
 }
 
 
@@ -121,4 +132,6 @@ class DBFactory:
                 db_name=db_config_dict["db_name"],
                 col_name=db_config_dict["collection_name"],
             )
+        if db_config_dict["type"] == "sqlite":
+            return SQLiteConnection(path=db_config_dict["path"])
         raise ValueError(f"Unknown db type: {db_config_dict['type']}")
@@ -0,0 +1,401 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import faiss
+import numpy as np
+
+
+class FaissDocstore:
+    """Text and metadata of the chunks of a FAISS index, in a SQLite file addressed by vector id.
+
+    Unlike a pickled docstore, nothing is loaded in memory: lookups only read the rows they need.
+    """
+
+    # maximum number of parameters of a single SQLite statement
+    _QUERY_BATCH_SIZE = 500
+
+    def __init__(self, path: str) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "vector_id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, content TEXT, source TEXT, tags TEXT)"
+        )
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def existing_ids(self, chunk_ids: Iterable[str]) -> Set[str]:
+        """Return the ids of ``chunk_ids`` that are in the docstore."""
+        chunk_ids = list(chunk_ids)
+        existing = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), FaissDocstore._QUERY_BATCH_SIZE):
+                batch = chunk_ids[start : start + FaissDocstore._QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({placeholders})", batch
+                )
+                existing.update(row[0] for row in rows)
+        return existing
+
+    def add(self, first_vector_id: int, ids: List[str], texts: List[str], metadatas: List[dict]) -> None:
+        rows = [
+            (first_vector_id + offset, chunk_id, text, metadata.get("source"), metadata.get("tags"))
+            for offset, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))
+        ]
+        with self._lock:
+            self._connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+            self._connection.commit()
+
+    def get(self, vector_ids: Iterable[int]) -> Dict[int, dict]:
+        vector_ids = [int(vector_id) for vector_id in vector_ids]
+        result = {}
+        with self._lock:
+            for start in range(0, len(vector_ids), FaissDocstore._QUERY_BATCH_SIZE):
+                batch = vector_ids[start : start + FaissDocstore._QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT vector_id, chunk_id, content, source, tags FROM chunks WHERE vector_id IN ({placeholders})",
+                    batch,
+                )
+                result.update(
+                    (row[0], {"chunk_id": row[1], "content": row[2], "source": row[3], "tags": row[4]})
+                    for row in rows
+                )
+        return result
+
+    def truncate(self, count: int) -> None:
+        """Delete the rows whose vector id is ``count`` or more."""
+        with self._lock:
+            self._connection.execute("DELETE FROM chunks WHERE vector_id >= ?", (count,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class FaissNativeStore:
+    """A FAISS index persisted as append-only segments, next to a ``FaissDocstore``.
+
+    The vectors added since the store was opened go to an in-memory index, which ``save``
+    writes as a new segment file: a run adding a few chunks writes a few kilobytes, whatever
+    the size of the store. ``segments.json`` lists the segments in vector id order. It is
+    replaced atomically once the new segment is written, so an interrupted save leaves the
+    previous state untouched. When there are more than ``max_segments`` segments, they are
+    compacted into one.
+
+    The metric of a new index is recorded in ``segments.json``: with ``cosine``, the vectors
+    are expected to be added normalized, and ``search`` normalizes the queries.
+
+    An empty copy of the trained index (``template.faiss``) is kept to create the in-memory
+    index of a run without reading any segment. With ``mmap``, flat and IVF segments are
+    memory-mapped read-only for searching instead of being loaded, so that only the pages
+    touched by searches end up in memory.
+
+    The docstore is committed before the segment, so after a crash it can hold rows no
+    saved vector points to. These rows are dropped when the store is opened. A new index
+    overwriting a saved one gets a new docstore file, which ``segments.json`` only points to
+    once the new segments are saved: until then, the saved vectors keep their own docstore.
+    """
+
+    MANIFEST_FILE = "segments.json"
+    TEMPLATE_FILE = "template.faiss"
+    DOCSTORE_FILE = "docstore.sqlite"
+    MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    DEFAULT_MAX_SEGMENTS = 8
+
+    def __init__(
+        self,
+        path: str,
+        index: Optional[faiss.Index] = None,
+        mmap: bool = False,
+        search_parameters: Optional[Dict[str, int]] = None,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+        metric: Optional[str] = None,
+    ) -> None:
+        self._path = Path(path)
+        self._mmap = mmap
+        self._search_parameters = search_parameters or {}
+        self._max_segments = max_segments
+        self._manifest = {"next_segment": 0, "segments": []}
+        manifest_path = self._path / FaissNativeStore.MANIFEST_FILE
+        if manifest_path.exists():
+            self._manifest = json.loads(manifest_path.read_text())
+        # the vectors added since the store was opened
+        self._index = index
+        self._segment_indexes: Optional[List[faiss.Index]] = None
+        self._template_saved = index is None
+        # whether the manifest changed without a segment being added, e.g. by an overwrite
+        self._manifest_changed = False
+        if index is not None and self._manifest["segments"]:
+            # a new index replaces the saved one, with a docstore of its own
+            docstore_file = f"docstore_{self._manifest['next_segment']:06d}.sqlite"
+            self._remove_docstore_files(docstore_file)
+            self._manifest = {**self._manifest, "docstore": docstore_file, "segments": []}
+            self._manifest_changed = True
+        if index is not None:
+            self._manifest["metric"] = metric
+        self.docstore = FaissDocstore(self._path / self._docstore_file)
+        self.docstore.truncate(self._saved_count)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return (Path(path) / cls.MANIFEST_FILE).exists()
+
+    @property
+    def _docstore_file(self) -> str:
+        # stores saved before the docstore was recorded in the manifest use the default file
+        return self._manifest.get("docstore", FaissNativeStore.DOCSTORE_FILE)
+
+    @property
+    def _saved_count(self) -> int:
+        return sum(segment["count"] for segment in self._manifest["segments"])
+
+    @property
+    def ntotal(self) -> int:
+        return self._saved_count + (self._index.ntotal if self._index is not None else 0)
+
+    @property
+    def metric(self) -> Optional[str]:
+        """The metric the index was created with, e.g. ``cosine``, if it was given."""
+        return self._manifest.get("metric")
+
+    @property
+    def metric_type(self) -> int:
+        return self.index.metric_type
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._manifest["segments"])
+
+    @property
+    def index(self) -> faiss.Index:
+        """The in-memory index the vectors added since the store was opened go to."""
+        if self._index is None:
+            self._index = self._read_index(FaissNativeStore.TEMPLATE_FILE, mmap=False)
+        return self._index
+
+    @staticmethod
+    def set_search_parameters(index: faiss.Index, search_parameters: Dict[str, int]) -> None:
+        parameters = faiss.ParameterSpace()
+        for name, value in search_parameters.items():
+            if name == "nprobe" and faiss.try_extract_index_ivf(index) is None:
+                continue
+            if name == "efSearch" and not hasattr(faiss.downcast_index(index), "hnsw"):
+                continue
+            parameters.set_index_parameter(index, name, value)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings: np.ndarray) -> None:
+        self.docstore.add(self.ntotal, ids, texts, metadatas)
+        self.index.add(embeddings)
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[dict]]:
+        """Return the docstore rows of the ``k`` nearest neighbors of every query, with their ``score``.
+
+        Every segment is searched, and their results are merged.
+        """
+        if self._segment_indexes is None:
+            self._segment_indexes = [
+                self._read_index(segment["file"], self._mmap) for segment in self._manifest["segments"]
+            ]
+        indexes = list(self._segment_indexes)
+        if self._index is not None and self._index.ntotal:
+            indexes.append(self._index)
+
+        queries = np.array(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            # the vectors are stored normalized, the inner product with a normalized query is their cosine
+            faiss.normalize_L2(queries)
+        scores, labels = search_indexes(indexes, queries, k)
+        rows = self.docstore.get(label for label in labels.ravel() if label >= 0)
+        return [
+            [{**rows[label], "score": float(score)} for score, label in zip(query_scores, query_labels) if label >= 0]
+            for query_scores, query_labels in zip(scores, labels)
+        ]
+
+    def save(self) -> None:
+        """Write the vectors added since the store was opened as a new segment."""
+        if self._index is None or (self._index.ntotal == 0 and self._template_saved):
+            return
+        self._path.mkdir(parents=True, exist_ok=True)
+        if not self._template_saved:
+            template = faiss.clone_index(self._index)
+            template.reset()
+            self._write_index(template, FaissNativeStore.TEMPLATE_FILE)
+            self._template_saved = True
+
+        if self._index.ntotal:
+            self._append_segment(self._index)
+        elif self._manifest_changed:
+            self._write_manifest()
+        if self.segment_count > self._max_segments:
+            self.compact()
+        self._remove_unused_files()
+        self._index = None
+        self._segment_indexes = None
+
+    def compact(self) -> None:
+        """Merge all the segments into one."""
+        if self.segment_count < 2:
+            return
+        merged = self._read_index(FaissNativeStore.TEMPLATE_FILE, mmap=False)
+        for segment in self._manifest["segments"]:
+            merge_index(merged, self._read_index(segment["file"], mmap=False))
+        self._manifest["segments"] = []
+        self._append_segment(merged)
+        self._remove_unused_files()
+        self._segment_indexes = None
+
+    def close(self) -> None:
+        self.docstore.close()
+
+    def _append_segment(self, index: faiss.Index) -> None:
+        file_name = f"segment_{self._manifest['next_segment']:06d}.faiss"
+        self._write_index(index, file_name)
+        self._manifest = {
+            **self._manifest,
+            "next_segment": self._manifest["next_segment"] + 1,
+            "segments": self._manifest["segments"] + [{"file": file_name, "count": index.ntotal}],
+        }
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest_path = self._path / FaissNativeStore.MANIFEST_FILE
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self._manifest))
+        os.replace(tmp_path, manifest_path)
+        self._manifest_changed = False
+
+    def _remove_unused_files(self) -> None:
+        """Remove the segments and docstores that are no longer in the manifest, left by compactions, overwrites
+        and crashes."""
+        used = {segment["file"] for segment in self._manifest["segments"]}
+        for file_path in self._path.glob("segment_*.faiss*"):
+            if file_path.name not in used:
+                file_path.unlink()
+        self._remove_docstore_files(exclude=self._docstore_file)
+
+    def _remove_docstore_files(self, name: Optional[str] = None, exclude: Optional[str] = None) -> None:
+        """Remove the docstore files named ``name``, or all but ``exclude``, with their SQLite journals."""
+        for file_path in self._path.glob("docstore*.sqlite*"):
+            docstore_name = file_path.name.split(".sqlite")[0] + ".sqlite"
+            if (name is None or docstore_name == name) and docstore_name != exclude:
+                file_path.unlink()
+
+    def _read_index(self, file_name: str, mmap: bool) -> faiss.Index:
+        index = faiss.read_index(str(self._path / file_name), FaissNativeStore.MMAP_FLAGS if mmap else 0)
+        self.set_search_parameters(index, self._search_parameters)
+        return index
+
+    def _write_index(self, index: faiss.Index, file_name: str) -> None:
+        file_path = self._path / file_name
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        faiss.write_index(index, str(tmp_path))
+        os.replace(tmp_path, file_path)
+
+
+class ShardedFaissStore:
+    """A set of ``FaissNativeStore`` shards, each in its own sub-directory of the store.
+
+    Chunks are assigned to a shard by a stable hash of their id or of their tag, as recorded
+    in ``shards.json``. Searches fan out to every shard in parallel and merge their top k.
+    """
+
+    MANIFEST_FILE = "shards.json"
+
+    def __init__(self, path: str, mmap: bool = False, search_parameters: Optional[Dict[str, int]] = None) -> None:
+        self._path = Path(path)
+        manifest = json.loads((self._path / ShardedFaissStore.MANIFEST_FILE).read_text())
+        self.shard_by = manifest["shard_by"]
+        self.shards = [
+            FaissNativeStore(shard_path, mmap=mmap, search_parameters=search_parameters)
+            for shard_path in (ShardedFaissStore.shard_path(path, shard) for shard in range(manifest["shards"]))
+            if FaissNativeStore.exists(shard_path)
+        ]
+
+    @staticmethod
+    def shard_path(path: str, shard: int) -> Path:
+        return Path(path) / f"shard_{shard:03d}"
+
+    @staticmethod
+    def shard_of(key: str, shard_count: int) -> int:
+        # unlike hash(), crc32 does not change from a process to another
+        return zlib.crc32(str(key).encode()) % shard_count
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[dict]]:
+        """Return the docstore rows of the ``k`` nearest neighbors of every query, across all the shards."""
+        if not self.shards:
+            return [[] for _ in queries]
+        # faiss releases the GIL while searching, so the shards are searched in parallel
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+            shard_results = list(executor.map(lambda shard: shard.search(queries, k), self.shards))
+
+        select = heapq.nlargest if self.shards[0].metric_type == faiss.METRIC_INNER_PRODUCT else heapq.nsmallest
+        return [
+            select(k, (row for results in shard_results for row in results[query]), key=lambda row: row["score"])
+            for query in range(len(queries))
+        ]
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+
+def merge_index(target: faiss.Index, source: faiss.Index) -> None:
+    """Append the vectors of ``source`` to ``target``, an index of the same type."""
+    # the ids of IVF lists are shifted, flat codes have implicit ids
+    add_id = target.ntotal if faiss.try_extract_index_ivf(target) is not None else 0
+    try:
+        target.merge_from(source, add_id)
+    except RuntimeError:
+        # e.g. HNSW indexes, which cannot be merged
+        target.add(source.reconstruct_n(0, source.ntotal))
+
+
+def search_indexes(indexes: List[faiss.Index], queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Search several indexes holding consecutive vector ids, and merge their top ``k`` results.
+
+    Returns:
+        The scores and the vector ids of the neighbors, like ``faiss.Index.search``
+    """
+    all_scores = []
+    all_labels = []
+    offset = 0
+    for index in indexes:
+        scores, labels = index.search(queries, k)
+        all_scores.append(scores)
+        all_labels.append(np.where(labels >= 0, labels + offset, -1))
+        offset += index.ntotal
+    if not indexes:
+        return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+
+    scores = np.hstack(all_scores)
+    labels = np.hstack(all_labels)
+    # missing results have an infinite (or minus infinite) score, so they are sorted last
+    if indexes[0].metric_type == faiss.METRIC_INNER_PRODUCT:
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    else:
+        order = np.argsort(scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
@@ -1,25 +1,83 @@
+import json
+import math
+import multiprocessing
+import queue
+import shutil
 from pathlib import Path
 from typing import List
 from typing import Dict
 from typing import Optional
 from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Set
+from typing import Union
 
 import faiss
+import numpy as np
 import os
 from docs2vecs.subcommands.indexer.config.config import Config
+from docs2vecs.subcommands.indexer.document.chunk_batch import ChunkBatch
 from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.faiss_native_store import FaissNativeStore
+from docs2vecs.subcommands.indexer.skills.faiss_native_store import ShardedFaissStore
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 from docs2vecs.subcommands.indexer.skills.tracker import VectorStoreTracker
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.docstore.in_memory import InMemoryDocstore
 
 
+def _write_shard(config: Dict[str, Any], batches: multiprocessing.Queue, errors: multiprocessing.Queue) -> None:
+    """Entry point of the process adding the batches it receives to one shard, until it receives None."""
+    try:
+        skill = FaissVectorStoreSkill(config, None)
+        for _ in skill.run_stream(iter(batches.get, None), 0):
+            pass
+    except BaseException as error:
+        errors.put(f"{config['params']['db_path']}: {error!r}")
+        raise
+
+
 class FaissVectorStoreSkill(IndexerSkill):
     """
     Faiss vector store skill for storing and retrieving document embeddings.
-    Supports flat L2 indexing
+
+    Configuration parameters:
+    - index_type (str): One of flat, ivf_flat, ivf_pq, ivf_sq8, hnsw, hnsw_sq8, sq8 and sq_fp16. Defaults to flat
+    - metric (str): One of l2, ip (inner product) and cosine. Defaults to l2. With cosine, embeddings are stored normalized
+    - nlist (int): Number of IVF cells. Defaults to about 4*sqrt(n), n being the number of training vectors
+    - nprobe (int): Number of IVF cells visited by a search
+    - pq_m (int): Number of PQ sub-quantizers, must divide the dimension. Defaults to 16
+    - pq_nbits (int): Number of bits per PQ code. Defaults to 8
+    - hnsw_m (int): Number of neighbors of a HNSW node. Defaults to 32
+    - ef_search (int): Size of the HNSW candidate list at search time
+    - train_size (int): Maximum number of embeddings the index is trained on
+    - storage (str): langchain (pickled langchain docstore) or native (append-only FAISS segments and SQLite
+      docstore, see ``FaissNativeStore``). Defaults to langchain
+    - max_segments (int): Number of segments of a native store above which they are compacted into one
+    - shards (int): Number of shards of a native store, each written by its own process (see
+      ``ShardedFaissStore``). Defaults to 1, i.e. no sharding
+    - shard_by (str): chunk_id or tag, what chunks are assigned to a shard by. Defaults to chunk_id
     """
 
+    STORAGES = ("langchain", "native")
+    SHARD_KEYS = ("chunk_id", "tag")
+    # maximum number of batches waiting to be added to a shard
+    SHARD_QUEUE_SIZE = 4
+    INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "ivf_sq8", "hnsw", "hnsw_sq8", "sq8", "sq_fp16")
+    METRICS = {
+        "l2": (faiss.METRIC_L2, DistanceStrategy.EUCLIDEAN_DISTANCE),
+        "ip": (faiss.METRIC_INNER_PRODUCT, DistanceStrategy.MAX_INNER_PRODUCT),
+        "cosine": (faiss.METRIC_INNER_PRODUCT, DistanceStrategy.MAX_INNER_PRODUCT),
+    }
+    DEFAULT_PQ_M = 16
+    DEFAULT_PQ_NBITS = 8
+    DEFAULT_HNSW_M = 32
+    DEFAULT_TRAIN_SIZE = 100_000
+    # faiss warns when k-means gets less than 39 training points per centroid
+    _MIN_POINTS_PER_CENTROID = 39
+
     def __init__(
         self,
         config: Dict[str, Any],
@@ -30,72 +88,279 @@ class FaissVectorStoreSkill(IndexerSkill):
         self._vector_store_tracker = vector_store_tracker
         self._overwrite_index = self._config.get("overwrite_index", False)
         self._VECTOR_DIMENSION = self._config.get("dimension")
-        self.faiss_index = faiss.IndexFlatL2(self._VECTOR_DIMENSION)
+        self._index_type = self._config.get("index_type", "flat")
+        self._metric = self._config.get("metric", "l2")
+        self._train_size = self._config.get("train_size", FaissVectorStoreSkill.DEFAULT_TRAIN_SIZE)
+        self._storage = self._config.get("storage", "langchain")
+        self._shards = self._config.get("shards", 1)
+        self._shard_by = self._config.get("shard_by", "chunk_id")
+        self._validate_index_config()
+
+    def _validate_index_config(self) -> None:
+        if self._storage not in FaissVectorStoreSkill.STORAGES:
+            raise ValueError(
+                f"Unsupported FAISS storage: {self._storage}. "
+                f"Supported storages: {', '.join(FaissVectorStoreSkill.STORAGES)}"
+            )
+        if self._index_type not in FaissVectorStoreSkill.INDEX_TYPES:
+            raise ValueError(
+                f"Unsupported FAISS index type: {self._index_type}. "
+                f"Supported types: {', '.join(FaissVectorStoreSkill.INDEX_TYPES)}"
+            )
+        if self._metric not in FaissVectorStoreSkill.METRICS:
+            raise ValueError(
+                f"Unsupported FAISS metric: {self._metric}. "
+                f"Supported metrics: {', '.join(FaissVectorStoreSkill.METRICS)}"
+            )
+        if self._shards > 1 and self._storage != "native":
+            raise ValueError("Sharding requires the native storage")
+        if self._shard_by not in FaissVectorStoreSkill.SHARD_KEYS:
+            raise ValueError(
+                f"Unsupported FAISS shard key: {self._shard_by}. "
+                f"Supported keys: {', '.join(FaissVectorStoreSkill.SHARD_KEYS)}"
+            )
+        pq_m = self._config.get("pq_m", FaissVectorStoreSkill.DEFAULT_PQ_M)
+        if self._index_type == "ivf_pq" and self._VECTOR_DIMENSION % pq_m:
+            raise ValueError(f"The dimension ({self._VECTOR_DIMENSION}) must be a multiple of pq_m ({pq_m})")
+
+    @property
+    def _needs_training(self) -> bool:
+        return self._index_type not in ("flat", "hnsw")
 
     def run(self, input: Optional[List[Document]] = None) -> List[Document]:
         self.logger.info("Running FaissVectorStoreSkill...")
-        db_path = Path(self._config.get("db_path")).expanduser().resolve().as_posix()
+        if self._shards > 1:
+            for _ in self._run_sharded([input]):
+                pass
+            return input
+
+        db_path = self._get_db_path()
         # load or create the vector store
         vector_store = self._get_vector_store(db_path, input)
-        # Get existing IDs as a set
-        existing_ids = list(vector_store.index_to_docstore_id.values())
+        self._add_documents(vector_store, input)
 
-        if self._overwrite_index and existing_ids:
-            self.logger.info("Overwriting existing index.")
-            vector_store.delete(ids=existing_ids)
+        self._save_vector_store(vector_store, db_path)
 
-        for doc in input:
-            self.logger.info(f"Processing document: {doc.filename}")
-            ids = [chunk.chunk_id for chunk in doc.chunks]
-            embeddings = [chunk.embedding for chunk in doc.chunks]
-            documents = [chunk.content for chunk in doc.chunks]
-            metadatas = [
-                {"source": chunk.source_link, "tags": doc.tag} for chunk in doc.chunks
-            ]
-
-            embeddings_to_add = []
-            metadatas_to_add = []
-            documents_to_add = []
-            ids_to_add = []
-            self.logger.debug(f"ids in the processed file are : {ids}")
-            self.logger.debug(
-                f"the value of overwrite_index is : {self._overwrite_index}"
+        return input
+
+    def run_stream(
+        self, batches: Iterable[Optional[List[Document]]], batch_size: int
+    ) -> Iterator[List[Document]]:
+        """Add each incoming batch to a vector store that is loaded once and saved once the stream is exhausted.
+
+        When a new index has to be trained, batches are held back until ``train_size``
+        embeddings are available to train it, or the stream is exhausted.
+        """
+        self.logger.info("Running FaissVectorStoreSkill in streaming mode...")
+        if self._shards > 1:
+            yield from self._run_sharded(batches)
+            return
+
+        db_path = self._get_db_path()
+        vector_store = None
+        existing_ids = None
+        pending = []
+
+        for batch in batches:
+            if not batch:
+                continue
+            pending.append(batch)
+            if vector_store is None:
+                if self._is_new_index(db_path) and self._needs_training and (
+                    self._count_embeddings(pending) < self._train_size
+                ):
+                    continue
+                vector_store = self._get_vector_store(db_path, [doc for docs in pending for doc in docs])
+                existing_ids = self._get_existing_ids(vector_store)
+            self._add_documents(vector_store, [doc for docs in pending for doc in docs], existing_ids)
+            yield from pending
+            pending = []
+
+        if pending:
+            vector_store = self._get_vector_store(db_path, [doc for docs in pending for doc in docs])
+            self._add_documents(vector_store, [doc for docs in pending for doc in docs])
+            yield from pending
+
+        if vector_store is not None:
+            self._save_vector_store(vector_store, db_path)
+
+    def _run_sharded(self, batches: Iterable[Optional[List[Document]]]) -> Iterator[List[Document]]:
+        """Split every batch between the shards, each written by its own process.
+
+        The shard processes run ``run_stream`` on their share of the batches, so each
+        shard is loaded, trained and saved like an unsharded store.
+        """
+        db_path = self._get_db_path()
+        self._prepare_shards(db_path)
+
+        context = multiprocessing.get_context("spawn")
+        errors = context.Queue()
+        writers = []
+        for shard in range(self._shards):
+            shard_queue = context.Queue(maxsize=FaissVectorStoreSkill.SHARD_QUEUE_SIZE)
+            process = context.Process(
+                target=_write_shard,
+                args=(self._get_shard_config(db_path, shard), shard_queue, errors),
+                name=f"FaissShardWriter-{shard}",
             )
+            process.start()
+            writers.append((shard_queue, process))
 
-            if self._overwrite_index:
-                ids_to_add = ids
-                embeddings_to_add = embeddings
-                metadatas_to_add = metadatas
-                documents_to_add = documents
-
-            elif ids:
-                for id in ids:
-                    if id not in existing_ids:
-                        self.logger.info(
-                            f"ID {id} does not exist in the index, adding it."
-                        )
-                        embeddings_to_add.append(embeddings[ids.index(id)])
-                        metadatas_to_add.append(metadatas[ids.index(id)])
-                        documents_to_add.append(documents[ids.index(id)])
-                        ids_to_add.append(id)
-
-            if ids_to_add:
-                self.logger.info(
-                    f"Adding {len(ids_to_add)} new embeddings to the vector store."
-                )
-                vector_store.add_embeddings(
-                    text_embeddings=zip(documents, embeddings),
-                    metadatas=metadatas,
-                    ids=ids_to_add,
+        completed = False
+        try:
+            for batch in batches:
+                if not batch:
+                    continue
+                for (shard_queue, process), shard_docs in zip(writers, self._split_between_shards(batch)):
+                    if shard_docs:
+                        self._send_to_shard(shard_queue, process, shard_docs, errors)
+                yield batch
+            for shard_queue, process in writers:
+                self._send_to_shard(shard_queue, process, None, errors)
+            completed = True
+        finally:
+            for shard_queue, process in writers:
+                if not completed:
+                    process.terminate()
+                process.join()
+                # batches left in the queue of a stopped process must not block the exit
+                shard_queue.cancel_join_thread()
+
+        failed = [process.name for _, process in writers if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Writing FAISS shards failed ({', '.join(failed)}): {self._get_errors(errors)}")
+
+    def _prepare_shards(self, db_path: str) -> None:
+        manifest_path = Path(db_path) / ShardedFaissStore.MANIFEST_FILE
+        manifest = {"shards": self._shards, "shard_by": self._shard_by}
+        if manifest_path.exists() and not self._overwrite_index:
+            existing = json.loads(manifest_path.read_text())
+            if existing != manifest:
+                raise ValueError(
+                    f"The FAISS store at {db_path} has {existing['shards']} shards by {existing['shard_by']}, "
+                    "set overwrite_index to change its sharding"
                 )
-            else:
-                self.logger.info("No new embeddings to add (all ids already exist).")
+            return
+        if self._overwrite_index and Path(db_path).exists():
+            self.logger.info("Overwriting existing index.")
+            shutil.rmtree(db_path)
+        Path(db_path).mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
 
-        vector_store.save_local(db_path)
+    def _get_shard_config(self, db_path: str, shard: int) -> Dict[str, Any]:
+        shard_path = ShardedFaissStore.shard_path(db_path, shard).as_posix()
+        # the store was cleared by _prepare_shards if it had to be overwritten
+        return {"params": {**self._config, "db_path": shard_path, "shards": 1, "overwrite_index": False}}
 
-        return input
+    def _split_between_shards(self, batch: List[Document]) -> List[List[Document]]:
+        shard_docs = [{} for _ in range(self._shards)]
+        for doc in batch:
+            for chunk in doc.chunks:
+                key = chunk.chunk_id if self._shard_by == "chunk_id" else doc.tag
+                docs = shard_docs[ShardedFaissStore.shard_of(key, self._shards)]
+                if id(doc) not in docs:
+                    # the text of the document is not needed to store its chunks
+                    docs[id(doc)] = Document(filename=doc.filename, source_url=doc.source_url, tag=doc.tag)
+                docs[id(doc)].add_chunk(chunk)
+        return [list(docs.values()) for docs in shard_docs]
 
-    def _get_embeddings(self, input: Optional[List[Document]] = None) -> List[float]:
+    def _send_to_shard(
+        self,
+        shard_queue: multiprocessing.Queue,
+        process: multiprocessing.Process,
+        item: Optional[List[Document]],
+        errors: multiprocessing.Queue,
+    ) -> None:
+        while True:
+            try:
+                shard_queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not process.is_alive():
+                    raise RuntimeError(f"{process.name} stopped: {self._get_errors(errors)}")
+
+    def _get_errors(self, errors: multiprocessing.Queue) -> str:
+        messages = []
+        while True:
+            try:
+                messages.append(errors.get(timeout=0.1))
+            except queue.Empty:
+                return "; ".join(messages) or "no error reported"
+
+    def _get_db_path(self) -> str:
+        return Path(self._config.get("db_path")).expanduser().resolve().as_posix()
+
+    def _is_new_index(self, db_path: str) -> bool:
+        if self._storage == "native":
+            return self._overwrite_index or not FaissNativeStore.exists(db_path)
+        return self._overwrite_index or not os.path.exists(os.path.join(db_path, "index.faiss"))
+
+    def _count_embeddings(self, batches: List[List[Document]]) -> int:
+        return sum(len(doc.chunks) for docs in batches for doc in docs)
+
+    def _add_documents(
+        self,
+        vector_store: Union[FAISS, FaissNativeStore],
+        input: List[Document],
+        existing_ids: Optional[Set[str]] = None,
+    ) -> None:
+        """Add the chunks whose id is not in the vector store yet, with a single bulk add.
+
+        ``existing_ids`` is updated with the added ids, so that callers adding several
+        batches to the same vector store only build it once.
+        """
+        if existing_ids is None:
+            existing_ids = self._get_existing_ids(vector_store)
+
+        batch = ChunkBatch.from_documents(input, unique=True)
+        new_ids = {chunk_id for chunk_id in batch.chunk_ids if chunk_id not in existing_ids}
+        if isinstance(vector_store, FaissNativeStore):
+            new_ids.difference_update(vector_store.docstore.existing_ids(new_ids))
+        if len(new_ids) < len(batch):
+            batch = batch.take([row for row, chunk_id in enumerate(batch.chunk_ids) if chunk_id in new_ids])
+
+        if not len(batch):
+            self.logger.info("No new embeddings to add (all ids already exist).")
+            return
+
+        self.logger.info(f"Adding {len(batch)} new embeddings to the vector store.")
+        existing_ids.update(batch.chunk_ids)
+        ids_to_add = batch.chunk_ids
+        documents_to_add = batch.contents
+        metadatas_to_add = [
+            {"source": source_link, "tags": tag} for source_link, tag in zip(batch.source_links, batch.tags)
+        ]
+        # stacked from the embeddings of the chunks, so normalizing it in place leaves the chunks untouched
+        embeddings = batch.embeddings
+        if self._metric == "cosine":
+            # the inner product of normalized vectors is their cosine similarity
+            faiss.normalize_L2(embeddings)
+        if not vector_store.index.is_trained:
+            self._train_index(vector_store.index, embeddings)
+
+        if isinstance(vector_store, FaissNativeStore):
+            vector_store.add(ids_to_add, documents_to_add, metadatas_to_add, embeddings)
+        else:
+            vector_store.add_embeddings(
+                text_embeddings=zip(documents_to_add, embeddings),
+                metadatas=metadatas_to_add,
+                ids=ids_to_add,
+            )
+
+    def _get_existing_ids(self, vector_store: Union[FAISS, FaissNativeStore]) -> Set[str]:
+        # the ids of a native store are looked up in its docstore instead
+        if isinstance(vector_store, FaissNativeStore):
+            return set()
+        return set(vector_store.index_to_docstore_id.values())
+
+    def _save_vector_store(self, vector_store: Union[FAISS, FaissNativeStore], db_path: str) -> None:
+        if isinstance(vector_store, FaissNativeStore):
+            vector_store.save()
+            vector_store.close()
+        else:
+            vector_store.save_local(db_path)
+
+    def _get_embeddings(self, input: Optional[List[Document]] = None) -> List[np.ndarray]:
         data = []
         for doc in input:
             self.logger.debug(f"Processing document: {doc.filename}")
@@ -105,25 +370,89 @@ class FaissVectorStoreSkill(IndexerSkill):
 
     def _get_vector_store(
         self, db_path: Path, input: Optional[List[Document]] = None
-    ) -> FAISS:
+    ) -> Union[FAISS, FaissNativeStore]:
         index_path = os.path.join(db_path, "index.faiss")
+        _, distance_strategy = FaissVectorStoreSkill.METRICS[self._metric]
+        embeddings = self._get_embeddings(input)
 
-        if os.path.exists(index_path):
+        if self._storage == "native":
+            max_segments = self._config.get("max_segments", FaissNativeStore.DEFAULT_MAX_SEGMENTS)
+            if not self._is_new_index(db_path):
+                self.logger.info(f"FAISS index found at {db_path}.")
+                # no segment is read, new embeddings are written to a new segment
+                return FaissNativeStore(
+                    db_path, search_parameters=self._get_search_parameters(), max_segments=max_segments
+                )
+            self.logger.info(f"Creating a new FAISS index at {db_path}.")
+            index = self._create_index(min(len(embeddings), self._train_size))
+            FaissNativeStore.set_search_parameters(index, self._get_search_parameters())
+            return FaissNativeStore(db_path, index=index, max_segments=max_segments, metric=self._metric)
+
+        if not self._is_new_index(db_path):
             self.logger.info(f"FAISS index found at {index_path}.")
             vector_store = FAISS.load_local(
                 db_path,
-                embeddings=self._get_embeddings(input),
+                embeddings=embeddings,
                 allow_dangerous_deserialization=True,
+                distance_strategy=distance_strategy,
             )
 
         else:
-            self.logger.info(
-                f"FAISS index not found at {index_path}. Creating a new one."
-            )
+            if os.path.exists(index_path):
+                self.logger.info("Overwriting existing index.")
+            else:
+                self.logger.info(
+                    f"FAISS index not found at {index_path}. Creating a new one."
+                )
             vector_store = FAISS(
-                index=self.faiss_index,
-                embedding_function=self._get_embeddings(input),
+                index=self._create_index(min(len(embeddings), self._train_size)),
+                embedding_function=embeddings,
                 docstore=InMemoryDocstore(),
                 index_to_docstore_id={},
+                distance_strategy=distance_strategy,
             )
+
+        FaissNativeStore.set_search_parameters(vector_store.index, self._get_search_parameters())
         return vector_store
+
+    def _create_index(self, training_count: int) -> faiss.Index:
+        """Create an empty index of the configured type, sized for ``training_count`` training embeddings."""
+        nlist = self._config.get("nlist") or max(
+            1,
+            min(
+                int(4 * math.sqrt(training_count)),
+                training_count // FaissVectorStoreSkill._MIN_POINTS_PER_CENTROID,
+            ),
+        )
+        pq_m = self._config.get("pq_m", FaissVectorStoreSkill.DEFAULT_PQ_M)
+        pq_nbits = self._config.get("pq_nbits", FaissVectorStoreSkill.DEFAULT_PQ_NBITS)
+        if self._index_type == "ivf_pq" and training_count < 2**pq_nbits:
+            # each sub-quantizer needs at least one training point per centroid
+            self.logger.warning(f"Not enough embeddings to train {pq_nbits}-bit PQ codes, using fewer bits")
+            pq_nbits = max(1, int(math.log2(max(training_count, 2))))
+        hnsw_m = self._config.get("hnsw_m", FaissVectorStoreSkill.DEFAULT_HNSW_M)
+
+        description = {
+            "flat": "Flat",
+            "ivf_flat": f"IVF{nlist},Flat",
+            "ivf_pq": f"IVF{nlist},PQ{pq_m}x{pq_nbits}",
+            "ivf_sq8": f"IVF{nlist},SQ8",
+            "hnsw": f"HNSW{hnsw_m}",
+            "hnsw_sq8": f"HNSW{hnsw_m}_SQ8",
+            "sq8": "SQ8",
+            "sq_fp16": "SQfp16",
+        }[self._index_type]
+        metric, _ = FaissVectorStoreSkill.METRICS[self._metric]
+        self.logger.info(f"Creating FAISS index {description}")
+        return faiss.index_factory(self._VECTOR_DIMENSION, description, metric)
+
+    def _train_index(self, index: faiss.Index, embeddings: np.ndarray) -> None:
+        if len(embeddings) > self._train_size:
+            sample = np.random.default_rng(0).choice(len(embeddings), self._train_size, replace=False)
+            embeddings = embeddings[sample]
+        self.logger.info(f"Training FAISS index on {len(embeddings)} embeddings")
+        index.train(embeddings)
+
+    def _get_search_parameters(self) -> Dict[str, int]:
+        parameters = {"nprobe": self._config.get("nprobe"), "efSearch": self._config.get("ef_search")}
+        return {name: value for name, value in parameters.items() if value}
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+def file_hash(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileManifest:
+    """Record of the files (size, mtime and optionally content hash) seen by the last successful scan.
+
+    The manifest of the current scan is built with ``check`` and only replaces the previous
+    one on disk when ``save`` is called, so that an interrupted run is scanned again in full.
+    """
+
+    def __init__(self, path: str, hash_content: bool = False) -> None:
+        self._path = Path(path).expanduser().resolve()
+        self._hash_content = hash_content
+        self._previous: Dict[str, dict] = {}
+        self._current: Dict[str, dict] = {}
+        if self._path.exists():
+            with self._path.open() as f:
+                self._previous = json.load(f)["files"]
+
+    def check(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        """Add the file to the current manifest.
+
+        Returns:
+            True if the file is new or changed since the previous manifest
+        """
+        stat = stat or file_path.stat()
+        key = str(file_path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+        previous = self._previous.get(key)
+
+        if previous and previous["size"] == entry["size"] and previous["mtime"] == entry["mtime"]:
+            if "hash" in previous:
+                entry["hash"] = previous["hash"]
+            self._current[key] = entry
+            return False
+
+        if self._hash_content:
+            entry["hash"] = file_hash(file_path)
+        self._current[key] = entry
+        # a touched file whose content did not change is not emitted again
+        return not (previous and "hash" in entry and previous.get("hash") == entry["hash"])
+
+    def deleted_files(self) -> List[str]:
+        """Files of the previous manifest that were not checked during the current scan."""
+        return [key for key in self._previous if key not in self._current]
+
+    def save(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with tmp_path.open("w") as f:
+            json.dump({"files": self._current}, f)
+        os.replace(tmp_path, self._path)
+        self._previous = self._current
+        self._current = {}
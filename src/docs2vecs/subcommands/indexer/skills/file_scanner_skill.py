@@ -1,12 +1,26 @@
 import fnmatch
 import os
+import re
 from pathlib import Path
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 
 from docs2vecs.subcommands.indexer.config.config import Config
 from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.file_manifest import FileManifest
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+from docs2vecs.subcommands.indexer.skills.skill import batched
+
+
+def compile_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+    """Compile a list of fnmatch patterns into a single regular expression, None if there is no pattern."""
+    if not patterns:
+        return None
+    # fnmatch.fnmatch is case-insensitive on case-insensitive file systems
+    flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+    return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns), flags)
 
 
 class FileScannerSkill(IndexerSkill):
@@ -15,7 +29,12 @@ class FileScannerSkill(IndexerSkill):
     Configuration parameters:
     - path (str): The path to the directory to scan
     - recursive (bool): If true, recursively search the directory
-    - filter (List[str]): List of patterns to filter by
+    - filter (List[str]): List of file name patterns to include
+    - exclude (List[str]): List of file name patterns to exclude
+    - exclude_dirs (List[str]): List of directory name patterns (e.g. .git, node_modules) that are not descended into
+    - manifest_path (str): Path of the manifest of the previous scan. When set, only new or changed
+      files are returned, followed by a deleted Document for every file that disappeared
+    - hash_content (bool): If true, files whose mtime changed but not their content are not returned again
     """
 
     def __init__(self, skill_config: dict, global_config: Config) -> None:
@@ -23,7 +42,15 @@ class FileScannerSkill(IndexerSkill):
         self._path = Path(self._config["path"]).expanduser().resolve()
         self._recursive = self._config.get("recursive", False)
         self._filter = self._config.get("filter", [])
+        self._include_regex = compile_patterns(self._filter)
+        self._exclude_regex = compile_patterns(self._config.get("exclude", []))
+        self._exclude_dirs_regex = compile_patterns(self._config.get("exclude_dirs", []))
         self.tag = self._config.get("tag", "default")
+        self._manifest = (
+            FileManifest(self._config["manifest_path"], self._config.get("hash_content", False))
+            if self._config.get("manifest_path")
+            else None
+        )
 
     def run(self, documents: Optional[List[Document]]) -> List[Document]:
         """Scan directory and return list of Documents with file paths.
@@ -36,28 +63,65 @@ class FileScannerSkill(IndexerSkill):
         """
         self.logger.info("Running FileScannerSkill...")
 
-        result = []
+        result = list(self._scan())
 
-        # Get list of files
-        if self._recursive:
-            files = []
-            for root, _, filenames in os.walk(self._path):
-                for filename in filenames:
-                    files.append(Path(root) / filename)
-        else:
-            files = [self._path / f for f in os.listdir(self._path) if (self._path / f).is_file()]
+        self.logger.info(f"Returning {len(result)} documents")
 
-        # Filter files based on include/exclude patterns
-        for file_path in files:
-            # Keep if matches any include pattern
-            if not self._filter or any(fnmatch.fnmatch(file_path.name, pattern) for pattern in self._filter):
-                # Add file as document
-                doc = Document(filename=file_path, tag=self.tag)
-                result.append(doc)
+        return result
 
-        for doc in result:
-            self.logger.info(f"Found file: {doc.filename}")
+    def run_stream(
+        self, batches: Iterable[Optional[List[Document]]], batch_size: int
+    ) -> Iterator[List[Document]]:
+        """Yield the scanned files in batches as the directory is walked, without listing it upfront."""
+        self.logger.info("Running FileScannerSkill in streaming mode...")
 
-        self.logger.debug(f"Returning {len(result)} documents")
+        yield from batched(self._scan(), batch_size)
 
-        return result
+    def _iter_files(self) -> Iterator[os.DirEntry]:
+        """Walk the directory depth-first with os.scandir, in name order, yielding the files as they are found."""
+        directories = [self._path]
+        while directories:
+            directory = directories.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                # a missing or unreadable root would report every file of the manifest as deleted
+                if directory == self._path:
+                    raise
+                self.logger.info(f"Cannot scan directory {directory}: {e!s}")
+                continue
+
+            subdirectories = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self._recursive and not (
+                        self._exclude_dirs_regex and self._exclude_dirs_regex.match(entry.name)
+                    ):
+                        subdirectories.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+            directories.extend(reversed(subdirectories))
+
+    def _scan(self) -> Iterator[Document]:
+        for entry in self._iter_files():
+            # Keep if matches any include pattern and no exclude pattern
+            if self._include_regex and not self._include_regex.match(entry.name):
+                continue
+            if self._exclude_regex and self._exclude_regex.match(entry.name):
+                continue
+
+            # files are not logged one by one, which would dominate the scan time of large trees
+            file_path = Path(entry.path)
+            if self._manifest and not self._manifest.check(file_path, entry.stat()):
+                continue
+            yield Document(filename=file_path, tag=self.tag)
+
+        if self._manifest:
+            for file_path in self._manifest.deleted_files():
+                self.logger.info(f"Deleted file: {file_path}")
+                yield Document(filename=file_path, source_url=file_path, tag=self.tag, deleted=True)
+
+    def finalize(self) -> None:
+        if self._manifest:
+            self._manifest.save()
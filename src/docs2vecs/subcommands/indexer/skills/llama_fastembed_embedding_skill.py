@@ -1,14 +1,17 @@
 import contextlib
 import warnings
+from typing import Iterator
 from typing import List
 from typing import Optional
 
+import numpy as np
 import requests
-from llama_index.embeddings.fastembed import FastEmbedEmbedding
+from fastembed import TextEmbedding
 from urllib3.exceptions import InsecureRequestWarning
 
 from docs2vecs.subcommands.indexer.config.config import Config
 from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.embedding_cache import EmbeddingCache
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 
 old_merge_environment_settings = requests.Session.merge_environment_settings
@@ -47,25 +50,76 @@ def no_ssl_verification():
 
 
 class LlamaFastembedEmbeddingSkill(IndexerSkill):
+    """Embeds the chunks of all the input documents with a FastEmbed model.
+
+    Configuration parameters:
+    - model_name (str): FastEmbed model to use
+    - batch_size (int): Number of chunks embedded per forward pass of the model
+    - parallel (int): Number of data-parallel embedding processes. 0 uses all the cores, unset embeds in-process
+    - threads (int): Number of threads of the onnxruntime session
+    - model_path (str): Folder of a local copy of the model files, loaded instead of downloading the model
+    - cache_path (str): Path of the embedding cache file. Embeddings are not cached if missing
+    - cache_max_entries (int): Maximum number of embeddings kept in the cache
+    """
+
+    CONCURRENT_WORKERS = True
+    DEFAULT_BATCH_SIZE = 256
+
     def __init__(self, config: dict, global_config: Config):
         super().__init__(config, global_config)
         self._set_config_defaults()
         with no_ssl_verification():
-            self._embedding_model = FastEmbedEmbedding(model_name=self._config["model_name"])
+            self._embedding_model = TextEmbedding(
+                model_name=self._config["model_name"],
+                threads=self._config.get("threads"),
+                specific_model_path=self._config.get("model_path"),
+            )
+        self._embedding_cache = (
+            EmbeddingCache(
+                self._config["cache_path"],
+                self._config.get("cache_max_entries", EmbeddingCache.DEFAULT_MAX_ENTRIES),
+            )
+            if self._config.get("cache_path")
+            else None
+        )
+        self._cache_model_key = f"fastembed:{self._config['model_name']}"
 
     def _set_config_defaults(self):
         self._config["model_name"] = self._config.get("model_name", "sentence-transformers/all-MiniLM-L6-v2")
+        self._config["batch_size"] = self._config.get("batch_size", LlamaFastembedEmbeddingSkill.DEFAULT_BATCH_SIZE)
 
-    def _get_embedding(self, content: str):
-        return self._embedding_model.get_query_embedding(content)
+    def _get_embeddings(self, contents: List[str]) -> Iterator[np.ndarray]:
+        # query embeddings, as computed by the per-chunk get_query_embedding() of llama-index this replaced
+        return self._embedding_model.query_embed(
+            contents, batch_size=self._config["batch_size"], parallel=self._config.get("parallel")
+        )
 
     def run(self, input: Optional[List[Document]] = None) -> List[Document]:
         self.logger.info("Running LlamaFastembedEmbeddingSkill...\n")
 
         self.logger.debug(f"Going to process {len(input)} documents")
+        chunks = []
         for doc in input:
             self.logger.debug(f"Processing document: {doc.filename}")
             for chunk in doc.chunks:
-                chunk.embedding = "" if not chunk.content else self._get_embedding(chunk.content)
+                if chunk.content:
+                    chunks.append(chunk)
+                else:
+                    chunk.embedding = ""
+
+        if self._embedding_cache:
+            chunks = self._embedding_cache.load_embeddings(self._cache_model_key, chunks)
+
+        embeddings = self._get_embeddings([chunk.content for chunk in chunks])
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk.embedding = embedding
+
+        self.logger.debug(f"Embedded {len(chunks)} chunks")
+
+        if self._embedding_cache:
+            self._embedding_cache.save_embeddings(self._cache_model_key, chunks)
+            self.logger.info(
+                f"Embedding cache: {self._embedding_cache.hits} hits, {self._embedding_cache.misses} misses"
+            )
 
         return input
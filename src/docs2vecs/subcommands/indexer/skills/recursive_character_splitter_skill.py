@@ -12,6 +12,7 @@ from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 
 
 class RecursiveCharacterTextSplitter(IndexerSkill):
+    CONCURRENT_WORKERS = True
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 100
     
@@ -33,6 +34,8 @@ class RecursiveCharacterTextSplitter(IndexerSkill):
 
         for doc in input:
             self.logger.debug(f"Splitting {doc.filename}...")
+            if doc.deleted:
+                continue
             try:
                 if doc.text is None:
                     raise ValueError(f"Document {doc.filename} text is None")
@@ -5,15 +5,18 @@ from typing import Optional
 
 from llama_index.core import Document as LlamaDocument
 from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
 
 from docs2vecs.subcommands.indexer.config.config import Config
 from docs2vecs.subcommands.indexer.document.chunk import Chunk
 from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import RateLimitedAzureOpenAIEmbedding
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import get_rate_limiter
 from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
 
 
 class SemanticSplitter(IndexerSkill):
+    CONCURRENT_WORKERS = True
+
     def __init__(self, config: dict, global_config: Config):
         super().__init__(config, global_config)
 
@@ -24,7 +27,16 @@ class SemanticSplitter(IndexerSkill):
             self.logger.error("No documents provided in input")
             return input
 
-        embed_model = AzureOpenAIEmbedding(
+        embedding_model_config = self._config["embedding_model"]
+        rate_limiter = get_rate_limiter(
+            embedding_model_config["endpoint"],
+            embedding_model_config["deployment_name"],
+            tokens_per_minute=embedding_model_config.get("tokens_per_minute"),
+            requests_per_minute=embedding_model_config.get("requests_per_minute"),
+            logger=self.logger,
+        )
+        embed_model = RateLimitedAzureOpenAIEmbedding(
+            rate_limiter=rate_limiter,
             deployment_name=self._config["embedding_model"]["deployment_name"],
             api_key=self._config["embedding_model"]["api_key"],
             azure_endpoint=self._config["embedding_model"]["endpoint"],
@@ -39,6 +51,8 @@ class SemanticSplitter(IndexerSkill):
 
         for doc in input:
             self.logger.debug(f"Processing document: {doc.filename}")
+            if doc.deleted:
+                continue
             try:
                 if doc.text is None:
                     raise ValueError(f"Document {doc.filename} text is None")
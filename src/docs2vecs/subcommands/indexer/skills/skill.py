@@ -1,5 +1,9 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 
@@ -14,6 +18,10 @@ class IndexerSkill(ABC):
     Base class for all indexer skills.
     """
 
+    # whether a concurrent pipeline may run the skill on several worker threads, which share the instance:
+    # skills keeping state across batches (e.g. vector stores saving their index) run on a single worker
+    CONCURRENT_WORKERS = False
+
     def __init__(self, skill_config: dict, global_config: Config) -> None:
         self._config = skill_config.get("params", {})
         self._global_config = global_config
@@ -31,7 +39,59 @@ class IndexerSkill(ABC):
             List of processed documents
         """
 
+    def run_stream(
+        self, batches: Iterable[Optional[List[Document]]], batch_size: int
+    ) -> Iterator[List[Document]]:
+        """Execute the skill over a stream of document batches.
+
+        The default implementation adapts ``run``: it is called once per incoming
+        batch and its output is re-sliced into batches of at most ``batch_size``
+        documents, the documents of a file (e.g. its pages) being kept in the same
+        batch so that a checkpoint saves whole files. Skills that can produce their
+        output lazily (e.g. scanners) should override this method so that memory is
+        bounded by the batch size.
+
+        Args:
+            batches: Iterable of document batches. Source skills receive a single ``None`` batch.
+            batch_size: Maximum number of documents per yielded batch.
+
+        Yields:
+            Batches of processed documents
+        """
+        for batch in batches:
+            output = self.run(batch)
+            if output:
+                yield from batched(output, batch_size, key=lambda doc: doc.filename)
+
+    def finalize(self) -> None:
+        """Called by the indexer once every skill of the skillset ran successfully.
+
+        Skills keeping state across runs (e.g. the file scanner manifest) should persist it here,
+        so that a failed run is processed again in full on the next run.
+        """
+
 
 class FileLoaderSkill(IndexerSkill):
     def __init__(self, skill_config: dict, global_config: Config) -> None:
         super().__init__(skill_config, global_config)
+
+
+def batched(
+    items: Iterable[Document], batch_size: int, key: Optional[Callable[[Document], Any]] = None
+) -> Iterator[List[Document]]:
+    """Split an iterable of documents into lists of at most ``batch_size`` items.
+
+    With a ``key``, consecutive items of the same key are never split: a batch then grows past
+    ``batch_size`` until an item of another key comes.
+    """
+    batch = []
+    for item in items:
+        if key is not None and len(batch) >= batch_size and key(item) != key(batch[-1]):
+            yield batch
+            batch = []
+        batch.append(item)
+        if key is None and len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
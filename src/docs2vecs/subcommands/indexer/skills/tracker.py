@@ -1,5 +1,8 @@
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Set
 
 from docs2vecs.subcommands.indexer.document.chunk import Chunk
 
@@ -11,11 +14,21 @@ class VectorStoreTracker:
     def get_documents(self, filter: Optional[dict] = None):
         return self._db_connection.get_documents(filter)
 
-    def retrieve_failed_documents(self) -> List[Chunk]:
-        return [Chunk.FromDict(failed_doc["chunk"]) for failed_doc in self._db_connection.get_documents({"status.succeeded": False})]
+    def retrieve_failed_documents(self) -> Iterator[Chunk]:
+        """Stream the chunks whose last upload failed, without loading them all at once."""
+        for failed_doc in self._db_connection.get_documents({"status.succeeded": False}, {"chunk": 1, "_id": 0}):
+            yield Chunk.FromDict(failed_doc["chunk"])
 
     def update_documents(self, document_list: List[Chunk], result_list: list):
         self._db_connection.update_documents([x.to_dict() for x in document_list], result_list)
 
     def is_document_tracked(self, document_id: str) -> bool:
         return self._db_connection.is_document_tracked({"chunk.document_id": document_id})
+
+    def get_tracked_document_ids(self, document_ids: Iterable[str]) -> Set[str]:
+        """Return the ids of the given documents that are tracked, with a single lookup per batch of ids."""
+        return self._db_connection.get_tracked_document_ids(document_ids)
+
+    def get_untracked_document_ids(self, document_ids: Iterable[str]) -> Set[str]:
+        document_ids = set(document_ids)
+        return document_ids - self.get_tracked_document_ids(document_ids)
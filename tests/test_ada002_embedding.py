@@ -0,0 +1,107 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import AzureAda002EmbeddingSkill
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            throttled = self.server.throttled_requests > 0
+            self.server.throttled_requests -= 1
+        if throttled:
+            self.server.throttled_count += 1
+            self.send_response(429)
+            self.send_header("Retry-After-Ms", "100")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.server.requests.append(body["input"])
+        data = [
+            {"object": "embedding", "index": index, "embedding": [float(len(text)), 1.0]}
+            for index, text in enumerate(body["input"])
+        ]
+        payload = json.dumps(
+            {"object": "list", "data": data, "model": "ada", "usage": {"prompt_tokens": 1, "total_tokens": 1}}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def embedding_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmbeddingRequestHandler)
+    server.requests = []
+    server.lock = threading.Lock()
+    server.throttled_requests = 0
+    server.throttled_count = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def _make_documents(contents_per_document):
+    documents = []
+    for doc_index, contents in enumerate(contents_per_document):
+        doc = Document(filename=f"doc_{doc_index}")
+        for chunk_index, content in enumerate(contents):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{doc_index}_{chunk_index}"
+            chunk.content = content
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    return documents
+
+
+def _make_skill(server, **params):
+    return AzureAda002EmbeddingSkill(
+        {
+            "params": {
+                "endpoint": f"http://127.0.0.1:{server.server_port}",
+                "api_key": "test-key",
+                "api_version": "2024-02-15-preview",
+                "deployment_name": "ada",
+                **params,
+            }
+        },
+        None,
+    )
+
+
+def test_chunks_are_embedded_in_multi_input_requests(embedding_server) -> None:
+    skill = _make_skill(embedding_server, batch_size=2, max_concurrency=2)
+    documents = _make_documents([["a", "bb", "ccc"], ["dddd", ""]])
+
+    skill.run(documents)
+
+    assert sorted(len(inputs) for inputs in embedding_server.requests) == [2, 2]
+    embeddings = {chunk.content: chunk.embedding.tolist() for doc in documents for chunk in doc.chunks}
+    assert embeddings == {"a": [1.0, 1.0], "bb": [2.0, 1.0], "ccc": [3.0, 1.0], "dddd": [4.0, 1.0], "": []}
+
+
+def test_throttled_requests_are_retried(embedding_server) -> None:
+    embedding_server.throttled_requests = 3
+    skill = _make_skill(embedding_server, batch_size=1, max_concurrency=4, requests_per_minute=6000)
+    documents = _make_documents([["a", "bb", "ccc", "dddd"]])
+
+    skill.run(documents)
+
+    assert embedding_server.throttled_count == 3
+    assert len(embedding_server.requests) == 4
+    assert all(chunk.embedding.tolist() == [float(len(chunk.content)), 1.0] for chunk in documents[0].chunks)
+    assert skill._embed_model._rate_limiter.concurrency.limit < 4
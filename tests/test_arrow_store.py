@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import List
+
+import chromadb
+import numpy as np
+import pytest
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import ArrowLoaderSkill
+from docs2vecs.subcommands.indexer.skills import ArrowVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills import ChromaDBVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills.arrow_chunk_store import ArrowChunkStore
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _make_docs(count: int, chunks_per_doc: int) -> List[Document]:
+    docs = []
+    for i in range(count):
+        doc = Document(filename=f"doc_{i}", source_url=f"source_{i}", tag=f"tag_{i}")
+        for j in range(chunks_per_doc):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{i}_{j}"
+            # like the splitters, which set the document id of a chunk from its content
+            chunk.document_id = chunk.chunk_id
+            chunk.document_name = f"doc_{i}"
+            chunk.content = f"content {i} {j}"
+            chunk.source_link = f"source_{i}"
+            chunk.embedding = [float(i), float(j), 1.0]
+            doc.add_chunk(chunk)
+        docs.append(doc)
+    return docs
+
+
+def _get_embeddings(docs: List[Document]) -> dict:
+    return {chunk.chunk_id: chunk.embedding.tolist() for doc in docs for chunk in doc.chunks}
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_arrow_store_round_trip(tmp_path: Path, format: str) -> None:
+    config = {"params": {"path": str(tmp_path), "format": format, "rows_per_batch": 3, "overwrite_index": True}}
+    store = ArrowVectorStoreSkill(config, None)
+    docs = _make_docs(4, 2)
+    # one part file per run, deleted documents are skipped
+    store.run(docs[:2])
+    store.run(docs[2:] + [Document(filename="gone", deleted=True)])
+
+    assert [file.name for file in ArrowChunkStore.list_files(tmp_path)] == [
+        f"part-000000.{format}",
+        f"part-000001.{format}",
+    ]
+
+    loader = ArrowLoaderSkill({"params": {"path": str(tmp_path)}}, None)
+    loaded = loader.run()
+    assert _get_embeddings(loaded) == _get_embeddings(docs)
+    doc = next(doc for doc in loaded if doc.filename == "doc_3")
+    assert (doc.source_url, doc.tag) == ("source_3", "tag_3")
+    assert {chunk.content for chunk in doc.chunks} <= {"content 3 0", "content 3 1"}
+    # the chunks of a document split across batches of 3 rows are loaded as one document
+    assert [len(doc.chunks) for doc in loaded] == [2, 2, 2, 2]
+
+    batches = list(loader.run_stream([None], 3))
+    assert [[len(doc.chunks) for doc in batch] for batch in batches] == [[2, 2, 2], [2]]
+
+    # a new run without overwrite_index adds its files to the folder
+    ArrowVectorStoreSkill({"params": {**config["params"], "overwrite_index": False}}, None).run(_make_docs(1, 1))
+    assert len(ArrowChunkStore.list_files(tmp_path)) == 3
+    ArrowVectorStoreSkill(config, None)
+    assert ArrowChunkStore.list_files(tmp_path) == []
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_arrow_loader_joins_the_chunks_of_a_document_across_batches(tmp_path: Path, format: str) -> None:
+    config = {"params": {"path": str(tmp_path), "format": format, "rows_per_batch": 2}}
+    docs = _make_docs(2, 5)
+    ArrowVectorStoreSkill(config, None).run(docs[:1])
+    ArrowVectorStoreSkill({"params": {**config["params"], "overwrite_index": False}}, None).run(docs[1:])
+    assert len(list(ArrowChunkStore.read(str(tmp_path)))) == 6
+
+    loader = ArrowLoaderSkill({"params": {"path": str(tmp_path)}}, None)
+    for loaded in [loader.run(), [doc for batch in loader.run_stream([None], 1) for doc in batch]]:
+        assert [(doc.filename, len(doc.chunks)) for doc in loaded] == [("doc_0", 5), ("doc_1", 5)]
+        assert _get_embeddings(loaded) == _get_embeddings(docs)
+
+
+def test_arrow_loader_memory_maps_the_embeddings(tmp_path: Path) -> None:
+    ArrowVectorStoreSkill({"params": {"path": str(tmp_path), "format": "arrow"}}, None).run(_make_docs(2, 2))
+
+    allocated_bytes = pa.total_allocated_bytes()
+    batches = list(ArrowChunkStore.read(str(tmp_path)))
+
+    # the embeddings are read from the mapped file, without an Arrow buffer being allocated
+    assert pa.total_allocated_bytes() == allocated_bytes
+    assert len(batches) == 1
+    embeddings = batches[0].embeddings
+    assert embeddings.dtype == np.float32
+    assert not embeddings.flags.writeable and not embeddings.flags.owndata
+    assert all(np.shares_memory(chunk.embedding, embeddings) for chunk in batches[0].to_chunks())
+    assert sorted(embeddings.tolist()) == [[0.0, 0.0, 1.0], [0.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 1.0, 1.0]]
+
+
+def test_arrow_store_without_embeddings(tmp_path: Path) -> None:
+    docs = _make_docs(1, 2)
+    for chunk in docs[0].chunks:
+        chunk.embedding = None
+    ArrowVectorStoreSkill({"params": {"path": str(tmp_path)}}, None).run(docs)
+
+    loaded = ArrowLoaderSkill({"params": {"path": str(tmp_path)}}, None).run()
+
+    assert [len(chunk.embedding) for chunk in loaded[0].chunks] == [0, 0]
+
+
+def test_arrow_store_rejects_unknown_formats(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown chunk file format: csv"):
+        ArrowVectorStoreSkill({"params": {"path": str(tmp_path), "format": "csv"}}, None)
+    with pytest.raises(ValueError, match="No chunk files found"):
+        ArrowLoaderSkill({"params": {"path": str(tmp_path)}}, None).run()
+
+
+def test_arrow_loader_feeds_a_vector_store(tmp_path: Path) -> None:
+    ArrowVectorStoreSkill({"params": {"path": str(tmp_path / "chunks"), "format": "arrow"}}, None).run(
+        _make_docs(3, 2)
+    )
+    chroma = ChromaDBVectorStoreSkill(
+        {"params": {"db_path": str(tmp_path / "chroma"), "collection_name": "test"}}, None
+    )
+
+    for batch in ArrowLoaderSkill({"params": {"path": str(tmp_path / "chunks")}}, None).run_stream([None], 2):
+        chroma.run(batch)
+
+    stored = chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_collection("test").get(
+        ids=["chunk_2_1"], include=["documents", "embeddings", "metadatas"]
+    )
+    assert stored["documents"] == ["content 2 1"]
+    assert stored["embeddings"][0].tolist() == [2.0, 1.0, 1.0]
+    assert stored["metadatas"][0]["source"] == "source_2"
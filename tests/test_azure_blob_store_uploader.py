@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import AzureBlobStoreUploaderSkill
+
+
+class FakeBlobClient:
+    def __init__(self, blob_name: str, uploads: dict) -> None:
+        self.url = f"https://storage.blob.core.windows.net/container/{blob_name}"
+        self._blob_name = blob_name
+        self._uploads = uploads
+
+    def upload_blob(self, data, overwrite: bool = False) -> None:
+        self._uploads[self._blob_name] = data.read()
+
+
+def test_blob_uploader_skips_deleted_documents(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    uploads = {}
+    monkeypatch.setattr(
+        AzureBlobStoreUploaderSkill, "_get_blob_client", lambda self, blob_name: FakeBlobClient(blob_name, uploads)
+    )
+    config = {"params": {"blob_path": "docs", "container_name": "container", "storage_url": "https://storage"}}
+    file_path = tmp_path / "kept.txt"
+    file_path.write_text("kept")
+    docs = [Document(filename=str(file_path)), Document(filename=str(tmp_path / "removed.txt"), deleted=True)]
+
+    assert AzureBlobStoreUploaderSkill(config, None).run(docs) == docs
+    assert uploads == {"docs/kept.txt": b"kept"}
@@ -0,0 +1,67 @@
+import time
+
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import AdaptiveConcurrencyLimiter
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import TokenBucket
+from docs2vecs.subcommands.indexer.skills.azure_rate_limiter import get_rate_limiter
+
+
+def test_token_bucket_limits_the_rate() -> None:
+    bucket = TokenBucket(per_minute=600)  # 10 tokens per second, bursts of 100
+
+    start = time.monotonic()
+    bucket.acquire(100)
+    bucket.acquire(5)
+    elapsed = time.monotonic() - start
+
+    assert 0.4 < elapsed < 2
+
+
+def test_concurrency_limit_is_adjusted_with_aimd() -> None:
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=8)
+
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release()
+    assert 2 < limiter.limit <= 8
+
+
+def test_rate_limiter_is_shared_per_deployment() -> None:
+    limiter = get_rate_limiter("https://shared.openai.azure.com", "ada", max_concurrency=2)
+
+    assert get_rate_limiter("https://shared.openai.azure.com", "ada") is limiter
+    assert get_rate_limiter("https://shared.openai.azure.com", "other") is not limiter
+
+
+def test_rate_limiter_merges_the_limits_of_its_callers() -> None:
+    # e.g. a semantic splitter created before the embedding skill of the same deployment
+    limiter = get_rate_limiter("https://merged.openai.azure.com", "ada", tokens_per_minute=120_000)
+    assert (limiter.max_concurrency, limiter.max_retries) == (4, 10)
+
+    shared = get_rate_limiter(
+        "https://merged.openai.azure.com",
+        "ada",
+        tokens_per_minute=60_000,
+        requests_per_minute=600,
+        max_concurrency=8,
+        max_retries=3,
+    )
+
+    assert shared is limiter
+    # the limits set by a single caller apply
+    assert (limiter.tokens_per_minute, limiter.requests_per_minute) == (60_000, 600)
+    assert (limiter.max_concurrency, limiter.concurrency.limit) == (8, 8)
+    assert limiter.max_retries == 3
+
+    get_rate_limiter(
+        "https://merged.openai.azure.com", "ada", tokens_per_minute=90_000, max_concurrency=2, max_retries=20
+    )
+
+    # the strictest quotas and concurrency limit, and the most retries, apply
+    assert limiter.tokens_per_minute == 60_000
+    assert (limiter.max_concurrency, limiter.concurrency.limit) == (2, 2)
+    assert limiter.max_retries == 20
@@ -0,0 +1,273 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import AzureVectorStoreSkill
+
+INDEX_DEFINITION = {
+    "name": "test-index",
+    "fields": [
+        {"name": "id", "type": "Edm.String", "key": True},
+        {"name": "content", "type": "Edm.String"},
+    ],
+}
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Minimal Azure AI Search service: index definitions, aliases, and the index and search documents APIs."""
+
+    def do_GET(self):
+        name = self._get_name()
+        with self.server.lock:
+            if self.path.startswith("/aliases"):
+                alias = self.server.aliases.get(name)
+                self._send_json(404, {}) if alias is None else self._send_json(200, {"name": name, "indexes": [alias]})
+            elif name in self.server.indexes:
+                self._send_json(200, {**INDEX_DEFINITION, "name": name})
+            else:
+                self._send_json(404, {})
+
+    def do_PUT(self):
+        body = self._read_json()
+        with self.server.lock:
+            self.server.aliases[body["name"]] = body["indexes"][0]
+        self._send_json(200, body)
+
+    def do_DELETE(self):
+        with self.server.lock:
+            deleted = self.server.indexes.pop(self._get_name(), None)
+        self._send_json(404 if deleted is None else 204, {})
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path.startswith("/indexes?"):
+            with self.server.lock:
+                self.server.indexes[body["name"]] = set()
+            self._send_json(201, body)
+        elif re.search(r"/docs/search\.post\.search", self.path):
+            self._search(body)
+        else:
+            self._index(body)
+
+    def _search(self, body):
+        skip = body.get("skip", 0)
+        count = min(body["top"], self.server.page_size)
+        with self.server.lock:
+            self.server.searches.append(body["top"])
+            keys = sorted(self.server.indexes[self._get_name()])[skip : skip + count]
+        payload = {"value": [{"@search.score": 1.0, "id": key} for key in keys]}
+        if len(keys) == count < body["top"]:
+            payload["@search.nextPageParameters"] = {**body, "skip": skip + count, "top": body["top"] - count}
+        self._send_json(200, payload)
+
+    def _index(self, body):
+        keys = [document["id"] for document in body["value"]]
+        stored = self.server.indexes[self._get_name()]
+        with self.server.lock:
+            self.server.requests.append(keys)
+            results = []
+            for document in body["value"]:
+                key = document["id"]
+                failures = self.server.failures.get(key, 0)
+                self.server.failures[key] = failures - 1
+                succeeded = failures <= 0
+                if succeeded and document["@search.action"] == "delete":
+                    stored.discard(key)
+                elif succeeded:
+                    stored.add(key)
+                results.append(
+                    {
+                        "key": key,
+                        "status": succeeded,
+                        "errorMessage": None if succeeded else "Service unavailable",
+                        "statusCode": 201 if succeeded else 503,
+                    }
+                )
+        self._send_json(207 if any(not result["status"] for result in results) else 200, {"value": results})
+
+    def _get_name(self):
+        return re.search(r"\('([^']+)'\)", self.path).group(1)
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or "{}")
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def search_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SearchRequestHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures = {}
+    server.stored = set()
+    server.indexes = {"test-index": server.stored}
+    server.aliases = {}
+    server.page_size = 1000
+    server.searches = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def _make_skill(server, **params):
+    skill = AzureVectorStoreSkill(
+        {
+            "params": {
+                "endpoint": f"http://127.0.0.1:{server.server_port}",
+                "index_name": "test-index",
+                "api_key": "test-key",
+                "field_mapping": {"document_id": "id", "content": "content"},
+                **params,
+            }
+        },
+        None,
+    )
+    skill.RETRY_DELAY = 0.01
+    return skill
+
+
+def _make_documents(count: int, content: str = "text"):
+    doc = Document(filename="doc")
+    for index in range(count):
+        chunk = Chunk()
+        chunk.document_id = f"chunk_{index}"
+        chunk.chunk_id = chunk.document_id
+        chunk.content = content
+        doc.add_chunk(chunk)
+    return [doc]
+
+
+def test_batches_are_limited_by_count_and_payload_size(search_server) -> None:
+    skill = _make_skill(search_server, batch_size=4, max_batch_bytes=2000, max_concurrency=3)
+
+    skill.run(_make_documents(10))
+    assert sorted(len(keys) for keys in search_server.requests) == [2, 4, 4]
+
+    search_server.requests.clear()
+    # each document is about 550 bytes, 3 of them fit in 2000 bytes
+    skill.run(_make_documents(10, content="x" * 500))
+    assert sorted(len(keys) for keys in search_server.requests) == [1, 3, 3, 3]
+    assert search_server.stored == {f"chunk_{index}" for index in range(10)}
+
+
+def test_only_failed_documents_are_uploaded_again(search_server) -> None:
+    search_server.failures = {"chunk_1": 2, "chunk_6": 1}
+    skill = _make_skill(search_server, batch_size=5)
+    chunks = list(_make_documents(10)[0].chunks)
+
+    results = skill._upload_embeddings(chunks)
+
+    assert [result.key for result in results] == [chunk.chunk_id for chunk in chunks]
+    assert all(result.succeeded for result in results)
+    sent_keys = [key for keys in search_server.requests for key in keys]
+    assert sent_keys.count("chunk_1") == 3
+    assert sent_keys.count("chunk_6") == 2
+    assert len(sent_keys) == 13
+
+
+def test_documents_failing_after_the_last_retry_are_reported(search_server) -> None:
+    search_server.failures = {"chunk_0": 10}
+    skill = _make_skill(search_server, max_retries=2)
+    chunks = list(_make_documents(3)[0].chunks)
+
+    results = {result.key: result for result in skill._upload_embeddings(chunks)}
+
+    assert not results["chunk_0"].succeeded
+    assert results["chunk_0"].status_code == 503
+    assert results["chunk_1"].succeeded
+    assert len(search_server.requests) == 3
+
+
+class FailedChunksTracker:
+    def __init__(self, failed_chunks) -> None:
+        self.failed_chunks = failed_chunks
+        self.updated = []
+
+    def retrieve_failed_documents(self):
+        yield from self.failed_chunks
+
+    def update_documents(self, document_list, result_list) -> None:
+        self.updated.extend(chunk.document_id for chunk in document_list)
+
+
+def test_failed_chunks_are_uploaded_again_with_the_first_batch_only(search_server) -> None:
+    failed_chunk = next(iter(_make_documents(1)[0].chunks))
+    failed_chunk.document_id = failed_chunk.chunk_id = "failed"
+    skill = _make_skill(search_server)
+    skill._vector_store_tracker = FailedChunksTracker([failed_chunk])
+
+    for batch in range(3):
+        skill.run(_make_documents(2))
+
+    sent_keys = [key for keys in search_server.requests for key in keys]
+    assert sent_keys.count("failed") == 1
+    assert len(sent_keys) == 7
+
+
+def test_cleanup_deletes_the_index_page_by_page(search_server) -> None:
+    search_server.stored.update(f"old_{index}" for index in range(23))
+    search_server.page_size = 5
+    skill = _make_skill(search_server, batch_size=3, overwrite_index=True)
+    skill.CLEANUP_ROUND_SIZE = 10
+
+    skill.run(_make_documents(2))
+
+    assert search_server.stored == {"chunk_0", "chunk_1"}
+    # deletions shift the pages being read, the rounds go on until a round finds no document
+    assert search_server.searches.count(10) >= 3
+    assert max(search_server.searches) == 10
+    assert max(len(keys) for keys in search_server.requests) == 3
+
+
+def test_cleanup_retries_failed_deletions_and_stops_without_progress(search_server) -> None:
+    search_server.stored.update(f"old_{index}" for index in range(6))
+    search_server.failures = {"old_1": 1}
+    skill = _make_skill(search_server, batch_size=2, overwrite_index=True)
+
+    skill._cleanup_index()
+
+    assert search_server.stored == set()
+    assert [key for keys in search_server.requests for key in keys].count("old_1") == 2
+
+    # a document that cannot be deleted fails the cleanup, rather than being read again forever
+    search_server.stored.update({"old_0", "old_1"})
+    search_server.failures = {"old_1": 100}
+    with pytest.raises(ValueError, match="Could not delete any of the 1 documents read from index test-index"):
+        skill._cleanup_index()
+    assert search_server.stored == {"old_1"}
+
+
+def test_blue_green_run_switches_the_alias_to_a_new_index(search_server) -> None:
+    search_server.stored.add("old")
+
+    skill = _make_skill(search_server, overwrite_index=True, blue_green=True)
+    skill.run(_make_documents(2))
+    assert search_server.indexes["test-index-blue"] == {"chunk_0", "chunk_1"}
+    assert "test-index" in search_server.indexes
+    skill.finalize()
+    assert search_server.aliases == {"test-index": "test-index-blue"}
+    assert "test-index" not in search_server.indexes
+
+    skill = _make_skill(search_server, overwrite_index=True, blue_green=True)
+    skill.run(_make_documents(1))
+    skill.finalize()
+    assert search_server.aliases == {"test-index": "test-index-green"}
+    assert search_server.indexes["test-index-green"] == {"chunk_0"}
+    assert search_server.indexes["test-index-blue"] == {"chunk_0", "chunk_1"}
@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import List
+
+import chromadb
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import ChromaDBVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills.embedding_cache import content_hash
+
+
+def _make_docs(count: int, chunks_per_doc: int) -> List[Document]:
+    docs = []
+    for i in range(count):
+        doc = Document(filename=f"doc_{i}", tag=f"tag_{i}")
+        for j in range(chunks_per_doc):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{i}_{j}"
+            chunk.content = f"content {i} {j}"
+            chunk.source_link = f"source_{i}"
+            chunk.embedding = [float(i), float(j), 1.0]
+            doc.add_chunk(chunk)
+        docs.append(doc)
+    return docs
+
+
+def test_chromadb_vector_store_skill_batches_chunks_across_documents(tmp_path: Path, monkeypatch) -> None:
+    skill = ChromaDBVectorStoreSkill(
+        {"params": {"db_path": str(tmp_path), "collection_name": "test", "batch_size": 8}}, None
+    )
+    upserts = []
+    collection = skill._get_collection()
+    upsert = collection.upsert
+    monkeypatch.setattr(collection, "upsert", lambda **kwargs: upserts.append(len(kwargs["ids"])) or upsert(**kwargs))
+
+    docs = _make_docs(10, 2)
+    # the same chunk in two documents is only upserted once
+    docs[1].add_chunk(next(iter(docs[0].chunks)))
+    skill.run(docs)
+
+    assert upserts == [8, 8, 4]
+    stored = chromadb.PersistentClient(path=str(tmp_path)).get_collection("test").get(ids=["chunk_3_1"])
+    assert stored["documents"] == ["content 3 1"]
+    assert stored["metadatas"] == [
+        {"source": "source_3", "tags": "tag_3", "content_hash": content_hash("content 3 1")}
+    ]
+
+
+def test_chromadb_vector_store_skill_only_upserts_new_or_changed_chunks(tmp_path: Path, monkeypatch) -> None:
+    config = {"params": {"db_path": str(tmp_path), "collection_name": "test", "delete_missing_sources": True}}
+    ChromaDBVectorStoreSkill(config, None).run(_make_docs(3, 2))
+
+    skill = ChromaDBVectorStoreSkill(config, None)
+    upserted_ids = []
+    collection = skill._get_collection()
+    upsert = collection.upsert
+    monkeypatch.setattr(collection, "upsert", lambda **kwargs: upserted_ids.extend(kwargs["ids"]) or upsert(**kwargs))
+
+    docs = _make_docs(4, 2)
+    changed_chunk = next(chunk for chunk in docs[0].chunks if chunk.chunk_id == "chunk_0_0")
+    changed_chunk.content = "changed content"
+    docs[1].tag = "changed tag"
+    # doc_2 disappeared since the previous run
+    docs[2] = Document(filename="doc_2", source_url="source_2", deleted=True)
+    skill.run(docs)
+
+    assert sorted(upserted_ids) == ["chunk_0_0", "chunk_1_0", "chunk_1_1", "chunk_3_0", "chunk_3_1"]
+    stored = chromadb.PersistentClient(path=str(tmp_path)).get_collection("test").get()
+    assert sorted(stored["ids"]) == ["chunk_0_0", "chunk_0_1", "chunk_1_0", "chunk_1_1", "chunk_3_0", "chunk_3_1"]
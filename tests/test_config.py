@@ -1,6 +1,8 @@
 from io import StringIO
 from pathlib import Path
 
+import pytest
+import yaml
 from dotenv import load_dotenv
 
 from docs2vecs.subcommands.indexer.config.config import Config
@@ -94,3 +96,30 @@ def test_config():
     }
     assert actual_vector_store_config is not None
     assert actual_vector_store_config == expected_vector_store_config
+
+
+def _write_config(tmp_path: Path, skillset: list, pipeline: dict) -> Path:
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "definitions": [{"skillset": skillset}],
+                "indexer": {"id": "Indexer", "pipeline": pipeline, "skillset": skillset},
+            }
+        )
+    )
+    return config_file
+
+
+def test_config_rejects_duplicate_skill_names(tmp_path: Path) -> None:
+    schema_file = Path("src/docs2vecs/subcommands/indexer/config/config_schema.yaml")
+    skillset = [
+        {"type": "file-scanner", "name": "scanner", "params": {"path": str(tmp_path)}},
+        {"type": "file-reader", "name": "reader"},
+        {"type": "file-reader", "name": "reader"},
+    ]
+
+    with pytest.raises(ValueError, match="Skill names must be unique in the skillset, found duplicates: reader"):
+        Config(_write_config(tmp_path, skillset, {"mode": "concurrent", "workers": {"reader": 2}}), schema_file)
+    with pytest.raises(ValueError, match="Unknown skills in the pipeline workers: splitter"):
+        Config(_write_config(tmp_path, skillset[:2], {"mode": "concurrent", "workers": {"splitter": 2}}), schema_file)
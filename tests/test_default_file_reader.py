@@ -0,0 +1,118 @@
+import multiprocessing
+import time
+from pathlib import Path
+from typing import List
+
+from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.skills import DefaultFileReader
+
+
+def _load_slowly(file_path: Path) -> List[Document]:
+    if file_path.name.startswith("hanging"):
+        time.sleep(60)
+    return DefaultFileReader._load_text(file_path)
+
+
+def _write_files(folder: Path, names: List[str]) -> List[Document]:
+    documents = []
+    for name in names:
+        (folder / name).write_text(f"content of {name}")
+        documents.append(Document(filename=str(folder / name), tag="test_tag"))
+    return documents
+
+
+def test_parallel_read_keeps_input_order(tmp_path: Path) -> None:
+    documents = _write_files(tmp_path, [f"file_{i}.txt" for i in range(6)])
+    serial_reader = DefaultFileReader({"params": {}}, None)
+    parallel_reader = DefaultFileReader({"params": {"max_workers": 2}}, None)
+
+    serial_docs = serial_reader.run(documents)
+    parallel_docs = parallel_reader.run(documents)
+
+    assert [doc.text for doc in parallel_docs] == [doc.text for doc in serial_docs]
+    assert [doc.text for doc in parallel_docs] == [f"content of file_{i}.txt" for i in range(6)]
+    assert all(doc.tag == "test_tag" for doc in parallel_docs)
+
+
+def test_parallel_read_skips_hanging_files(tmp_path: Path) -> None:
+    documents = _write_files(tmp_path, ["file_0.txt", "hanging.txt", "file_1.txt"])
+    reader = DefaultFileReader({"params": {"max_workers": 2, "file_timeout": 1}}, None)
+    reader._extension_handlers[".txt"] = _load_slowly
+
+    loaded_docs = reader.run(documents)
+
+    assert [doc.text for doc in loaded_docs] == ["content of file_0.txt", "content of file_1.txt"]
+
+
+def test_parallel_read_reuses_its_pool_until_finalized(tmp_path: Path) -> None:
+    documents = _write_files(tmp_path, [f"file_{i}.txt" for i in range(4)])
+    reader = DefaultFileReader({"params": {"max_workers": 2}}, None)
+
+    # one batch at a time, as in a streaming run
+    batches = list(reader.run_stream(iter([documents[:2], documents[2:]]), 2))
+    pool = reader._pool
+
+    assert [doc.text for batch in batches for doc in batch] == [f"content of file_{i}.txt" for i in range(4)]
+    assert reader.run(documents[:1]) and reader._pool is pool
+    reader.finalize()
+    assert reader._pool is None
+
+
+
+class StuckPool:
+    """A pool whose processes are stuck on ``stuck_files``: the other files are never parsed."""
+
+    def __init__(self, stuck_files: List[str]) -> None:
+        self.stuck_files = stuck_files
+        self.submitted = []
+
+    def apply_async(self, function, args):
+        handler, file_path, timeout = args
+        self.submitted.append(Path(file_path).name)
+        return StuckResult() if self.stuck_files else ParsedResult(function(handler, file_path, timeout))
+
+    def close(self) -> None:
+        pass
+
+    def terminate(self) -> None:
+        pass
+
+
+class StuckResult:
+    def ready(self) -> bool:
+        return False
+
+    def get(self, timeout=None):
+        raise multiprocessing.TimeoutError()
+
+
+class ParsedResult:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def ready(self) -> bool:
+        return True
+
+    def get(self, timeout=None):
+        return self.value
+
+
+def test_parallel_read_resubmits_the_files_queued_behind_a_stuck_one(tmp_path: Path) -> None:
+    documents = _write_files(tmp_path, ["stuck.txt"] + [f"file_{i}.txt" for i in range(3)])
+    reader = DefaultFileReader({"params": {"max_workers": 2}}, None)
+    stuck_pool, new_pool = StuckPool(["stuck.txt"]), StuckPool([])
+    pools = [stuck_pool, new_pool]
+
+    def get_pool():
+        if reader._pool is None:
+            reader._pool = pools.pop(0)
+        return reader._pool
+
+    reader._get_pool = get_pool
+
+    loaded_docs = reader.run(documents)
+
+    # the files queued behind the stuck one are read by a new pool, rather than each timing out
+    assert [doc.text for doc in loaded_docs] == [f"content of file_{i}.txt" for i in range(3)]
+    assert reader._retired_pools == [stuck_pool]
+    assert new_pool.submitted == ["file_0.txt", "file_1.txt", "file_2.txt"]
@@ -0,0 +1,101 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import ChunkBatch
+from docs2vecs.subcommands.indexer.document import Document
+
+
+def test_chunk_embeddings_are_float32_arrays() -> None:
+    chunk = Chunk()
+    assert not hasattr(chunk, "__dict__")
+    assert chunk.embedding.shape == (0,)
+
+    chunk.embedding = [0.5, 1.0]
+    assert chunk.embedding.dtype == np.float32
+    assert chunk.embedding.tolist() == [0.5, 1.0]
+
+    # rows of a float32 matrix are kept as views, without a copy
+    matrix = np.ones((2, 3), dtype=np.float32)
+    chunk.embedding = matrix[1]
+    assert np.shares_memory(chunk.embedding, matrix)
+
+    chunk.embedding = ""
+    assert chunk.embedding.shape == (0,)
+
+
+def test_pickled_chunks_are_rehashed() -> None:
+    doc = Document(filename="doc")
+    chunk = Chunk()
+    chunk.chunk_id = "chunk"
+    chunk.embedding = [1.0, 2.0]
+    doc.add_chunk(chunk)
+
+    state = chunk.__getstate__()
+    restored = pickle.loads(pickle.dumps(doc))
+
+    assert "_hash" not in state
+    assert restored.chunks == {chunk}
+    assert next(iter(restored.chunks)).embedding.tolist() == [1.0, 2.0]
+
+
+def _make_documents():
+    documents = []
+    for index in range(3):
+        doc = Document(filename=f"doc_{index}", tag=f"tag_{index}")
+        for part in range(2):
+            chunk = Chunk()
+            # the first chunk of the last document has the id of the first chunk of the first one
+            chunk.chunk_id = "chunk_0_0" if (index, part) == (2, 0) else f"chunk_{index}_{part}"
+            chunk.content = f"content {index} {part}"
+            chunk.source_link = doc.filename
+            chunk.embedding = [float(index), float(part)]
+            doc.add_chunk(chunk)
+        documents.append(doc)
+    documents.append(Document(filename="gone", deleted=True))
+    return documents
+
+
+def test_chunk_batch_gathers_the_chunks_of_documents() -> None:
+    batch = ChunkBatch.from_documents(_make_documents(), unique=True)
+
+    assert sorted(batch.chunk_ids) == ["chunk_0_0", "chunk_0_1", "chunk_1_0", "chunk_1_1", "chunk_2_1"]
+    assert batch.embeddings.shape == (5, 2)
+    assert batch.embeddings.dtype == np.float32
+    row = batch.chunk_ids.index("chunk_1_0")
+    assert batch.contents[row] == "content 1 0"
+    assert batch.tags[row] == "tag_1"
+    assert batch.embeddings[row].tolist() == [1.0, 0.0]
+
+    taken = batch.take([row])
+    assert taken.chunk_ids == ["chunk_1_0"]
+    assert batch.slice(1, 3).chunk_ids == batch.chunk_ids[1:3]
+
+
+def test_chunk_batch_embeddings_are_views_of_the_matrix() -> None:
+    batch = ChunkBatch.from_documents(_make_documents())
+    embeddings = np.arange(len(batch) * 3, dtype=np.float32).reshape(len(batch), 3)
+
+    batch.set_embeddings(embeddings)
+
+    assert all(np.shares_memory(chunk.embedding, embeddings) for chunk in batch.chunks)
+    assert batch.chunks[1].embedding.tolist() == [3.0, 4.0, 5.0]
+    with pytest.raises(ValueError, match="Expected 6 embeddings"):
+        batch.set_embeddings(embeddings[:2])
+
+
+def test_chunk_batch_arrow_round_trip() -> None:
+    pytest.importorskip("pyarrow")
+    batch = ChunkBatch.from_documents(_make_documents())
+
+    table = batch.to_arrow()
+    restored = ChunkBatch.from_arrow(table)
+
+    assert table.num_rows == len(batch)
+    assert restored.chunk_ids == batch.chunk_ids
+    assert restored.tags == batch.tags
+    assert np.array_equal(restored.embeddings, batch.embeddings)
+    chunk = restored.to_chunks()[0]
+    assert (chunk.chunk_id, chunk.embedding.tolist()) == (batch.chunk_ids[0], batch.embeddings[0].tolist())
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.skills.embedding_cache import EmbeddingCache
+
+
+def _make_chunk(content: str, embedding=None) -> Chunk:
+    chunk = Chunk()
+    chunk.chunk_id = content
+    chunk.content = content
+    if embedding is not None:
+        chunk.embedding = embedding
+    return chunk
+
+
+def test_embeddings_are_cached_per_model(tmp_path: Path) -> None:
+    cache_path = tmp_path / "cache.sqlite"
+    EmbeddingCache(cache_path).save_embeddings("model-a", [_make_chunk("hello", [0.5, 1.0])])
+
+    cache = EmbeddingCache(cache_path)
+    chunks = [_make_chunk("hello"), _make_chunk("world")]
+    missing = cache.load_embeddings("model-a", chunks)
+
+    assert missing == [chunks[1]]
+    assert chunks[0].embedding.tolist() == [0.5, 1.0]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.load_embeddings("model-b", [_make_chunk("hello")])[0].content == "hello"
+
+
+def test_least_recently_used_embeddings_are_evicted(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.save_embeddings("model", [_make_chunk("first", [1.0])])
+    cache.save_embeddings("model", [_make_chunk("second", [2.0])])
+    cache.load_embeddings("model", [_make_chunk("first")])
+
+    cache.save_embeddings("model", [_make_chunk("third", [3.0])])
+
+    missing = cache.load_embeddings("model", [_make_chunk("first"), _make_chunk("second"), _make_chunk("third")])
+    assert [chunk.content for chunk in missing] == ["second"]
+
+
+def test_the_number_of_embeddings_is_kept_in_memory(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", max_entries=3)
+    statements = []
+    cache._connection.set_trace_callback(statements.append)
+
+    cache.save_embeddings("model", [_make_chunk("first", [1.0]), _make_chunk("second", [2.0])])
+    # embeddings saved again are updated, not counted twice
+    cache.save_embeddings("model", [_make_chunk("first", [1.5]), _make_chunk("third", [3.0])])
+    cache.save_embeddings("model", [_make_chunk("fourth", [4.0])])
+
+    assert not [statement for statement in statements if "COUNT" in statement]
+    assert cache._count == 3
+    assert EmbeddingCache(tmp_path / "cache.sqlite")._count == 3
+    # the least recently used embedding was evicted when the fourth one was saved
+    first, second = _make_chunk("first"), _make_chunk("second")
+    assert cache.load_embeddings("model", [first, second]) == [second]
+    assert first.embedding.tolist() == [1.5]
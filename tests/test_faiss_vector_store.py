@@ -1,8 +1,14 @@
 from docs2vecs.subcommands.indexer.skills import FaissVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills.faiss_native_store import FaissNativeStore
+from docs2vecs.subcommands.indexer.skills.faiss_native_store import ShardedFaissStore
+from docs2vecs.subcommands.indexer.skills.faiss_native_store import search_indexes
 from docs2vecs.subcommands.indexer.document.document import Document
 from docs2vecs.subcommands.indexer.document import Chunk
 from langchain_community.vectorstores import FAISS
 from pathlib import Path
+import faiss
+import numpy as np
+import pytest
 import shutil
 from docs2vecs.subcommands.indexer.document.document import Document
 from typing import Optional
@@ -127,3 +133,328 @@ def _compare_lists_of_dicts(list1, list2):
     set1 = {tuple(d.items()) for d in list1}
     set2 = {tuple(d.items()) for d in list2}
     return set1 == set2
+
+
+def test_faiss_vector_store_skill_run_stream(tmp_path: Path) -> None:
+    db_path = tmp_path / "faiss_index"
+    vec_store = FaissVectorStoreSkill(
+        config={"params": {"db_path": db_path, "dimension": 4}},
+        global_config=None,
+    )
+
+    batches = []
+    for i in range(2):
+        chunk = Chunk()
+        chunk.chunk_id = f"chunk_{i}"
+        chunk.content = f"content {i}"
+        chunk.source_link = f"source_{i}"
+        chunk.embedding = [float(i)] * 4
+        doc = Document(filename=f"doc_{i}", tag="tag")
+        doc.add_chunk(chunk)
+        batches.append([doc])
+
+    assert list(vec_store.run_stream(iter(batches), 1)) == batches
+
+    loaded_faiss = FAISS.load_local(db_path, embeddings=None, allow_dangerous_deserialization=True)
+    assert set(loaded_faiss.index_to_docstore_id.values()) == {"chunk_0", "chunk_1"}
+
+
+def test_faiss_vector_store_skill_skips_existing_ids(tmp_path: Path) -> None:
+    db_path = tmp_path / "faiss_index"
+    vec_store = FaissVectorStoreSkill(
+        config={"params": {"db_path": db_path, "dimension": 4}},
+        global_config=None,
+    )
+
+    def make_doc(name: str, chunk_ids: List[str]) -> Document:
+        doc = Document(filename=name, tag="tag")
+        for index, chunk_id in enumerate(chunk_ids):
+            chunk = Chunk()
+            chunk.chunk_id = chunk_id
+            chunk.content = f"content of {chunk_id}"
+            chunk.source_link = name
+            chunk.embedding = [float(index)] * 4
+            doc.add_chunk(chunk)
+        return doc
+
+    # the same chunk id twice in one run is only added once
+    vec_store.run([make_doc("doc_1", ["chunk_1", "chunk_2"]), make_doc("doc_2", ["chunk_2"])])
+    vec_store.run([make_doc("doc_3", ["chunk_1", "chunk_3"])])
+
+    loaded_faiss = FAISS.load_local(db_path, embeddings=None, allow_dangerous_deserialization=True)
+    assert sorted(loaded_faiss.index_to_docstore_id.values()) == ["chunk_1", "chunk_2", "chunk_3"]
+    assert loaded_faiss.index.ntotal == 3
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"index_type": "ivf_flat", "nprobe": 4},
+        {"index_type": "ivf_pq", "pq_m": 4, "metric": "ip"},
+        {"index_type": "ivf_sq8", "metric": "cosine"},
+        {"index_type": "hnsw", "hnsw_m": 8, "ef_search": 32},
+        {"index_type": "hnsw_sq8", "metric": "cosine"},
+        {"index_type": "sq8"},
+    ],
+)
+def test_faiss_vector_store_skill_index_types(tmp_path: Path, params: dict) -> None:
+    db_path = tmp_path / "faiss_index"
+    rng = np.random.default_rng(0)
+    docs = []
+    for i in range(500):
+        chunk = Chunk()
+        chunk.chunk_id = f"chunk_{i}"
+        chunk.content = f"content {i}"
+        chunk.source_link = f"source_{i}"
+        chunk.embedding = rng.random(16, dtype=np.float32)
+        doc = Document(filename=f"doc_{i}", tag="tag")
+        doc.add_chunk(chunk)
+        docs.append(doc)
+
+    vec_store = FaissVectorStoreSkill(
+        config={"params": {"db_path": db_path, "dimension": 16, "train_size": 200, **params}},
+        global_config=None,
+    )
+    batches = [docs[start : start + 100] for start in range(0, len(docs), 100)]
+    assert list(vec_store.run_stream(iter(batches), 100)) == batches
+
+    loaded_faiss = FAISS.load_local(db_path, embeddings=None, allow_dangerous_deserialization=True)
+    assert loaded_faiss.index.is_trained
+    assert loaded_faiss.index.ntotal == 500
+
+    # the index can be appended to once reloaded, without being trained again
+    vec_store.run(docs[:10])
+    loaded_faiss = FAISS.load_local(db_path, embeddings=None, allow_dangerous_deserialization=True)
+    assert loaded_faiss.index.ntotal == 500
+
+    # with an inner product metric, the nearest neighbor of a vector is not always itself
+    if params.get("metric") != "ip":
+        query = np.asarray([next(iter(docs[42].chunks)).embedding])
+        if params.get("metric") == "cosine":
+            faiss.normalize_L2(query)
+        _, labels = loaded_faiss.index.search(query, 5)
+        assert "chunk_42" in [loaded_faiss.index_to_docstore_id[label] for label in labels[0]]
+
+
+def test_faiss_vector_store_skill_rejects_unknown_index_type() -> None:
+    with pytest.raises(ValueError):
+        FaissVectorStoreSkill(
+            config={"params": {"db_path": "unused", "dimension": 16, "index_type": "lsh"}},
+            global_config=None,
+        )
+
+
+def _make_docs(count: int, dimension: int, seed: int = 0) -> List[Document]:
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(count):
+        chunk = Chunk()
+        chunk.chunk_id = f"chunk_{i}"
+        chunk.content = f"content {i}"
+        chunk.source_link = f"source_{i}"
+        chunk.embedding = rng.random(dimension, dtype=np.float32)
+        doc = Document(filename=f"doc_{i}", tag="tag")
+        doc.add_chunk(chunk)
+        docs.append(doc)
+    return docs
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_faiss_vector_store_skill_native_storage(tmp_path: Path, index_type: str) -> None:
+    db_path = tmp_path / "faiss_index"
+    docs = _make_docs(300, 8)
+    config = {"params": {"db_path": db_path, "dimension": 8, "storage": "native", "index_type": index_type}}
+
+    FaissVectorStoreSkill(config, None).run(docs[:200])
+    FaissVectorStoreSkill(config, None).run(docs[100:])
+
+    store = FaissNativeStore(db_path, mmap=True)
+    assert store.ntotal == 300
+    assert store.segment_count == 2
+    assert len(store.docstore) == 300
+    query = np.asarray([next(iter(docs[250].chunks)).embedding])
+    results = store.search(query, 3)
+    assert results[0][0]["chunk_id"] == "chunk_250"
+    assert results[0][0]["content"] == "content 250"
+    assert results[0][0]["source"] == "source_250"
+    store.close()
+
+
+def test_faiss_native_store_skips_loading_the_index_without_new_chunks(tmp_path: Path) -> None:
+    db_path = tmp_path / "faiss_index"
+    docs = _make_docs(10, 8)
+    skill = FaissVectorStoreSkill({"params": {"db_path": db_path, "dimension": 8, "storage": "native"}}, None)
+    skill.run(docs)
+
+    store = skill._get_vector_store(db_path.as_posix(), docs)
+    skill._add_documents(store, docs)
+    assert store._index is None
+    store.close()
+
+
+def test_faiss_native_store_drops_docstore_rows_without_vectors(tmp_path: Path) -> None:
+    store = FaissNativeStore(tmp_path, index=faiss.IndexFlatL2(4))
+    store.add(["a", "b"], ["text a", "text b"], [{}, {}], np.eye(2, 4, dtype=np.float32))
+    store.save()
+    # a run that crashed after committing the docstore, while writing its segment
+    store.add(["c"], ["text c"], [{}], np.eye(1, 4, dtype=np.float32))
+    (tmp_path / "segment_000001.faiss.tmp").write_bytes(b"partial")
+    store.close()
+
+    store = FaissNativeStore(tmp_path)
+    assert store.ntotal == 2
+    assert store.docstore.existing_ids(["a", "b", "c"]) == {"a", "b"}
+    store.add(["c"], ["text c"], [{}], np.eye(1, 4, dtype=np.float32))
+    store.save()
+    assert sorted(path.name for path in tmp_path.glob("segment_*")) == ["segment_000000.faiss", "segment_000001.faiss"]
+    store.close()
+
+
+def test_faiss_native_store_overwrite_keeps_the_saved_docstore_until_saved(tmp_path: Path) -> None:
+    store = FaissNativeStore(tmp_path, index=faiss.IndexFlatL2(4))
+    store.add(["a", "b"], ["text a", "text b"], [{}, {}], np.eye(2, 4, dtype=np.float32))
+    store.save()
+    store.close()
+
+    # a run overwriting the store, which crashes before saving
+    store = FaissNativeStore(tmp_path, index=faiss.IndexFlatL2(4))
+    store.add(["c"], ["text c"], [{}], np.eye(1, 4, dtype=np.float32))
+    store.close()
+
+    store = FaissNativeStore(tmp_path)
+    assert store.ntotal == 2
+    assert [row["content"] for row in store.docstore.get([0, 1]).values()] == ["text a", "text b"]
+    store.close()
+
+    store = FaissNativeStore(tmp_path, index=faiss.IndexFlatL2(4))
+    store.add(["c"], ["text c"], [{}], np.eye(1, 4, dtype=np.float32))
+    store.save()
+    store.close()
+
+    store = FaissNativeStore(tmp_path)
+    assert store.ntotal == 1
+    assert store.docstore.get([0])[0]["content"] == "text c"
+    assert store.docstore.existing_ids(["a", "b", "c"]) == {"c"}
+    assert [path.name for path in tmp_path.glob("docstore*.sqlite")] == ["docstore_000001.sqlite"]
+    store.close()
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_pq", "hnsw"])
+def test_faiss_native_store_appends_segments_and_compacts_them(tmp_path: Path, index_type: str) -> None:
+    db_path = tmp_path / "faiss_index"
+    docs = _make_docs(600, 8)
+    config = {
+        "params": {
+            "db_path": db_path,
+            "dimension": 8,
+            "storage": "native",
+            "index_type": index_type,
+            "pq_m": 4,
+            "nprobe": 16,
+            "max_segments": 3,
+        }
+    }
+    FaissVectorStoreSkill(config, None).run(docs[:500])
+    base_size = (db_path / "segment_000000.faiss").stat().st_size
+
+    for run in range(2):
+        FaissVectorStoreSkill(config, None).run(docs[500 + run * 10 : 510 + run * 10])
+        store = FaissNativeStore(db_path)
+        assert store.segment_count == run + 2
+        # a small run only writes its own vectors
+        assert (db_path / f"segment_{run + 1:06d}.faiss").stat().st_size < base_size
+        store.close()
+
+    # a fourth segment goes above max_segments, all of them are compacted into one
+    FaissVectorStoreSkill(config, None).run(docs[520:])
+    store = FaissNativeStore(db_path, mmap=True)
+    assert store.segment_count == 1
+    assert store.ntotal == 600
+    assert [path.name for path in db_path.glob("segment_*")] == ["segment_000004.faiss"]
+
+    queries = np.asarray([next(iter(docs[i].chunks)).embedding for i in (10, 505, 599)])
+    results = store.search(queries, 1)
+    if index_type != "ivf_pq":
+        assert [result[0]["chunk_id"] for result in results] == ["chunk_10", "chunk_505", "chunk_599"]
+    else:
+        assert all(len(result) == 1 for result in results)
+    store.close()
+
+
+def test_search_indexes_merges_the_top_k_of_every_index() -> None:
+    vectors = np.arange(12, dtype=np.float32).reshape(6, 2)
+    first, second = faiss.IndexFlatL2(2), faiss.IndexFlatL2(2)
+    first.add(vectors[:4])
+    second.add(vectors[4:])
+
+    scores, labels = search_indexes([first, second], vectors[[0, 5]], 3)
+    assert labels.tolist() == [[0, 1, 2], [5, 4, 3]]
+    assert scores[:, 0].tolist() == [0.0, 0.0]
+
+
+def test_faiss_vector_store_skill_shards(tmp_path: Path) -> None:
+    db_path = tmp_path / "faiss_index"
+    docs = _make_docs(300, 8)
+    config = {"params": {"db_path": db_path, "dimension": 8, "storage": "native", "shards": 2}}
+
+    skill = FaissVectorStoreSkill(config, None)
+    batches = [docs[start : start + 100] for start in range(0, 200, 100)]
+    assert list(skill.run_stream(iter(batches), 100)) == batches
+    FaissVectorStoreSkill(config, None).run(docs[100:])
+
+    store = ShardedFaissStore(db_path, mmap=True)
+    assert store.ntotal == 300
+    for shard_index, shard in enumerate(store.shards):
+        rows = shard.docstore.get(range(shard.ntotal)).values()
+        assert all(ShardedFaissStore.shard_of(row["chunk_id"], 2) == shard_index for row in rows)
+
+    queries = np.asarray([next(iter(docs[i].chunks)).embedding for i in (0, 150, 299)])
+    results = store.search(queries, 2)
+    assert [result[0]["chunk_id"] for result in results] == ["chunk_0", "chunk_150", "chunk_299"]
+    assert all(result[0]["score"] <= result[1]["score"] for result in results)
+    store.close()
+
+    with pytest.raises(ValueError):
+        FaissVectorStoreSkill({"params": {**config["params"], "shards": 3}}, None).run(docs)
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+def test_faiss_native_store_normalizes_cosine_queries(tmp_path: Path, shards: int) -> None:
+    db_path = tmp_path / "faiss_index"
+    docs = _make_docs(3, 2)
+    for doc, embedding in zip(docs, ([3.0, 0.0], [2.0, 2.0], [0.0, 5.0])):
+        next(iter(doc.chunks)).embedding = np.asarray(embedding, dtype=np.float32)
+    config = {"params": {"db_path": db_path, "dimension": 2, "storage": "native", "metric": "cosine", "shards": shards}}
+    FaissVectorStoreSkill(config, None).run(docs)
+
+    store = ShardedFaissStore(db_path) if shards > 1 else FaissNativeStore(db_path)
+    queries = np.asarray([[10.0, 0.0]], dtype=np.float32)
+    results = store.search(queries, 3)
+
+    # the scores are cosine similarities, whatever the norm of the query
+    assert [row["chunk_id"] for row in results[0]] == ["chunk_0", "chunk_1", "chunk_2"]
+    assert [row["score"] for row in results[0]] == pytest.approx([1.0, 0.5**0.5, 0.0], abs=1e-6)
+    assert queries.tolist() == [[10.0, 0.0]]
+    store.close()
+
+
+def test_faiss_vector_store_skill_splits_batches_by_tag() -> None:
+    docs = _make_docs(20, 8)
+    for index, doc in enumerate(docs):
+        doc.tag = f"tag_{index % 4}"
+    skill = FaissVectorStoreSkill(
+        {"params": {"db_path": "unused", "dimension": 8, "storage": "native", "shards": 3, "shard_by": "tag"}}, None
+    )
+
+    shard_docs = skill._split_between_shards(docs)
+    assert sum(len(docs) for docs in shard_docs) == 20
+    for shard_index, docs in enumerate(shard_docs):
+        assert all(ShardedFaissStore.shard_of(doc.tag, 3) == shard_index for doc in docs)
+
+
+def test_faiss_vector_store_skill_reports_shard_failures(tmp_path: Path) -> None:
+    docs = _make_docs(10, 8)
+    config = {"params": {"db_path": tmp_path / "faiss_index", "dimension": 4, "storage": "native", "shards": 2}}
+
+    with pytest.raises(RuntimeError, match="Writing FAISS shards failed"):
+        FaissVectorStoreSkill(config, None).run(docs)
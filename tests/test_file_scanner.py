@@ -0,0 +1,108 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from docs2vecs.subcommands.indexer.skills import FileScannerSkill
+
+
+def _scan(folder: Path, manifest_path: Path, **params) -> dict:
+    scanner = FileScannerSkill({"params": {"path": str(folder), "manifest_path": str(manifest_path), **params}}, None)
+    documents = scanner.run(None)
+    scanner.finalize()
+    return {Path(doc.filename).name: doc.deleted for doc in documents}
+
+
+def test_incremental_scan_returns_changed_and_deleted_files(tmp_path: Path) -> None:
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    manifest_path = tmp_path / "manifest.json"
+    for name in ("unchanged.txt", "changed.txt", "deleted.txt"):
+        (folder / name).write_text(name)
+
+    assert _scan(folder, manifest_path) == {"unchanged.txt": False, "changed.txt": False, "deleted.txt": False}
+    assert _scan(folder, manifest_path) == {}
+
+    (folder / "changed.txt").write_text("new content")
+    (folder / "deleted.txt").unlink()
+    (folder / "new.txt").write_text("new file")
+
+    assert _scan(folder, manifest_path) == {"changed.txt": False, "new.txt": False, "deleted.txt": True}
+    assert _scan(folder, manifest_path) == {}
+
+
+def test_touched_files_are_skipped_when_hashing_content(tmp_path: Path) -> None:
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    manifest_path = tmp_path / "manifest.json"
+    (folder / "touched.txt").write_text("same content")
+    _scan(folder, manifest_path, hash_content=True)
+
+    stat = (folder / "touched.txt").stat()
+    os.utime(folder / "touched.txt", (stat.st_atime, stat.st_mtime + 10))
+
+    assert _scan(folder, manifest_path, hash_content=True) == {}
+
+
+def test_manifest_is_only_saved_on_finalize(tmp_path: Path) -> None:
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    (folder / "file.txt").write_text("content")
+    manifest_path = tmp_path / "manifest.json"
+
+    FileScannerSkill({"params": {"path": str(folder), "manifest_path": str(manifest_path)}}, None).run(None)
+
+    assert not manifest_path.exists()
+    assert _scan(folder, manifest_path) == {"file.txt": False}
+
+
+def test_missing_folder_is_an_error(tmp_path: Path) -> None:
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    (folder / "file.txt").write_text("content")
+    manifest_path = tmp_path / "manifest.json"
+    _scan(folder, manifest_path)
+    manifest = manifest_path.read_text()
+
+    shutil.rmtree(folder)
+
+    # rather than every file of the manifest being reported deleted
+    with pytest.raises(FileNotFoundError):
+        _scan(folder, manifest_path)
+    assert manifest_path.read_text() == manifest
+
+
+def test_recursive_scan_with_include_and_exclude_patterns(tmp_path: Path) -> None:
+    for relative_path in (
+        "a.md",
+        "b.txt",
+        "draft_c.md",
+        "sub/d.md",
+        "sub/deeper/e.MD",
+        ".git/f.md",
+        "sub/node_modules/g.md",
+    ):
+        (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative_path).write_text(relative_path)
+
+    scanner = FileScannerSkill(
+        {
+            "params": {
+                "path": str(tmp_path),
+                "recursive": True,
+                "filter": ["*.md", "*.MD"],
+                "exclude": ["draft_*"],
+                "exclude_dirs": [".git", "node_modules"],
+            }
+        },
+        None,
+    )
+
+    documents = scanner.run(None)
+
+    assert [Path(doc.filename).relative_to(tmp_path).as_posix() for doc in documents] == [
+        "a.md",
+        "sub/d.md",
+        "sub/deeper/e.MD",
+    ]
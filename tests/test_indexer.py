@@ -0,0 +1,330 @@
+from pathlib import Path
+from typing import List
+from typing import Optional
+
+import pytest
+import yaml
+
+from docs2vecs.subcommands.indexer.checkpoint import Checkpoint
+from docs2vecs.subcommands.indexer.config.config import Config
+from docs2vecs.subcommands.indexer.document.document import Document
+from docs2vecs.subcommands.indexer.indexer import Indexer
+from docs2vecs.subcommands.indexer.pipeline import ConcurrentPipeline
+from docs2vecs.subcommands.indexer.skills import DefaultFileReader
+from docs2vecs.subcommands.indexer.skills import FaissVectorStoreSkill
+from docs2vecs.subcommands.indexer.skills import FileScannerSkill
+from docs2vecs.subcommands.indexer.skills import RecursiveCharacterTextSplitter
+from docs2vecs.subcommands.indexer.skills.skill import IndexerSkill
+
+SCHEMA_FILE = Path("src/docs2vecs/subcommands/indexer/config/config_schema.yaml")
+
+
+class UpperCaseSkill(IndexerSkill):
+    CONCURRENT_WORKERS = True
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        for doc in input:
+            doc.text = doc.text.upper()
+        return input
+
+
+class TextReaderSkill(IndexerSkill):
+    CONCURRENT_WORKERS = True
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        for doc in input:
+            doc.text = Path(doc.filename).read_text()
+        return input
+
+
+class FailingSkill(IndexerSkill):
+    CONCURRENT_WORKERS = True
+
+    def run(self, input: Optional[List[Document]] = None) -> List[Document]:
+        raise RuntimeError("boom")
+
+
+def _write_files(folder: Path, count: int) -> None:
+    for i in range(count):
+        (folder / f"file_{i}.txt").write_text(f"content of file {i}")
+
+
+def test_run_stream_adapts_run() -> None:
+    skill = UpperCaseSkill({"params": {}}, None)
+    batches = [[Document(filename="a", text="a"), Document(filename="b", text="b"), Document(filename="c", text="c")]]
+
+    output = list(skill.run_stream(iter(batches), 2))
+
+    assert [len(batch) for batch in output] == [2, 1]
+    assert [doc.text for batch in output for doc in batch] == ["A", "B", "C"]
+
+
+def test_file_scanner_streams_batches(tmp_path: Path) -> None:
+    _write_files(tmp_path, 5)
+    scanner = FileScannerSkill({"params": {"path": str(tmp_path), "filter": ["*.txt"]}}, None)
+
+    output = list(scanner.run_stream(iter([None]), 2))
+
+    assert [len(batch) for batch in output] == [2, 2, 1]
+    assert {Path(doc.filename).name for batch in output for doc in batch} == {f"file_{i}.txt" for i in range(5)}
+
+
+def test_concurrent_pipeline(tmp_path: Path) -> None:
+    _write_files(tmp_path, 7)
+    scanner = FileScannerSkill({"params": {"path": str(tmp_path)}}, None)
+    upper_case = UpperCaseSkill({"params": {}}, None)
+
+    pipeline = ConcurrentPipeline(
+        skills=[scanner, TextReaderSkill({"params": {}}, None), upper_case],
+        workers=[1, 3, 2],
+        batch_size=2,
+        queue_size=1,
+        logger=scanner.logger,
+    )
+
+    assert pipeline.run() == 7
+
+
+def test_concurrent_pipeline_propagates_errors(tmp_path: Path) -> None:
+    _write_files(tmp_path, 3)
+    scanner = FileScannerSkill({"params": {"path": str(tmp_path)}}, None)
+
+    pipeline = ConcurrentPipeline(
+        skills=[scanner, FailingSkill({"params": {}}, None)],
+        workers=[1, 2],
+        batch_size=1,
+        queue_size=1,
+        logger=scanner.logger,
+    )
+
+    with pytest.raises(RuntimeError, match="boom"):
+        pipeline.run()
+
+
+def test_concurrent_pipeline_runs_stateful_skills_on_one_worker(tmp_path: Path) -> None:
+    scanner = FileScannerSkill({"params": {"path": str(tmp_path)}}, None)
+    store = FaissVectorStoreSkill({"params": {"db_path": str(tmp_path / "index"), "dimension": 2}}, None)
+
+    with pytest.raises(ValueError, match="FaissVectorStoreSkill .* cannot run on 2 workers"):
+        ConcurrentPipeline(skills=[scanner, store], workers=[1, 2], batch_size=1, queue_size=1, logger=scanner.logger)
+
+
+@pytest.mark.parametrize(
+    "pipeline_config",
+    [
+        {"mode": "streaming", "batch_size": 2},
+        {"mode": "concurrent", "batch_size": 2, "queue_size": 1, "workers": {"multi-file-reader": 2}},
+    ],
+)
+def test_indexer_pipeline_modes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, pipeline_config: dict) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    _write_files(docs_dir, 3)
+    config_file = tmp_path / "config.yaml"
+    skillset = [
+        {"type": "file-scanner", "name": "multi-file-scanner", "params": {"path": str(docs_dir)}},
+        {"type": "file-reader", "name": "multi-file-reader"},
+        {"type": "splitter", "name": "recursive-character-splitter", "params": {"chunk_size": 200}},
+    ]
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "definitions": [{"skillset": skillset}],
+                "indexer": {
+                    "id": "StreamingIndexer",
+                    "pipeline": pipeline_config,
+                    "skillset": skillset,
+                },
+            }
+        )
+    )
+
+    split_docs = []
+    splitter_run = RecursiveCharacterTextSplitter.run
+
+    def split(self, input=None):
+        output = splitter_run(self, input)
+        split_docs.extend(output)
+        return output
+
+    monkeypatch.setattr(RecursiveCharacterTextSplitter, "run", split)
+    indexer = Indexer(Config(config_file, SCHEMA_FILE))
+    indexer.run()
+
+    # every file reached the last stage, and was split into chunks
+    assert sorted(doc.filename for doc in split_docs) == sorted(str(path) for path in docs_dir.iterdir())
+    assert [[chunk.content for chunk in doc.chunks] for doc in sorted(split_docs, key=lambda doc: doc.filename)] == [
+        [f"content of file {i}"] for i in range(3)
+    ]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "streaming", "concurrent"])
+def test_indexer_resumes_from_checkpoint(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mode: str) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    _write_files(docs_dir, 4)
+    checkpoint_dir = tmp_path / "checkpoint"
+    config_file = tmp_path / "config.yaml"
+    skillset = [
+        {"type": "file-scanner", "name": "multi-file-scanner", "params": {"path": str(docs_dir)}},
+        {"type": "file-reader", "name": "multi-file-reader"},
+        {"type": "splitter", "name": "recursive-character-splitter", "params": {"chunk_size": 200}},
+    ]
+    pipeline_config = {
+        "mode": mode,
+        "batch_size": 1,
+        "checkpoint": {"path": str(checkpoint_dir), "after": "multi-file-reader"},
+    }
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "definitions": [{"skillset": skillset}],
+                "indexer": {"id": "ResumableIndexer", "pipeline": pipeline_config, "skillset": skillset},
+            }
+        )
+    )
+    config = Config(config_file, SCHEMA_FILE)
+
+    read_files = []
+    split_files = []
+    reader_run = DefaultFileReader.run
+    splitter_run = RecursiveCharacterTextSplitter.run
+
+    def read(self, input=None):
+        read_files.extend(doc.filename for doc in input)
+        return reader_run(self, input)
+
+    def split_then_fail(self, input=None):
+        split_files.extend(doc.filename for doc in input)
+        if len(split_files) >= 3:
+            raise RuntimeError("boom")
+        return splitter_run(self, input)
+
+    monkeypatch.setattr(DefaultFileReader, "run", read)
+    monkeypatch.setattr(RecursiveCharacterTextSplitter, "run", split_then_fail)
+    with pytest.raises(RuntimeError, match="boom"):
+        Indexer(config).run()
+    first_read_count = len(read_files)
+    assert (checkpoint_dir / "progress.jsonl").exists()
+
+    read_files.clear()
+    split_files.clear()
+    monkeypatch.setattr(
+        RecursiveCharacterTextSplitter, "run", lambda self, input=None: split_files.extend(doc.filename for doc in input)
+    )
+    Indexer(Config(config_file, SCHEMA_FILE), resume=True).run()
+
+    # the documents read by the failed run are not read again, but still go through the next stages
+    assert len(read_files) == 4 - first_read_count
+    assert sorted(split_files) == sorted(str(path) for path in docs_dir.iterdir())
+    assert not checkpoint_dir.exists()
+
+
+def test_indexer_resumes_files_read_as_several_documents(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    _write_files(docs_dir, 3)
+    config_file = tmp_path / "config.yaml"
+    skillset = [
+        {"type": "file-scanner", "name": "multi-file-scanner", "params": {"path": str(docs_dir)}},
+        {"type": "file-reader", "name": "multi-file-reader"},
+        {"type": "splitter", "name": "recursive-character-splitter", "params": {"chunk_size": 200}},
+    ]
+    pipeline_config = {
+        "mode": "streaming",
+        "batch_size": 2,
+        "checkpoint": {"path": str(tmp_path / "checkpoint"), "after": "multi-file-reader"},
+    }
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "definitions": [{"skillset": skillset}],
+                "indexer": {"id": "ResumableIndexer", "pipeline": pipeline_config, "skillset": skillset},
+            }
+        )
+    )
+
+    # every file is read as three pages, more than a batch holds
+    def read_pages(self, input=None):
+        return [Document(filename=doc.filename, text=f"page {page}") for doc in input for page in range(3)]
+
+    split_pages = []
+
+    def split_then_fail(self, input=None):
+        if split_pages:
+            raise RuntimeError("boom")
+        split_pages.extend((str(doc.filename), doc.text) for doc in input)
+
+    monkeypatch.setattr(DefaultFileReader, "run", read_pages)
+    monkeypatch.setattr(RecursiveCharacterTextSplitter, "run", split_then_fail)
+    with pytest.raises(RuntimeError, match="boom"):
+        Indexer(Config(config_file, SCHEMA_FILE)).run()
+
+    split_pages.clear()
+    monkeypatch.setattr(
+        RecursiveCharacterTextSplitter,
+        "run",
+        lambda self, input=None: split_pages.extend((str(doc.filename), doc.text) for doc in input),
+    )
+    Indexer(Config(config_file, SCHEMA_FILE), resume=True).run()
+
+    # no page of a file found in the checkpoint is lost
+    expected_pages = [(str(path), f"page {page}") for path in docs_dir.iterdir() for page in range(3)]
+    assert sorted(split_pages) == sorted(expected_pages)
+
+
+def test_checkpoint_drops_a_partial_progress_line(tmp_path: Path) -> None:
+    checkpoint = Checkpoint(tmp_path / "checkpoint", "key", resume=False)
+    checkpoint.save_batch([Document(filename="a")])
+    checkpoint._progress.write('{"batch": "batch_000001.pkl", "docu')
+    checkpoint._progress.close()
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint", "key", resume=True)
+    checkpoint.save_batch([Document(filename="b")])
+    checkpoint._progress.close()
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint", "key", resume=True)
+    assert checkpoint.completed_documents == {"a", "b"}
+    assert [doc.filename for batch in checkpoint.load_batches() for doc in batch] == ["a", "b"]
+    checkpoint.clear()
+
+
+def test_checkpoint_only_removes_its_own_files(tmp_path: Path) -> None:
+    (tmp_path / "output.txt").write_text("not a checkpoint")
+    with pytest.raises(ValueError, match="is not empty and does not hold a checkpoint"):
+        Checkpoint(tmp_path, "key", resume=False)
+    assert (tmp_path / "output.txt").exists()
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint", "key", resume=False)
+    checkpoint.save_batch([Document(filename="a")])
+    (tmp_path / "checkpoint" / "notes.txt").write_text("added later")
+    checkpoint.clear()
+
+    assert [path.name for path in (tmp_path / "checkpoint").iterdir()] == ["notes.txt"]
+
+
+@pytest.mark.parametrize(
+    "skill_types, checkpoint_stage",
+    [
+        (["file-scanner", "file-reader", "vector-store"], 1),
+        (["file-scanner", "file-reader", "splitter"], 2),
+        # a store as the first skill, e.g. one loading chunks saved by another run
+        (["vector-store", "splitter"], 0),
+    ],
+)
+def test_checkpoint_defaults_to_the_stage_before_the_first_store(
+    tmp_path: Path, skill_types: List[str], checkpoint_stage: int
+) -> None:
+    skillset = [{"type": skill_type, "name": f"skill-{i}"} for i, skill_type in enumerate(skill_types)]
+    config_file = tmp_path / "config.yaml"
+    pipeline_config = {"checkpoint": {"path": str(tmp_path / "checkpoint")}}
+    config_file.write_text(
+        yaml.safe_dump(
+            {
+                "definitions": [{"skillset": skillset}],
+                "indexer": {"id": "ResumableIndexer", "pipeline": pipeline_config, "skillset": skillset},
+            }
+        )
+    )
+
+    assert Indexer(Config(config_file, SCHEMA_FILE))._checkpoint_stage == checkpoint_stage
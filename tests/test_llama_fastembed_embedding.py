@@ -0,0 +1,56 @@
+import numpy as np
+
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.document import Document
+from docs2vecs.subcommands.indexer.skills import llama_fastembed_embedding_skill
+from docs2vecs.subcommands.indexer.skills import LlamaFastembedEmbeddingSkill
+
+
+class FakeTextEmbedding:
+    def __init__(self, model_name, threads, specific_model_path):
+        self.calls = []
+
+    def query_embed(self, texts, batch_size, parallel):
+        texts = list(texts)
+        self.calls.append((len(texts), batch_size, parallel))
+        for text in texts:
+            yield np.array([float(len(text))] * 3, dtype=np.float32)
+
+
+def test_embeddings_are_batched_across_documents(monkeypatch) -> None:
+    monkeypatch.setattr(llama_fastembed_embedding_skill, "TextEmbedding", FakeTextEmbedding)
+    skill = LlamaFastembedEmbeddingSkill({"params": {"batch_size": 8, "parallel": 2}}, None)
+
+    documents = []
+    for doc_index, contents in enumerate([["a", "bb"], ["ccc", ""]]):
+        doc = Document(filename=f"doc_{doc_index}")
+        for chunk_index, content in enumerate(contents):
+            chunk = Chunk()
+            chunk.chunk_id = f"chunk_{doc_index}_{chunk_index}"
+            chunk.content = content
+            doc.add_chunk(chunk)
+        documents.append(doc)
+
+    skill.run(documents)
+
+    assert skill._embedding_model.calls == [(3, 8, 2)]
+    embeddings = {chunk.content: chunk.embedding.tolist() for doc in documents for chunk in doc.chunks}
+    assert embeddings == {"a": [1.0] * 3, "bb": [2.0] * 3, "ccc": [3.0] * 3, "": []}
+
+
+def test_cached_embeddings_are_not_recomputed(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(llama_fastembed_embedding_skill, "TextEmbedding", FakeTextEmbedding)
+    params = {"cache_path": str(tmp_path / "cache.sqlite")}
+
+    for expected_calls in ([(1, 256, None)], []):
+        skill = LlamaFastembedEmbeddingSkill({"params": dict(params)}, None)
+        doc = Document(filename="doc")
+        chunk = Chunk()
+        chunk.chunk_id = "chunk"
+        chunk.content = "cached"
+        doc.add_chunk(chunk)
+
+        skill.run([doc])
+
+        assert skill._embedding_model.calls == expected_calls
+        assert chunk.embedding.tolist() == [6.0] * 3
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from docs2vecs.subcommands.indexer.db import SQLiteConnection
+from docs2vecs.subcommands.indexer.document import Chunk
+from docs2vecs.subcommands.indexer.skills import VectorStoreTracker
+from docs2vecs.subcommands.indexer.skills.factory import DBFactory
+
+
+class InMemoryConnection:
+    """Tracker database keeping the documents in a dict, keyed by chunk document id."""
+
+    def __init__(self) -> None:
+        self.documents = {}
+        self.queries = 0
+
+    def get_documents(self, filter=None, projection=None):
+        self.queries += 1
+        for doc in self.documents.values():
+            if filter is None or doc["status"]["succeeded"] == filter["status.succeeded"]:
+                yield {"chunk": doc["chunk"]}
+
+    def get_tracked_document_ids(self, document_ids):
+        self.queries += 1
+        return {document_id for document_id in document_ids if document_id in self.documents}
+
+    def update_documents(self, doc_list, status_list):
+        for doc, result in zip(doc_list, status_list):
+            self.documents[doc["document_id"]] = {"chunk": doc, "status": {"succeeded": result.succeeded}}
+
+
+def _make_chunk(document_id: str) -> Chunk:
+    chunk = Chunk()
+    chunk.document_id = document_id
+    chunk.chunk_id = document_id
+    chunk.content = f"content of {document_id}"
+    chunk.embedding = [0.5, 0.25]
+    return chunk
+
+
+def test_tracked_document_ids_are_looked_up_in_bulk() -> None:
+    connection = InMemoryConnection()
+    tracker = VectorStoreTracker(connection)
+    tracker.update_documents(
+        [_make_chunk("a"), _make_chunk("b")], [SimpleNamespace(succeeded=True), SimpleNamespace(succeeded=False)]
+    )
+
+    assert tracker.get_tracked_document_ids(["a", "b", "c"]) == {"a", "b"}
+    assert tracker.get_untracked_document_ids(["a", "b", "c"]) == {"c"}
+    assert connection.queries == 2
+
+
+def test_failed_documents_are_streamed_as_chunks() -> None:
+    tracker = VectorStoreTracker(InMemoryConnection())
+    tracker.update_documents(
+        [_make_chunk("a"), _make_chunk("b")], [SimpleNamespace(succeeded=True), SimpleNamespace(succeeded=False)]
+    )
+
+    failed = tracker.retrieve_failed_documents()
+
+    assert not isinstance(failed, list)
+    chunks = list(failed)
+    assert [chunk.document_id for chunk in chunks] == ["b"]
+    assert chunks[0].content == "content of b"
+    assert chunks[0].embedding.tolist() == [0.5, 0.25]
+
+
+def test_sqlite_tracker_database(tmp_path) -> None:
+    connection = DBFactory.get_db({"type": "sqlite", "path": str(tmp_path / "tracker.sqlite")})
+    tracker = VectorStoreTracker(connection)
+    tracker.update_documents(
+        [_make_chunk("a"), _make_chunk("b")], [SimpleNamespace(succeeded=True, error_message=None)] * 2
+    )
+    tracker.update_documents([_make_chunk("b")], [SimpleNamespace(succeeded=False, error_message="Unavailable")])
+
+    assert tracker.is_document_tracked("a")
+    assert not tracker.is_document_tracked("c")
+    assert tracker.get_tracked_document_ids(["a", "b", "c"]) == {"a", "b"}
+    assert [chunk.document_id for chunk in tracker.retrieve_failed_documents()] == ["b"]
+    assert [doc["status"] for doc in tracker.get_documents({"chunk.document_id": "b"})] == [
+        {"succeeded": False, "error_message": "Unavailable"}
+    ]
+    connection.close()
+
+    # the documents are kept across connections
+    connection = SQLiteConnection(str(tmp_path / "tracker.sqlite"))
+    assert [doc["chunk"]["embedding"].tolist() for doc in connection.get_documents()] == [[0.5, 0.25]] * 2
+    with pytest.raises(ValueError, match="Unsupported filter"):
+        list(connection.get_documents({"chunk.tag": "x"}))